@@ -0,0 +1,293 @@
+from .cell import Cell
+from .dag import SignalFlowDAG
+from .graph import Graph
+from .negator import Negator
+from .scheduler import NUM_CLOCK_ZONES
+from .utils import euclidean_dist
+import math
+import numpy as np
+from scipy import sparse
+
+
+class AnalogSolver:
+    """Computes continuous cell polarizations in [-1, 1] using the bistable approximation.
+
+    The polarization of every node is
+    P_i = tanh(E_k / (2 * gamma_i) * (sum_j w_ij * P_j + h * P_i')),
+    where the sum goes over the nodes that drive node i, P_i' is the polarization of
+    the node at the previous step and gamma_i is the tunneling energy of the clock zone
+    of the node, which is low while the clock is high (the cells are polarized) and
+    high while the clock is low (the cells are relaxed).
+
+    The drivers of a node are found by orienting the graph in signal flow direction
+    (see SignalFlowDAG), by clock zone and distance from the inputs, so a cell is only
+    driven by the cells before it and not by the cells it drives. Together with the
+    hold term h * P_i', which keeps a cell polarized while its clock is high and its
+    drivers are already relaxing, this models the directionality the clocking gives
+    a real QCA circuit. Without it, the symmetric coupling lets the old value of an
+    output hold a gate in a wrong state.
+
+    The nodes are evaluated level by level (see SignalFlowDAG.levels): the nodes of a
+    level don't drive each other, so the whole level is updated at once with a sparse
+    matrix-vector product P_level = tanh(gains * (W_level @ P + h * P_level')), and a
+    single sweep over the levels settles a circuit without feedback. The nodes of a
+    feedback loop (a strongly connected component) form a block of their own, which
+    is updated until none of its polarizations changes by more than the tolerance,
+    before the nodes it drives are evaluated.
+
+    Levels and loops with fewer than vector_width nodes (e.g. the levels of a wire)
+    are updated node by node with the same couplings instead, because for them the
+    overhead of a NumPy call is larger than the work it does. Consecutive narrow
+    levels are merged into one block, which is still settled by a single sweep.
+    """
+
+    def __init__(
+        self,
+        graph: Graph,
+        kink_energy: float = 1.0,
+        min_tunneling: float = 0.05,
+        max_tunneling: float = 5.0,
+        diagonal_coupling: float = -0.2,
+        hold_coupling: float = 0.5,
+        tolerance: float = 1e-6,
+        max_iterations: int = 1000,
+        vector_width: int = 16,
+    ):
+        """Orients the graph and builds the sparse coupling matrix of every level.
+
+        Args:
+            graph (Graph): The circuit graph (after structure recognition).
+            kink_energy (float): The kink energy between two adjacent cells.
+            min_tunneling (float): The tunneling energy while the clock is at its maximum.
+            max_tunneling (float): The tunneling energy while the clock is at its minimum.
+            diagonal_coupling (float): The relative coupling of diagonally adjacent cells,
+            negative because diagonal neighbors align with opposite polarization.
+            hold_coupling (float): The relative coupling of a cell to its own previous
+            polarization. It must be smaller than the coupling to a driver, so a
+            polarized driver always wins.
+            tolerance (float): Feedback loops are swept until no polarization changes by
+            more than this.
+            max_iterations (int): The maximum number of sweeps of a feedback loop per step.
+            vector_width (int): The smallest block that is updated with a sparse
+            matrix-vector product instead of node by node.
+        """
+        self.graph = graph
+        self.kink_energy = kink_energy
+        self.min_tunneling = min_tunneling
+        self.max_tunneling = max_tunneling
+        self.diagonal_coupling = diagonal_coupling
+        self.hold_coupling = hold_coupling
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.vector_width = vector_width
+
+        self.dag = SignalFlowDAG(graph)
+        self.nodes = self.dag.nodes
+        self.zones = np.array(self.dag.zones, dtype=int)
+        # inputs and fixed cells drive the circuit and are never updated
+        self.driver_mask = np.array(self.dag.drivers, dtype=bool)
+
+        # the nodes without feedback of every level form one block and every feedback
+        # loop a block of its own, in topological order
+        depth = max(self.dag.component_levels, default=-1) + 1
+        levels = [[] for _ in range(depth)]
+        loops = [[] for _ in range(depth)]
+        for component, level in zip(self.dag.components, self.dag.component_levels):
+            if len(component) > 1:
+                loops[level].append(component)
+            else:
+                levels[level].extend(component)
+
+        self.blocks = []
+        for level in range(depth):
+            for rows, feedback in [(levels[level], False)] + [(c, True) for c in loops[level]]:
+                rows = [i for i in rows if not self.driver_mask[i]]
+                if len(rows) == 0:
+                    continue
+                last = self.blocks[-1] if len(self.blocks) > 0 else None
+                if len(rows) >= self.vector_width:
+                    self.blocks.append(_VectorBlock(self, rows, feedback))
+                elif not feedback and isinstance(last, _NodeBlock) and not last.feedback:
+                    # consecutive narrow levels (e.g. of a wire) are swept together
+                    last.rows.extend(rows)
+                else:
+                    self.blocks.append(_NodeBlock(self, rows, feedback))
+        for block in self.blocks:
+            block.build()
+
+        self.polarizations = np.zeros(len(self.nodes))
+        self.converged = True
+        self.evaluations = 0
+
+    def driver_couplings(self, i: int) -> list[tuple[int, float]]:
+        """Returns the indices of the drivers of node i with their couplings."""
+        node = self.nodes[i].value
+        if isinstance(node, Negator):
+            # a negator drives its output with the inverted polarization
+            return [(j, -1.0) for j in self.dag.predecessors[i]]
+        return [(j, self.coupling(node, self.nodes[j].value)) for j in self.dag.predecessors[i]]
+
+    def coupling(self, a, b) -> float:
+        """Returns the relative coupling between two adjacent components."""
+        if not (isinstance(a, Cell) and isinstance(b, Cell)):
+            # couplings to a gate stand in for the removed center cell
+            return 1.0
+
+        dist = euclidean_dist((a.x, a.y), (b.x, b.y))
+        if math.isclose(dist, math.sqrt(2)):
+            return self.diagonal_coupling
+        # the interaction between cells decays with the fifth power of their distance
+        return 1.0 / dist**5
+
+    def gains(self, clocks: tuple[float, float, float, float]) -> np.ndarray:
+        """Returns E_k / (2 * gamma) of every node for the given clock values."""
+        clocks = np.clip(np.array(clocks[:NUM_CLOCK_ZONES], dtype=float), -1.0, 1.0)
+        tunneling = self.min_tunneling + (self.max_tunneling - self.min_tunneling) * (
+            1 - clocks
+        ) / 2
+        return (self.kink_energy / (2 * tunneling))[self.zones]
+
+    def reset(self):
+        """Depolarizes all nodes."""
+        self.polarizations = np.zeros(len(self.nodes))
+
+    def solve(self, clocks: tuple[float, float, float, float]) -> int:
+        """Computes the polarizations of all nodes for the given clock values and
+        stores them in the components. Inputs and fixed cells keep their logic values
+        (0 or 1), which are read as polarizations -1 and 1.
+
+        If a feedback loop has not settled after max_iterations sweeps, the
+        polarizations of its last sweep are kept and self.converged is false. The total
+        number of node evaluations is stored in self.evaluations.
+
+        Args:
+            clocks (tuple[float, float, float, float]): The values of the four clocks.
+
+        Returns:
+            int: The largest number of sweeps a feedback loop needed (1 without feedback).
+        """
+        previous = self.polarizations
+        p = previous.copy()
+        p[self.driver_mask] = [
+            0.0 if n.value.polarization is None else 2.0 * n.value.polarization - 1.0
+            for n, is_driver in zip(self.nodes, self.driver_mask)
+            if is_driver
+        ]
+        gains = self.gains(clocks)
+        hold = self.hold_coupling
+
+        sweeps = 1
+        self.converged = True
+        self.evaluations = 0
+        for block in self.blocks:
+            block.load(p, previous, gains)
+            iterations = 0
+            while iterations < self.max_iterations:
+                iterations += 1
+                delta = block.sweep(hold)
+
+                # without feedback, one sweep in topological order is exact
+                if not block.feedback or delta < self.tolerance:
+                    break
+            else:
+                self.converged = False
+            block.store(p)
+
+            self.evaluations += iterations * len(block.rows)
+            sweeps = max(sweeps, iterations)
+
+        self.polarizations = p
+        for n, polarization, is_driver in zip(self.nodes, p.tolist(), self.driver_mask):
+            if not is_driver:
+                n.value.polarization = polarization
+
+        return sweeps
+
+
+class _VectorBlock:
+    """A block of nodes updated at once with a sparse matrix-vector product. Within
+    a feedback loop, every sweep uses the polarizations of the previous sweep."""
+
+    def __init__(self, solver: AnalogSolver, rows: list[int], feedback: bool):
+        self.solver = solver
+        self.rows = rows
+        self.feedback = feedback
+
+    def build(self):
+        """Builds the coupling matrix with one row per node of the block."""
+        weights, cols, row_indices = [], [], []
+        for r, i in enumerate(self.rows):
+            for j, weight in self.solver.driver_couplings(i):
+                weights.append(weight)
+                cols.append(j)
+                row_indices.append(r)
+        self.matrix = sparse.csr_matrix(
+            (weights, (row_indices, cols)),
+            shape=(len(self.rows), len(self.solver.nodes)),
+            dtype=float,
+        )
+        self.indices = np.array(self.rows, dtype=int)
+
+    def load(self, p: np.ndarray, previous: np.ndarray, gains: np.ndarray):
+        self.p = p
+        self.gains = gains[self.indices]
+        self.previous = previous[self.indices]
+
+    def sweep(self, hold: float) -> float:
+        """Updates the polarizations and returns the largest change."""
+        values = np.tanh(self.gains * (self.matrix @ self.p + hold * self.previous))
+        delta = float(np.max(np.abs(values - self.p[self.indices])))
+        self.p[self.indices] = values
+        return delta
+
+    def store(self, p: np.ndarray):
+        pass
+
+
+class _NodeBlock:
+    """A small block of nodes updated one after another in topological order. The
+    polarizations are copied into a list first, which is faster to index than an
+    array. Within a feedback loop, every node sees the updates made before it."""
+
+    def __init__(self, solver: AnalogSolver, rows: list[int], feedback: bool):
+        self.solver = solver
+        self.rows = rows
+        self.feedback = feedback
+
+    def build(self):
+        """Numbers the drivers outside the block first and the nodes of the block
+        after them, and stores the couplings by those local indices."""
+        couplings = [self.solver.driver_couplings(i) for i in self.rows]
+        rows = set(self.rows)
+        inputs = list(dict.fromkeys(j for c in couplings for j, _ in c if j not in rows))
+        local = {j: k for k, j in enumerate(inputs + self.rows)}
+
+        self.inputs = np.array(inputs, dtype=int)
+        self.indices = np.array(self.rows, dtype=int)
+        self.couplings = [
+            (local[i], [(local[j], weight) for j, weight in drivers])
+            for i, drivers in zip(self.rows, couplings)
+        ]
+
+    def load(self, p: np.ndarray, previous: np.ndarray, gains: np.ndarray):
+        self.values = p[self.inputs].tolist() + p[self.indices].tolist()
+        # indexed by local index like the values, the inputs are never read
+        padding = [0.0] * len(self.inputs)
+        self.gains = padding + gains[self.indices].tolist()
+        self.previous = padding + previous[self.indices].tolist()
+
+    def sweep(self, hold: float) -> float:
+        """Updates the polarizations and returns the largest change."""
+        values, gains, previous = self.values, self.gains, self.previous
+        delta = 0.0
+        for k, drivers in self.couplings:
+            field = hold * previous[k]
+            for j, weight in drivers:
+                field += weight * values[j]
+            value = math.tanh(gains[k] * field)
+            delta = max(delta, abs(value - values[k]))
+            values[k] = value
+        return delta
+
+    def store(self, p: np.ndarray):
+        p[self.indices] = self.values[len(self.inputs) :]
@@ -0,0 +1,415 @@
+from .graph import Graph
+from .mig import MIG, build_mig
+from .profiler import Profiler
+
+
+class BDD:
+    """A manager of reduced ordered binary decision diagrams with complement edges.
+
+    A function is represented by an edge, an int whose lowest bit tells whether
+    the function is complemented and whose remaining bits are the index of a node.
+    Node 0 is the terminal, so the edge 0 is the constant 1 (TRUE) and the edge 1
+    is the constant 0 (FALSE). The then-edge of every node is regular, which makes
+    the representation canonical: two functions are equal if and only if their
+    edges are equal, and complementing a function is a single xor.
+
+    All nodes are stored in a unique table, so no node exists twice, and the
+    results of ITE operations are cached in a computed table. The variable order
+    is the order in which the variables were added.
+    """
+
+    TRUE = 0
+    FALSE = 1
+
+    def __init__(self, variables: list[str] | None = None):
+        """Creates a new manager.
+
+        Args:
+            variables (list[str] | None): The names of the variables, in order.
+        """
+        self.variables = []
+        self.variable_indices = {}
+        # the terminal node has no variable, see level()
+        self.node_vars = [-1]
+        self.node_highs = [0]
+        self.node_lows = [0]
+        self.unique = {}
+        self.computed = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        for name in variables or []:
+            self.variable(name)
+
+    def variable(self, name: str) -> int:
+        """Returns the function of the variable with the given name, adding the
+        variable at the bottom of the order if it does not exist yet."""
+        if name not in self.variable_indices:
+            self.variable_indices[name] = len(self.variables)
+            self.variables.append(name)
+        return self._make(self.variable_indices[name], self.TRUE, self.FALSE)
+
+    def constant(self, value: int) -> int:
+        """Returns the constant function with the given logic value (0 or 1)."""
+        return self.TRUE if value else self.FALSE
+
+    def level(self, f: int) -> int:
+        """Returns the position of the top variable of f in the order. The
+        terminal is below all variables."""
+        node = f >> 1
+        if node == 0:
+            return len(self.variables)
+        return self.node_vars[node]
+
+    def _make(self, var: int, high: int, low: int) -> int:
+        """Returns the edge to the node (var, high, low), creating it if needed."""
+        if high == low:
+            return high
+
+        # keep the then-edge regular, complement the edge to the node instead
+        complemented = high & 1
+        if complemented:
+            high ^= 1
+            low ^= 1
+
+        key = (var, high, low)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.node_vars)
+            self.node_vars.append(var)
+            self.node_highs.append(high)
+            self.node_lows.append(low)
+            self.unique[key] = node
+
+        return (node << 1) | complemented
+
+    def _cofactors(self, f: int, var: int) -> tuple[int, int]:
+        node = f >> 1
+        if node == 0 or self.node_vars[node] != var:
+            return f, f
+        complemented = f & 1
+        return self.node_highs[node] ^ complemented, self.node_lows[node] ^ complemented
+
+    def ite(self, f: int, g: int, h: int) -> int:
+        """Returns the function "if f then g else h".
+
+        The recursion depth is bounded by the number of variables.
+        """
+        if f == self.TRUE:
+            return g
+        if f == self.FALSE:
+            return h
+
+        # simplify the arguments that are equal to the condition
+        if g == f:
+            g = self.TRUE
+        elif g == f ^ 1:
+            g = self.FALSE
+        if h == f:
+            h = self.FALSE
+        elif h == f ^ 1:
+            h = self.TRUE
+
+        if g == h:
+            return g
+        if g == self.TRUE and h == self.FALSE:
+            return f
+        if g == self.FALSE and h == self.TRUE:
+            return f ^ 1
+
+        # normalize the arguments, so equivalent calls share a computed table entry
+        if f & 1:
+            f ^= 1
+            g, h = h, g
+        complemented = g & 1
+        if complemented:
+            g ^= 1
+            h ^= 1
+
+        key = (f, g, h)
+        result = self.computed.get(key)
+        if result is None:
+            self.cache_misses += 1
+            var = min(self.level(f), self.level(g), self.level(h))
+            f_high, f_low = self._cofactors(f, var)
+            g_high, g_low = self._cofactors(g, var)
+            h_high, h_low = self._cofactors(h, var)
+            result = self._make(
+                var,
+                self.ite(f_high, g_high, h_high),
+                self.ite(f_low, g_low, h_low),
+            )
+            self.computed[key] = result
+        else:
+            self.cache_hits += 1
+
+        return result ^ complemented
+
+    def negate(self, f: int) -> int:
+        return f ^ 1
+
+    def and_(self, f: int, g: int) -> int:
+        return self.ite(f, g, self.FALSE)
+
+    def or_(self, f: int, g: int) -> int:
+        return self.ite(f, self.TRUE, g)
+
+    def xor(self, f: int, g: int) -> int:
+        return self.ite(f, g ^ 1, g)
+
+    def majority(self, f: int, g: int, h: int) -> int:
+        return self.ite(f, self.or_(g, h), self.and_(g, h))
+
+    def evaluate(self, f: int, assignment: dict[str, int]) -> int:
+        """Returns the value of f for the given variable values (missing variables are 0)."""
+        complemented = f & 1
+        node = f >> 1
+        while node != 0:
+            if assignment.get(self.variables[self.node_vars[node]], 0):
+                edge = self.node_highs[node]
+            else:
+                edge = self.node_lows[node]
+            complemented ^= edge & 1
+            node = edge >> 1
+        return 1 - complemented
+
+    def sat_count(self, f: int) -> int:
+        """Returns the number of assignments of all variables for which f is 1.
+
+        The recursion depth is bounded by the number of variables.
+        """
+        num_variables = len(self.variables)
+        counts = {}
+
+        def count(edge: int) -> int:
+            # number of satisfying assignments of the variables from level(edge) on
+            node = edge >> 1
+            if node == 0:
+                result = 1
+            elif node in counts:
+                result = counts[node]
+            else:
+                var = self.node_vars[node]
+                high = self.node_highs[node]
+                low = self.node_lows[node]
+                result = (count(high) << (self.level(high) - var - 1)) + (
+                    count(low) << (self.level(low) - var - 1)
+                )
+                counts[node] = result
+            if edge & 1:
+                result = (1 << (num_variables - self.level(edge))) - result
+            return result
+
+        return count(f) << self.level(f)
+
+    def cubes(self, f: int):
+        """Yields the disjoint cubes (paths to TRUE) of f, as dictionaries that map
+        the variables on the path to their values. Variables that are not in a cube
+        can take any value."""
+        stack = [(f, {})]
+        while len(stack) > 0:
+            edge, cube = stack.pop()
+            if edge == self.TRUE:
+                yield cube
+                continue
+            if edge == self.FALSE:
+                continue
+
+            node = edge >> 1
+            complemented = edge & 1
+            name = self.variables[self.node_vars[node]]
+            stack.append((self.node_lows[node] ^ complemented, {**cube, name: 0}))
+            stack.append((self.node_highs[node] ^ complemented, {**cube, name: 1}))
+
+    def support(self, f: int) -> list[str]:
+        """Returns the names of the variables f depends on, in order."""
+        seen = set()
+        variables = set()
+        stack = [f >> 1]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node == 0 or node in seen:
+                continue
+            seen.add(node)
+            variables.add(self.node_vars[node])
+            stack.append(self.node_highs[node] >> 1)
+            stack.append(self.node_lows[node] >> 1)
+        return [self.variables[v] for v in sorted(variables)]
+
+    def size(self, f: int) -> int:
+        """Returns the number of nodes of f, including the terminal."""
+        seen = set()
+        stack = [f >> 1]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if node != 0:
+                stack.append(self.node_highs[node] >> 1)
+                stack.append(self.node_lows[node] >> 1)
+        return len(seen)
+
+
+class CircuitBDD:
+    """The BDDs of all outputs of a circuit graph."""
+
+    def __init__(
+        self,
+        graph: Graph,
+        manager: BDD | None = None,
+        profiler: Profiler | None = None,
+        mig: MIG | None = None,
+    ):
+        """Builds the BDDs of the outputs of the graph from its minimized MIG.
+
+        Args:
+            graph (Graph): The circuit graph (after structure recognition).
+            manager (BDD | None): The manager to build the BDDs in. Circuits that
+            share a manager can be compared directly; inputs with the same name are
+            the same variable.
+            profiler (Profiler | None): Profiler for the "mig" and "symbolic" stages.
+            mig (MIG | None): The MIG of the graph, built with build_mig if not given.
+        """
+        self.graph = graph
+        self.manager = manager if manager is not None else BDD()
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self.mig = mig if mig is not None else build_mig(graph, profiler=self.profiler)
+        self.input_names = list(self.mig.input_names)
+        self.output_names = list(self.mig.output_names)
+
+        with self.profiler.stage("symbolic"):
+            nodes = len(self.manager.node_vars)
+            hits = self.manager.cache_hits
+            misses = self.manager.cache_misses
+
+            for name in self.input_names:
+                self.manager.variable(name)
+            # None for outputs that are never polarized
+            self.outputs = self.mig.to_algebra(self.manager)
+
+            self.profiler.count("bdd.nodes", len(self.manager.node_vars) - nodes)
+            self.profiler.count("bdd.cache_hits", self.manager.cache_hits - hits)
+            self.profiler.count("bdd.cache_misses", self.manager.cache_misses - misses)
+
+    def output(self, name: str) -> int | None:
+        """Returns the BDD of the output with the given name."""
+        return self.outputs[self.output_names.index(name)]
+
+    def evaluate(self, input_values: list[int]) -> list[int | None]:
+        """Returns the output values for the given input values (in input order)."""
+        assignment = dict(zip(self.input_names, input_values))
+        return [
+            None if f is None else self.manager.evaluate(f, assignment)
+            for f in self.outputs
+        ]
+
+    def iter_rows(self):
+        """Yields the truth table rows in the same format and order as
+        Simulator.iter_simulate, so they can be written or converted the same way."""
+        num_inputs = len(self.input_names)
+        for comb in range(2**num_inputs):
+            input_vector = [(comb >> (num_inputs - 1 - i)) & 1 for i in range(num_inputs)]
+            yield {
+                "combination": comb,
+                "inputs": input_vector,
+                "outputs": self.evaluate(input_vector),
+            }
+
+    def truth_table(self) -> dict:
+        """Returns the truth table in the same format as Simulator.simulate."""
+        return {
+            "inputs": list(self.input_names),
+            "outputs": list(self.output_names),
+            "values": [row["outputs"] for row in self.iter_rows()],
+        }
+
+    def minterm_counts(self) -> dict[str, int | None]:
+        """Returns the number of input combinations for which each output is 1,
+        counted directly on the BDDs."""
+        # the manager may hold variables of other circuits, which the outputs don't depend on
+        extra_variables = len(self.manager.variables) - len(set(self.input_names))
+        return {
+            name: None if f is None else self.manager.sat_count(f) >> extra_variables
+            for name, f in zip(self.output_names, self.outputs)
+        }
+
+    def summary(self) -> dict:
+        """Returns the minterm count, BDD size and support of every output,
+        and the size and depth of the MIG."""
+        counts = self.minterm_counts()
+        outputs = {}
+        for name, f in zip(self.output_names, self.outputs):
+            outputs[name] = {
+                "minterms": counts[name],
+                "bdd_nodes": None if f is None else self.manager.size(f),
+                "support": None if f is None else self.manager.support(f),
+            }
+        return {
+            "inputs": list(self.input_names),
+            "outputs": outputs,
+            "mig": {
+                "graph_nodes": len(self.graph.nodes),
+                "gates": self.mig.size(),
+                "depth": self.mig.depth(),
+            },
+        }
+
+
+def check_equivalence(
+    graph_a: Graph, graph_b: Graph, profiler: Profiler | None = None
+) -> dict:
+    """Checks whether two circuits compute the same functions. Inputs and outputs
+    are matched by name.
+
+    Args:
+        graph_a (Graph): The first circuit graph.
+        graph_b (Graph): The second circuit graph.
+        profiler (Profiler | None): Profiler for the "symbolic" stage.
+
+    Returns:
+        dict: Whether the circuits are equivalent ("equivalent"), the result for
+        every common output ("outputs"), the outputs that exist in only one of the
+        circuits ("unmatched") and, if an output differs, an input assignment for
+        which it does ("counterexample").
+    """
+    manager = BDD()
+    a = CircuitBDD(graph_a, manager, profiler)
+    b = CircuitBDD(graph_b, manager, profiler)
+
+    outputs = {}
+    counterexample = None
+    for name, f in zip(a.output_names, a.outputs):
+        if name not in b.output_names:
+            continue
+        g = b.output(name)
+        if f is None or g is None:
+            outputs[name] = f is None and g is None
+            difference = manager.TRUE if not outputs[name] else manager.FALSE
+        else:
+            outputs[name] = f == g
+            difference = manager.xor(f, g)
+
+        if counterexample is None and difference != manager.FALSE:
+            cube = next(manager.cubes(difference))
+            assignment = {v: cube.get(v, 0) for v in manager.variables}
+            counterexample = {
+                "inputs": assignment,
+                "outputs_a": dict(
+                    zip(a.output_names, a.evaluate([assignment[v] for v in a.input_names]))
+                ),
+                "outputs_b": dict(
+                    zip(b.output_names, b.evaluate([assignment[v] for v in b.input_names]))
+                ),
+            }
+
+    unmatched = [n for n in a.output_names if n not in b.output_names] + [
+        n for n in b.output_names if n not in a.output_names
+    ]
+
+    return {
+        "equivalent": len(unmatched) == 0 and all(outputs.values()),
+        "outputs": outputs,
+        "unmatched": unmatched,
+        "counterexample": counterexample,
+    }
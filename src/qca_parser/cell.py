@@ -1,4 +1,4 @@
-from component import Component
+from .component import Component
 from enum import Enum
 
 
@@ -57,20 +57,16 @@ class Cell(Component):
     def get_shape(self):
         return "dot"
 
-    def determine_polarization(self, node, graph, visited, clk0, clk1, clk2, clk3):
+    def determine_polarization(self, node, graph, clocks):
         cell = node.value
 
         if cell.function == CellFunction.INPUT:
             # the polarization of an input cell is determined by the clock
             print("The cell is an input cell")
-            if cell.clock == 0:
-                cell.polarization = clk0
-            elif cell.clock == 1:
-                cell.polarization = clk1
-            elif cell.clock == 2:
-                cell.polarization = clk2
+            if cell.clock in (0, 1, 2):
+                cell.polarization = clocks[cell.clock]
             else:
-                cell.polarization = clk3
+                cell.polarization = clocks[3]
         else:
             neighbors = graph.component_neighbors(cell)
             polarized_neighbors = []
@@ -84,3 +80,11 @@ class Cell(Component):
                 return None
             else:
                 return polarized_neighbors[0].value.polarization
+
+    def determine_function(self, node, graph, values, algebra):
+        # a cell takes the function of its first resolved neighbor,
+        # just like it takes its polarization in determine_polarization
+        for n in graph.node_neighbors(node):
+            if n in values:
+                return values[n]
+        return None
@@ -0,0 +1,430 @@
+from .gate import Gate
+from .parser import QCAParser
+from .profiler import Profiler
+from .simulator import SimulationMode, Simulator
+from contextlib import contextmanager, redirect_stdout
+import argparse
+import json
+import os
+import sys
+
+
+@contextmanager
+def quiet(verbose: bool):
+    """Silences the progress output of the parser and simulator unless verbose is set."""
+    if verbose:
+        yield
+        return
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        yield
+
+
+def add_simulation_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--cycles", type=int, default=10, help="number of clock cycles")
+    parser.add_argument("--step", type=float, default=0.01, help="simulation time step")
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="evaluate clock zones only during their active phase",
+    )
+    parser.add_argument(
+        "--analog",
+        action="store_true",
+        help="compute continuous polarizations (bistable approximation)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="skip steps at which nothing changes and stop once the outputs settle",
+    )
+    parser.add_argument(
+        "--settle-window",
+        type=int,
+        default=4,
+        help="number of repeated steps after which a combination is settled",
+    )
+    parser.add_argument(
+        "--levelized",
+        action="store_true",
+        help="evaluate the cells in one pass in signal flow order (logic mode only)",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="only simulate the cone of influence of the outputs",
+    )
+
+
+def create_simulator(
+    parser: QCAParser, args: argparse.Namespace, profiler: Profiler
+) -> Simulator:
+    with quiet(args.verbose):
+        return Simulator(parser.graph, profiler=profiler, prune=args.prune)
+
+
+def simulation_rows(simulator: Simulator, args: argparse.Namespace):
+    return simulator.iter_simulate(
+        args.cycles,
+        args.step,
+        pipelined=args.pipelined,
+        adaptive=args.adaptive,
+        settle_window=args.settle_window,
+        mode=SimulationMode.ANALOG if args.analog else SimulationMode.LOGIC,
+        levelized=args.levelized,
+    )
+
+
+def symbolic_circuit(parser: QCAParser, profiler: Profiler):
+    from .bdd import CircuitBDD
+
+    return CircuitBDD(parser.graph, profiler=profiler)
+
+
+def parse_design(args: argparse.Namespace, profiler: Profiler) -> QCAParser:
+    parser = QCAParser(profiler=profiler)
+    with quiet(args.verbose):
+        parser.parse(args.file, workers=args.jobs)
+    return parser
+
+
+def command_parse(args: argparse.Namespace, profiler: Profiler) -> int:
+    parser = parse_design(args, profiler)
+
+    gates = {}
+    for n in parser.graph.nodes:
+        if not isinstance(n.value, Gate):
+            continue
+        gates[n.value.type.value] = gates.get(n.value.type.value, 0) + 1
+
+    summary = {
+        "file": args.file,
+        "cells": len(parser.cells),
+        "nodes": len(parser.graph.nodes),
+        "connections": len(parser.graph.connections),
+        "gates": gates,
+    }
+
+    cone = parser.graph.cone_of_influence()
+    summary["cone_of_influence"] = {
+        "live": len(cone["live"]),
+        "dropped": len(cone["dropped"]),
+        "islands": cone["islands"],
+        "dangling": cone["dangling"],
+        "unused_inputs": cone["unused_inputs"],
+    }
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+def command_simulate(args: argparse.Namespace, profiler: Profiler) -> int:
+    parser = parse_design(args, profiler)
+    simulator = create_simulator(parser, args, profiler)
+    input_names = [n.value.get_name() for n in simulator.input_nodes()]
+    output_names = [n.value.get_name() for n in simulator.output_nodes()]
+
+    if args.plot:
+        with quiet(args.verbose):
+            truth_table = simulator.simulate(
+                args.cycles,
+                args.step,
+                pipelined=args.pipelined,
+                adaptive=args.adaptive,
+                settle_window=args.settle_window,
+                mode=SimulationMode.ANALOG if args.analog else SimulationMode.LOGIC,
+                levelized=args.levelized,
+            )
+        print(json.dumps(truth_table))
+        return 0
+
+    from . import writer
+
+    out = sys.stdout if args.output is None else open(args.output, "w", newline="")
+    try:
+        if args.symbolic:
+            from .mig import build_mig
+            from .subcircuit import SubcircuitEvaluator
+
+            mig = build_mig(parser.graph, profiler=profiler)
+            rows = SubcircuitEvaluator(mig, profiler=profiler).iter_rows()
+        else:
+            rows = simulation_rows(simulator, args)
+        # the simulator prints progress while the rows are generated
+        with quiet(args.verbose):
+            if args.format == "csv":
+                writer.write_csv(rows, out, input_names, output_names)
+            else:
+                writer.write_jsonl(rows, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def command_convert(args: argparse.Namespace, profiler: Profiler) -> int:
+    from .converter import import_bdd_to_grenmlin, import_rows_to_grenmlin
+    from .mig import build_mig
+    from .subcircuit import SubcircuitEvaluator
+
+    parser = parse_design(args, profiler)
+    if args.symbolic:
+        print(import_bdd_to_grenmlin(symbolic_circuit(parser, profiler)))
+        return 0
+
+    # one gene per true row of the truth table of the minimized MIG
+    mig = build_mig(parser.graph, profiler=profiler)
+    rows = SubcircuitEvaluator(mig, profiler=profiler).iter_rows()
+    print(import_rows_to_grenmlin(mig.input_names, mig.output_names, rows))
+    return 0
+
+
+def command_analyze(args: argparse.Namespace, profiler: Profiler) -> int:
+    from .dag import SignalFlowDAG
+    from .subcircuit import SubcircuitEvaluator
+
+    parser = parse_design(args, profiler)
+    circuit = symbolic_circuit(parser, profiler)
+    summary = circuit.summary()
+    summary["subcircuits"] = SubcircuitEvaluator(circuit.mig, profiler=profiler).summary()
+    summary["signal_flow"] = SignalFlowDAG(parser.graph, profiler=profiler).summary()
+    print(json.dumps({"file": args.file, **summary}, indent=2))
+    return 0
+
+
+def command_equiv(args: argparse.Namespace, profiler: Profiler) -> int:
+    from .bdd import check_equivalence
+
+    parser_a = QCAParser(profiler=profiler)
+    parser_b = QCAParser(profiler=profiler)
+    with quiet(args.verbose):
+        parser_a.parse(args.file_a, workers=args.jobs)
+        parser_b.parse(args.file_b, workers=args.jobs)
+
+    result = check_equivalence(parser_a.graph, parser_b.graph, profiler=profiler)
+    print(json.dumps(result, indent=2))
+    return 0 if result["equivalent"] else 1
+
+
+def command_faults(args: argparse.Namespace, profiler: Profiler) -> int:
+    from .fault import FaultSimulator, FaultType
+
+    parser = parse_design(args, profiler)
+    simulator = FaultSimulator(parser.graph, profiler=profiler)
+    types = None if args.types is None else [FaultType[t] for t in args.types]
+    report = simulator.run(
+        simulator.fault_list(types), workers=args.workers, chunk_size=args.chunk_size
+    )
+    if not args.all:
+        report["results"] = [r for r in report["results"] if not r["detected"]]
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def command_sample(args: argparse.Namespace, profiler: Profiler) -> int:
+    from .mig import build_mig
+    from .sampling import MonteCarloSampler
+
+    parser = parse_design(args, profiler)
+    reference = None
+    if args.reference is not None:
+        reference_parser = QCAParser(profiler=profiler)
+        with quiet(args.verbose):
+            reference_parser.parse(args.reference, workers=args.jobs)
+        reference = build_mig(reference_parser.graph, profiler=profiler)
+
+    try:
+        sampler = MonteCarloSampler(
+            build_mig(parser.graph, profiler=profiler),
+            batch_size=args.batch_size,
+            method=args.method,
+            seed=args.seed,
+            confidence=args.confidence,
+            tolerance=args.tolerance,
+            max_samples=args.max_samples,
+            time_limit=args.time_limit,
+            reference=reference,
+            profiler=profiler,
+        )
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    for report in sampler.iter_batches():
+        if args.stream:
+            print(json.dumps(report), flush=True)
+    if not args.stream:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+def command_visualize(args: argparse.Namespace, profiler: Profiler) -> int:
+    parser = parse_design(args, profiler)
+    with quiet(args.verbose):
+        parser.visualize_graph(args.output)
+    return 0
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="qca-parser", description="Parse and simulate QCADesigner designs."
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="show parser and simulator output"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="write a JSON profiling report to FILE ('-' for stderr)",
+    )
+    parser.add_argument(
+        "--cprofile", metavar="FILE", help="write cProfile statistics to FILE"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes used to read the .qca file",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parse_parser = subparsers.add_parser("parse", help="parse a design and summarize it")
+    parse_parser.add_argument("file", help="the .qca file")
+    parse_parser.set_defaults(handler=command_parse)
+
+    simulate_parser = subparsers.add_parser(
+        "simulate", help="simulate all input combinations of a design"
+    )
+    simulate_parser.add_argument("file", help="the .qca file")
+    add_simulation_arguments(simulate_parser)
+    simulate_parser.add_argument(
+        "-o", "--output", help="write the rows to this file instead of stdout"
+    )
+    simulate_parser.add_argument(
+        "--format", choices=["csv", "jsonl"], default="csv", help="output format"
+    )
+    simulate_parser.add_argument(
+        "--plot",
+        action="store_true",
+        help="plot the waveforms and print the truth table as JSON",
+    )
+    simulate_parser.add_argument(
+        "--symbolic",
+        action="store_true",
+        help="compute the truth table from the minimized MIG instead of simulating",
+    )
+    simulate_parser.set_defaults(handler=command_simulate)
+
+    convert_parser = subparsers.add_parser(
+        "convert", help="convert the truth table of a design to a GRN (needs GRNmlin)"
+    )
+    convert_parser.add_argument("file", help="the .qca file")
+    convert_parser.add_argument(
+        "--symbolic",
+        action="store_true",
+        help="build one gene per BDD cube instead of one per truth table row",
+    )
+    convert_parser.set_defaults(handler=command_convert)
+
+    analyze_parser = subparsers.add_parser(
+        "analyze", help="build the BDDs of the outputs and count their minterms"
+    )
+    analyze_parser.add_argument("file", help="the .qca file")
+    analyze_parser.set_defaults(handler=command_analyze)
+
+    equiv_parser = subparsers.add_parser(
+        "equiv",
+        help="check whether two designs compute the same functions (exit status 1 if not)",
+    )
+    equiv_parser.add_argument("file_a", help="the first .qca file")
+    equiv_parser.add_argument("file_b", help="the second .qca file")
+    equiv_parser.set_defaults(handler=command_equiv)
+
+    faults_parser = subparsers.add_parser(
+        "faults", help="simulate cell faults and report the fault coverage"
+    )
+    faults_parser.add_argument("file", help="the .qca file")
+    faults_parser.add_argument(
+        "--types",
+        nargs="+",
+        choices=["CELL_DELETION", "STUCK_AT_0", "STUCK_AT_1", "BROKEN_CONNECTION"],
+        help="the fault types to simulate (all by default)",
+    )
+    faults_parser.add_argument(
+        "--workers", type=int, help="number of worker processes (default: CPU count)"
+    )
+    faults_parser.add_argument(
+        "--chunk-size", type=int, default=1024, help="faults simulated together per worker task"
+    )
+    faults_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="list every fault in the report, not only the undetected ones",
+    )
+    faults_parser.set_defaults(handler=command_faults)
+
+    sample_parser = subparsers.add_parser(
+        "sample", help="estimate output statistics from random input vectors"
+    )
+    sample_parser.add_argument("file", help="the .qca file")
+    sample_parser.add_argument(
+        "--method", choices=["random", "sobol"], default="random", help="how the input vectors are drawn"
+    )
+    sample_parser.add_argument("--seed", type=int, help="random seed")
+    sample_parser.add_argument(
+        "--batch-size", type=int, default=4096, help="input vectors evaluated at once"
+    )
+    sample_parser.add_argument(
+        "--confidence", type=float, default=0.95, help="confidence level of the intervals"
+    )
+    sample_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.01,
+        help="stop once every interval half width is at most this",
+    )
+    sample_parser.add_argument(
+        "--max-samples", type=int, default=1 << 24, help="maximum number of input vectors"
+    )
+    sample_parser.add_argument(
+        "--time-limit", type=float, help="maximum sampling time in seconds"
+    )
+    sample_parser.add_argument(
+        "--reference", metavar="FILE", help="a .qca design to compare the outputs with"
+    )
+    sample_parser.add_argument(
+        "--stream", action="store_true", help="print the statistics after every batch (JSON lines)"
+    )
+    sample_parser.set_defaults(handler=command_sample)
+
+    visualize_parser = subparsers.add_parser(
+        "visualize", help="render the cell graph to an HTML file"
+    )
+    visualize_parser.add_argument("file", help="the .qca file")
+    visualize_parser.add_argument(
+        "-o", "--output", default="graph.html", help="the output HTML file"
+    )
+    visualize_parser.set_defaults(handler=command_visualize)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_argument_parser().parse_args(argv)
+
+    profiler = Profiler(
+        enabled=args.profile is not None or args.cprofile is not None,
+        cprofile=args.cprofile is not None,
+    )
+    result = args.handler(args, profiler)
+
+    if args.profile == "-":
+        print(profiler.to_json(), file=sys.stderr)
+    elif args.profile is not None:
+        with open(args.profile, "w") as f:
+            f.write(profiler.to_json())
+    if args.cprofile is not None:
+        profiler.dump_cprofile(args.cprofile)
+
+    return result
+
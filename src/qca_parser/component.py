@@ -1,7 +1,7 @@
 class Component:
     def __init__(
         self,
-        polarization: int | None = None,
+        polarization: int | float | None = None,
     ):
         self.polarization = polarization
 
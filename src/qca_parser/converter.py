@@ -1,33 +1,64 @@
-import simulator, grn
-import numpy as np
-
 def import_to_grenmlin(simulator_output):
     #simulator_output={'inputs': ['s', 'b', 'a'], 'outputs': ['o'], 'values': [[0], [0], [0], [1], [0], [1], [1], [1]]}
+    num_inputs = len(simulator_output['inputs'])
+    rows = (
+        {'inputs': [(i >> (num_inputs-1-j)) & 1 for j in range(num_inputs)], 'outputs': values}
+        for i, values in enumerate(simulator_output['values'])
+    )
+    return import_rows_to_grenmlin(simulator_output['inputs'], simulator_output['outputs'], rows)
+
+def import_rows_to_grenmlin(input_names, output_names, rows):
+    # rows can be any iterable of truth table rows, e.g. Simulator.iter_simulate(...),
+    # every row is turned into a gene as soon as it arrives
+    import grn  # GRNmlin, only needed for the conversion
+
     new_grn = grn.grn()
-    truth_table = []
     products = []
 
-    for i in range(len(simulator_output['values'])):
-        table_line = []
-        values = (len(simulator_output['inputs'])-len(bin(i)[2:]))*'0' + bin(i)[2:] + str(simulator_output['values'][i])[1]
-        for j in range(len(values)):
-            table_line.append(int(values[j]))
-        truth_table.append(table_line)
-
-    for input in simulator_output['inputs']:
+    for input in input_names:
         input=input.replace(" ", "_")
         new_grn.add_input_species(input)
 
-    for output in simulator_output['outputs']:
+    for output in output_names:
         output=output.replace(" ", "_")
         new_grn.add_species(output, 0.1)
         products.append({'name': output})
 
-    for i in range(len(truth_table)):
+    for row in rows:
         regulators = []
-        if truth_table[i][len(truth_table[i])-1]==1:
-            for j in range(len(truth_table[i])-1): 
-                regulators.append({'name': simulator_output['inputs'][j].replace(" ", "_"), 'type': (1 if truth_table[i][j]==1 else -1), 'Kd': 5, 'n': 2})
+        if row['outputs'][0]==1:
+            for j in range(len(row['inputs'])):
+                regulators.append({'name': input_names[j].replace(" ", "_"), 'type': (1 if row['inputs'][j]==1 else -1), 'Kd': 5, 'n': 2})
             new_grn.add_gene(10, regulators, products)
             
     return new_grn
+
+def import_bdd_to_grenmlin(circuit):
+    # circuit is a bdd.CircuitBDD; instead of one gene per true row of the truth table,
+    # one gene is added per cube of the first output, regulated only by the inputs
+    # that appear in the cube, so the inputs are never enumerated
+    import grn  # GRNmlin, only needed for the conversion
+
+    new_grn = grn.grn()
+    products = []
+
+    for input in circuit.input_names:
+        input=input.replace(" ", "_")
+        new_grn.add_input_species(input)
+
+    for output in circuit.output_names:
+        output=output.replace(" ", "_")
+        new_grn.add_species(output, 0.1)
+        products.append({'name': output})
+
+    if len(circuit.outputs) == 0 or circuit.outputs[0] is None:
+        return new_grn
+
+    for cube in circuit.manager.cubes(circuit.outputs[0]):
+        regulators = []
+        for name in circuit.input_names:
+            if name in cube:
+                regulators.append({'name': name.replace(" ", "_"), 'type': (1 if cube[name]==1 else -1), 'Kd': 5, 'n': 2})
+        new_grn.add_gene(10, regulators, products)
+
+    return new_grn
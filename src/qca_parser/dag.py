@@ -0,0 +1,306 @@
+from .cell import Cell, CellFunction
+from .graph import Graph, GraphNode
+from .majority_gate import MajorityGate
+from .profiler import Profiler
+from .scheduler import NUM_CLOCK_ZONES, clock_zone
+from math import inf
+import heapq
+
+
+class SignalFlowDAG:
+    """Orients the connections of a circuit graph in the direction the signals flow.
+
+    The parser and the structure recognition connect adjacent components in both
+    directions, so the graph itself says nothing about which neighbor drives which.
+    Every pair of connected nodes is oriented as follows:
+    - input and fixed cells drive their neighbors and are never driven by them,
+    - a node drives a neighbor in the next clock zone (Cell.clock increasing modulo 4),
+    - otherwise the node with the smaller flow key drives the other one. The flow key
+    of a node is the number of clock zone steps and hops on the shortest path from
+    the input and fixed cells, compared in that order (see _flow_keys for gates).
+    Of two neighbors with equal keys, the one that comes first in graph.nodes
+    drives the other, so they don't form a cycle. The cycles left after orientation
+    (feedback loops along the clock zones) are condensed into strongly connected
+    components, which form a DAG.
+    """
+
+    def __init__(self, graph: Graph, profiler: Profiler | None = None):
+        """Orients the graph and condenses its cycles.
+
+        Args:
+            graph (Graph): The circuit graph (after structure recognition).
+            profiler (Profiler | None): Profiler for the "dag" stage.
+        """
+        self.graph = graph
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+
+        with self.profiler.stage("dag"):
+            self.nodes = list(graph.nodes)
+            self.zones = [clock_zone(n.value) for n in self.nodes]
+            self.drivers = [
+                isinstance(n.value, Cell)
+                and n.value.function in (CellFunction.INPUT, CellFunction.FIXED)
+                for n in self.nodes
+            ]
+            self.neighbors = self._neighbors()
+            self.keys = self._flow_keys()
+
+            self.predecessors = [[] for _ in self.nodes]
+            self.successors = [[] for _ in self.nodes]
+            for i, neighbors in enumerate(self.neighbors):
+                for j in neighbors:
+                    direction = self._direction(i, j)
+                    if direction is None:
+                        continue
+                    if direction > 0:
+                        self.successors[i].append(j)
+                    else:
+                        self.predecessors[i].append(j)
+
+            # Tarjan emits the components sinks first
+            self.components = self._strongly_connected_components()[::-1]
+            self.component_of = [0] * len(self.nodes)
+            for c, component in enumerate(self.components):
+                for i in component:
+                    self.component_of[i] = c
+            self.component_levels = self._levels()
+            self._fanin = None
+            self.converged = True
+
+            self.profiler.count("dag.edges", sum(len(s) for s in self.successors))
+            self.profiler.count("dag.components", len(self.components))
+
+    def _neighbors(self) -> list[list[int]]:
+        """Returns the neighbors of every node (connected in either direction) as
+        indices, in the order of the node's own connections."""
+        indices = self.graph.node_indices()
+        adjacency = self.graph.adjacency()
+        neighbors = [[indices[m] for m in adjacency.get(n, [])] for n in self.nodes]
+        for c in self.graph.connections:
+            neighbors[indices[c.sink]].append(indices[c.source])
+        return [list(dict.fromkeys(ns)) for ns in neighbors]
+
+    def _flow_keys(self) -> list[tuple]:
+        """Returns the flow key (clock zone steps, hops) of every node.
+
+        The keys are found with a variant of Dijkstra's algorithm starting at the
+        input and fixed cells: a node is reached once enough of its neighbors have
+        been reached, one for cells and negators, all but one (the output) for
+        majority gates, and its key is the largest of the keys it was reached with
+        from those neighbors plus the step from them. Otherwise a gate would be
+        reached early through its first inputs, and the signal would seem to flow
+        from the gate into its remaining input wires.
+        """
+        n = len(self.nodes)
+        thresholds = [
+            max(len(self.neighbors[i]) - 1, 1) if isinstance(node.value, MajorityGate) else 1
+            for i, node in enumerate(self.nodes)
+        ]
+        candidates = [[] for _ in range(n)]
+        keys = [None] * n
+        heap = [((0, 0), i) for i, is_driver in enumerate(self.drivers) if is_driver]
+        heapq.heapify(heap)
+
+        while True:
+            while len(heap) > 0:
+                key, i = heapq.heappop(heap)
+                if keys[i] is not None:
+                    continue
+                keys[i] = key
+                steps, hops = key
+                for j in self.neighbors[i]:
+                    if keys[j] is not None:
+                        continue
+                    step = (self.zones[j] - self.zones[i]) % NUM_CLOCK_ZONES
+                    candidates[j].append((steps + step, hops + 1))
+                    if len(candidates[j]) >= thresholds[j]:
+                        heapq.heappush(heap, (sorted(candidates[j])[thresholds[j] - 1], j))
+
+            # gates that are never reached by enough neighbors (e.g. with an input
+            # wire that starts nowhere) are reached by the neighbors they have
+            stalled = [i for i in range(n) if keys[i] is None and len(candidates[i]) > 0]
+            if len(stalled) == 0:
+                break
+            for i in stalled:
+                heapq.heappush(heap, (max(candidates[i]), i))
+
+        return [(inf, inf) if key is None else key for key in keys]
+
+    def _direction(self, i: int, j: int) -> int | None:
+        """Returns 1 if node i drives node j, -1 if j drives i and None if no signal
+        flows between them (two drivers)."""
+        if self.drivers[i] or self.drivers[j]:
+            if self.drivers[i] and self.drivers[j]:
+                return None
+            return 1 if self.drivers[i] else -1
+
+        step = (self.zones[j] - self.zones[i]) % NUM_CLOCK_ZONES
+        if step == 1:
+            return 1
+        if step == NUM_CLOCK_ZONES - 1:
+            return -1
+
+        if self.keys[i] < self.keys[j]:
+            return 1
+        if self.keys[i] > self.keys[j]:
+            return -1
+        # equal keys, e.g. the cells next to each other in two parallel branches
+        return 1 if i < j else -1
+
+    def _strongly_connected_components(self) -> list[list[int]]:
+        """Returns the strongly connected components of the oriented graph in
+        reverse topological order (Tarjan's algorithm with an explicit stack)."""
+        n = len(self.nodes)
+        index = [-1] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack = []
+        components = []
+        counter = 0
+
+        for root in range(n):
+            if index[root] != -1:
+                continue
+
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, 0)]
+
+            while len(work) > 0:
+                v, pos = work[-1]
+                successors = self.successors[v]
+                if pos < len(successors):
+                    work[-1] = (v, pos + 1)
+                    w = successors[pos]
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, 0))
+                    elif on_stack[w]:
+                        low[v] = min(low[v], index[w])
+                    continue
+
+                work.pop()
+                if len(work) > 0:
+                    u = work[-1][0]
+                    low[u] = min(low[u], low[v])
+
+                if low[v] == index[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(sorted(component))
+
+        return components
+
+    def _levels(self) -> list[int]:
+        """Returns the level of every component: 0 for components without
+        predecessors, otherwise one more than the highest level of a predecessor."""
+        levels = [0] * len(self.components)
+        for c, component in enumerate(self.components):
+            for i in component:
+                for j in self.predecessors[i]:
+                    p = self.component_of[j]
+                    if p != c:
+                        levels[c] = max(levels[c], levels[p] + 1)
+        return levels
+
+    def topological_order(self) -> list[GraphNode]:
+        """Returns the nodes so that every node comes after the nodes that drive it
+        (except within a strongly connected component)."""
+        return [self.nodes[i] for component in self.components for i in component]
+
+    def levels(self) -> list[list[GraphNode]]:
+        """Returns the nodes grouped by level. The nodes of one level don't drive
+        each other, so they can be evaluated together."""
+        depth = max(self.component_levels, default=-1) + 1
+        levels = [[] for _ in range(depth)]
+        for c, component in enumerate(self.components):
+            levels[self.component_levels[c]].extend(self.nodes[i] for i in component)
+        return levels
+
+    def feedback_components(self) -> list[list[GraphNode]]:
+        """Returns the strongly connected components with more than one node."""
+        return [
+            [self.nodes[i] for i in component]
+            for component in self.components
+            if len(component) > 1
+        ]
+
+    def fanin_graph(self) -> Graph:
+        """Returns a graph in which every node is only connected to the nodes that
+        drive it, so the components' determine_polarization only sees their drivers."""
+        if self._fanin is None:
+            fanin = Graph()
+            fanin.nodes = list(self.nodes)
+            for i, predecessors in enumerate(self.predecessors):
+                for j in predecessors:
+                    fanin.add_connection(self.nodes[i], self.nodes[j])
+            self._fanin = fanin
+
+        return self._fanin
+
+    def evaluate(self, clocks: tuple[float, float, float, float]) -> int:
+        """Determines the polarizations of all nodes except inputs and fixed cells in
+        one pass in topological order, once the inputs are set. The nodes of a strongly
+        connected component are evaluated repeatedly until their polarizations stop
+        changing, at most once per node. If a component still changes in its last
+        pass (e.g. a loop through a negator that oscillates), its last polarizations
+        are kept and self.converged is false.
+
+        Args:
+            clocks (tuple[float, float, float, float]): The values of the four clocks.
+
+        Returns:
+            int: The number of node evaluations.
+        """
+        fanin = self.fanin_graph()
+        evaluated = 0
+        self.converged = True
+
+        for component in self.components:
+            # inputs are set by the caller and fixed cells keep their polarization
+            nodes = [self.nodes[i] for i in component if not self.drivers[i]]
+
+            # a single node needs one pass, a cycle at most one pass per node
+            for _ in range(len(nodes) if len(component) > 1 else 1):
+                changed = False
+                for n in nodes:
+                    # gates store their new polarization themselves, so compare
+                    # against the value from before the evaluation
+                    old = n.value.polarization
+                    n.value.polarization = n.value.determine_polarization(n, fanin, clocks)
+                    evaluated += 1
+                    if n.value.polarization != old:
+                        changed = True
+                if not changed:
+                    break
+            else:
+                if len(component) > 1 and changed:
+                    self.converged = False
+
+        return evaluated
+
+    def summary(self) -> dict:
+        """Returns the size of the oriented graph, its cycles and its depth."""
+        feedback = self.feedback_components()
+        return {
+            "nodes": len(self.nodes),
+            "edges": sum(len(s) for s in self.successors),
+            "components": len(self.components),
+            "feedback_components": [[n.value.get_name() for n in c] for c in feedback],
+            "levels": max(self.component_levels, default=-1) + 1,
+            "unreachable": [
+                self.nodes[i].value.get_name()
+                for i, key in enumerate(self.keys)
+                if key[0] == inf
+            ],
+        }
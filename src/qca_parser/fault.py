@@ -0,0 +1,498 @@
+from .cell import Cell, CellFunction
+from .graph import Graph, GraphNode
+from .majority_gate import MajorityGate
+from .mig import MIG, build_mig
+from .negator import Negator
+from .profiler import Profiler
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+import os
+
+
+class FaultType(Enum):
+    CELL_DELETION = "CELL_DELETION"
+    STUCK_AT_0 = "STUCK_AT_0"
+    STUCK_AT_1 = "STUCK_AT_1"
+    BROKEN_CONNECTION = "BROKEN_CONNECTION"
+
+
+class Fault:
+    def __init__(self, type: FaultType, node: int, other: int | None = None):
+        """A single fault.
+
+        Args:
+            type (FaultType): The kind of fault.
+            node (int): The index of the faulty node in the graph.
+            other (int | None): For broken connections, the index of the node
+            on the other side of the connection.
+        """
+        self.type = type
+        self.node = node
+        self.other = other
+
+    def __repr__(self) -> str:
+        return f"Fault({self.type.value}, {self.node}, {self.other})"
+
+    def describe(self, graph: Graph) -> str:
+        name = graph.nodes[self.node].value.get_name()
+        if self.type == FaultType.BROKEN_CONNECTION:
+            other = graph.nodes[self.other].value.get_name()
+            return f"{self.type.value} {name} - {other}"
+        return f"{self.type.value} {name}"
+
+
+class FaultSimulator:
+    """Simulates faulty versions of a circuit and checks which faults change its outputs.
+
+    The graph is first evaluated once without faults, like in the logic simulation,
+    which fixes the order in which the nodes are evaluated and the neighbors every
+    node takes its value from (its operands). The faulty circuits are evaluated in
+    this order:
+    - a deleted node is never polarized, so the nodes it drives fall back to their
+    next polarized operand,
+    - a stuck-at-0/1 node always has the given value,
+    - a broken connection removes the two nodes from each other's operands.
+
+    The faults are cell and connection defects of the layout, which have no
+    counterpart in the minimized MIG (a MIG node stands for whole wires and shared
+    gates), so the faulty circuits are evaluated on the graph. The fault-free truth
+    table they are compared with is computed from the minimized MIG, like the truth
+    tables of the other backends.
+
+    Faults are simulated in parallel, one fault per bit of a Python int (a lane):
+    every node holds a mask of the lanes in which it is polarized and a mask of the
+    lanes in which its value is 1, so one pass over the nodes evaluates a whole chunk
+    of faults for one input combination. A fault is dropped from its chunk as soon
+    as an input combination detects it, and the chunks run in a process pool.
+    """
+
+    def __init__(
+        self, graph: Graph, profiler: Profiler | None = None, mig: MIG | None = None
+    ):
+        """Determines the fault-free evaluation order of the graph.
+
+        Args:
+            graph (Graph): The circuit graph (after structure recognition).
+            profiler (Profiler | None): Profiler for the "fault_simulation" stage.
+            mig (MIG | None): The minimized MIG of the graph, built with build_mig
+            if not given.
+        """
+        self.graph = graph
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self.mig = mig if mig is not None else build_mig(graph, profiler=self.profiler)
+
+        indices = graph.node_indices()
+        self.input_indices = []
+        self.output_indices = []
+        self.fixed = []
+        resolved = set()
+
+        for n in graph.nodes:
+            if not isinstance(n.value, Cell):
+                continue
+            if n.value.function == CellFunction.INPUT:
+                self.input_indices.append(indices[n])
+                resolved.add(n)
+            elif n.value.function == CellFunction.OUTPUT:
+                self.output_indices.append(indices[n])
+            elif (
+                n.value.function == CellFunction.FIXED and n.value.polarization is not None
+            ):
+                self.fixed.append((indices[n], n.value.polarization))
+                resolved.add(n)
+
+        # (component, node, operands) in evaluation order
+        self.schedule = []
+
+        def is_resolved(n: GraphNode) -> bool:
+            return n in resolved
+
+        def resolve(n: GraphNode):
+            operands = [indices[m] for m in graph.node_neighbors(n) if m in resolved]
+            self.schedule.append((n.value, indices[n], operands))
+            if len(operands) > 0:
+                resolved.add(n)
+
+        for i in self.output_indices:
+            graph.resolve_from(graph.nodes[i], is_resolved, resolve)
+
+        # nodes whose value can reach an output
+        operands = {}
+        for _, i, node_operands in self.schedule:
+            operands.setdefault(i, set()).update(node_operands)
+        self.operands = operands
+        self.observable = set(self.output_indices)
+        stack = list(self.output_indices)
+        while len(stack) > 0:
+            for o in operands.get(stack.pop(), ()):
+                if o not in self.observable:
+                    self.observable.add(o)
+                    stack.append(o)
+
+        self.input_names = [graph.nodes[i].value.get_name() for i in self.input_indices]
+        self.output_names = [graph.nodes[i].value.get_name() for i in self.output_indices]
+
+    def netlist(self) -> dict:
+        """Returns the evaluation order as plain lists, as sent to the worker processes."""
+        return {
+            "num_nodes": len(self.graph.nodes),
+            "inputs": self.input_indices,
+            "outputs": self.output_indices,
+            "fixed": self.fixed,
+            "schedule": self.schedule,
+        }
+
+    def fault_list(self, types: list[FaultType] | None = None) -> list[Fault]:
+        """Returns all faults of the given types.
+
+        Every node can be deleted or stuck at 0 or 1, and every connection can be
+        broken (each pair of connected nodes is listed once).
+
+        Args:
+            types (list[FaultType] | None): The fault types to generate, all if None.
+
+        Returns:
+            list[Fault]: The faults.
+        """
+        if types is None:
+            types = list(FaultType)
+
+        faults = []
+        for i in range(len(self.graph.nodes)):
+            for type in (FaultType.CELL_DELETION, FaultType.STUCK_AT_0, FaultType.STUCK_AT_1):
+                if type in types:
+                    faults.append(Fault(type, i))
+
+        if FaultType.BROKEN_CONNECTION in types:
+            indices = self.graph.node_indices()
+            pairs = set()
+            for c in self.graph.connections:
+                a, b = indices[c.source], indices[c.sink]
+                pair = (min(a, b), max(a, b))
+                if a != b and pair not in pairs:
+                    pairs.add(pair)
+                    faults.append(Fault(FaultType.BROKEN_CONNECTION, pair[0], pair[1]))
+
+        return faults
+
+    def is_observable(self, fault: Fault) -> bool:
+        """Returns whether the fault can change an output at all, i.e. whether the
+        faulty node (or connection) lies on a path of operands to an output."""
+        if fault.type == FaultType.BROKEN_CONNECTION:
+            return (
+                fault.node in self.observable
+                and fault.other in self.operands.get(fault.node, ())
+            ) or (
+                fault.other in self.observable
+                and fault.node in self.operands.get(fault.other, ())
+            )
+        return fault.node in self.observable
+
+    def fault_free_outputs(self, patterns: list[int]) -> list[list[int | None]]:
+        """Returns the fault-free output values for the given input combinations,
+        evaluated on the MIG, all combinations at once (one bit per combination)."""
+        num_inputs = len(self.input_names)
+        values = {}
+        for j, name in enumerate(self.input_names):
+            value = 0
+            for k, pattern in enumerate(patterns):
+                if (pattern >> (num_inputs - 1 - j)) & 1:
+                    value |= 1 << k
+            values[name] = value
+
+        outputs = self.mig.simulate(
+            [values[name] for name in self.mig.input_names], (1 << len(patterns)) - 1
+        )
+        return [
+            [None if v is None else (v >> k) & 1 for v in outputs] for k in range(len(patterns))
+        ]
+
+    def run(
+        self,
+        faults: list[Fault] | None = None,
+        patterns: list[int] | None = None,
+        workers: int | None = None,
+        chunk_size: int = 1024,
+    ) -> dict:
+        """Simulates the faults against the fault-free truth table.
+
+        Args:
+            faults (list[Fault] | None): The faults to simulate, see fault_list (all by default).
+            patterns (list[int] | None): The input combinations to apply, in order, using the
+            same numbering as Simulator.iter_simulate. All combinations by default.
+            workers (int | None): The number of worker processes, os.cpu_count() if None.
+            With a single worker or chunk, the faults are simulated in this process.
+            chunk_size (int): The number of faults simulated together (lanes per int).
+
+        Returns:
+            dict: The coverage report: the number of faults, detected faults and the
+            coverage, overall and by fault type, the fault-free truth table, and for
+            every fault whether it was detected, by which input combination and on
+            which outputs.
+        """
+        if faults is None:
+            faults = self.fault_list()
+        if patterns is None:
+            patterns = list(range(2 ** len(self.input_indices)))
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        with self.profiler.stage("fault_simulation"):
+            reference = self.fault_free_outputs(patterns)
+            netlist = self.netlist()
+            # faults that can't reach an output are never detected, don't simulate them
+            simulated = [i for i, f in enumerate(faults) if self.is_observable(f)]
+            fault_tuples = [
+                (faults[i].type.value, faults[i].node, faults[i].other) for i in simulated
+            ]
+            chunks = [
+                (netlist, fault_tuples[i : i + chunk_size], patterns, reference)
+                for i in range(0, len(fault_tuples), chunk_size)
+            ]
+
+            if workers > 1 and len(chunks) > 1:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    chunk_results = list(executor.map(_simulate_chunk, chunks))
+            else:
+                chunk_results = [_simulate_chunk(chunk) for chunk in chunks]
+
+            detections = [(None, []) for _ in faults]
+            simulated_detections = [d for result in chunk_results for d in result[0]]
+            for i, detection in zip(simulated, simulated_detections):
+                detections[i] = detection
+            evaluations = sum(result[1] for result in chunk_results)
+
+            self.profiler.count("faults", len(faults))
+            self.profiler.count("faults.unobservable", len(faults) - len(simulated))
+            self.profiler.count("chunks", len(chunks))
+            self.profiler.count("evaluations", evaluations)
+
+        return self.coverage_report(faults, patterns, reference, detections)
+
+    def coverage_report(
+        self,
+        faults: list[Fault],
+        patterns: list[int],
+        reference: list[list[int | None]],
+        detections: list[tuple[int | None, list[int]]],
+    ) -> dict:
+        results = []
+        by_type = {}
+        detected = 0
+
+        for fault, (pattern, outputs) in zip(faults, detections):
+            is_detected = pattern is not None
+            detected += is_detected
+            stats = by_type.setdefault(fault.type.value, {"faults": 0, "detected": 0})
+            stats["faults"] += 1
+            stats["detected"] += is_detected
+
+            results.append(
+                {
+                    "fault": fault.describe(self.graph),
+                    "type": fault.type.value,
+                    "detected": is_detected,
+                    "combination": pattern,
+                    "outputs": [self.output_names[o] for o in outputs],
+                }
+            )
+
+        for stats in by_type.values():
+            stats["coverage"] = stats["detected"] / stats["faults"]
+
+        return {
+            "faults": len(faults),
+            "detected": detected,
+            "undetected": len(faults) - detected,
+            "unobservable": sum(not self.is_observable(f) for f in faults),
+            "coverage": detected / len(faults) if len(faults) > 0 else 1.0,
+            "by_type": by_type,
+            "truth_table": {
+                "inputs": list(self.input_names),
+                "outputs": list(self.output_names),
+                "combinations": list(patterns),
+                "values": reference,
+            },
+            "results": results,
+        }
+
+
+def _pack(faults: list[tuple[str, int, int | None]]) -> dict:
+    """Assigns the faults to lanes (fault i to bit i) and returns the fault masks:
+    the deleted, stuck-at-0 and stuck-at-1 lanes of every faulty node, and the
+    lanes in which a node does not see one of its operands."""
+    nodes = {}
+    broken = {}
+    for lane, (type, node, other) in enumerate(faults):
+        bit = 1 << lane
+        if type == FaultType.BROKEN_CONNECTION.value:
+            for key in ((node, other), (other, node)):
+                broken[key] = broken.get(key, 0) | bit
+            continue
+
+        masks = nodes.setdefault(node, [0, 0, 0])
+        if type == FaultType.CELL_DELETION.value:
+            masks[0] |= bit
+        elif type == FaultType.STUCK_AT_0.value:
+            masks[1] |= bit
+        else:
+            masks[2] |= bit
+
+    return {"nodes": nodes, "broken": broken, "broken_nodes": {i for i, _ in broken}}
+
+
+class _LaneAlgebra:
+    """The algebra of determine_function on lane masks (see symbolic.py): a
+    function is the mask of the lanes in which it is 1."""
+
+    def __init__(self, full: int):
+        self.full = full
+
+    def constant(self, value: int) -> int:
+        return self.full if value else 0
+
+    def negate(self, f: int) -> int:
+        return f ^ self.full
+
+    def and_(self, f: int, g: int) -> int:
+        return f & g
+
+    def or_(self, f: int, g: int) -> int:
+        return f | g
+
+    def majority(self, a: int, b: int, c: int) -> int:
+        return (a & b) | (a & c) | (b & c)
+
+
+class _Operands:
+    """Stands in for the graph in determine_function: the neighbors of a node are
+    its operands, in the order of the fault-free evaluation. Only the operands that
+    are polarized in a group of lanes are passed in the values."""
+
+    def __init__(self, schedule: list[tuple]):
+        self.operands = {i: operands for _, i, operands in schedule}
+
+    def node_neighbors(self, i: int) -> list[int]:
+        return self.operands[i]
+
+
+def _evaluate(netlist: dict, pattern: int, masks: dict, full: int) -> list[tuple[int, int]]:
+    """Evaluates all lanes for one input combination and returns the
+    (polarized, value) masks of the outputs.
+
+    A node takes its value from its polarized operands, which differ between the
+    lanes (a fault depolarizes a node in its lane), so the lanes are grouped by
+    their polarized operands and the function of every group is determined by the
+    component itself, with lane masks as values."""
+    known = [0] * netlist["num_nodes"]
+    value = [0] * netlist["num_nodes"]
+    faulty = masks["nodes"]
+    broken = masks["broken"]
+    broken_nodes = masks["broken_nodes"]
+    algebra = _LaneAlgebra(full)
+    graph = _Operands(netlist["schedule"])
+
+    def inject(i: int):
+        deleted, stuck_at_0, stuck_at_1 = faulty[i]
+        known[i] = (known[i] & ~deleted) | stuck_at_0 | stuck_at_1
+        value[i] = ((value[i] & ~stuck_at_0) | stuck_at_1) & known[i]
+
+    inputs = netlist["inputs"]
+    for j, i in enumerate(inputs):
+        known[i] = full
+        value[i] = full if (pattern >> (len(inputs) - 1 - j)) & 1 else 0
+        if i in faulty:
+            inject(i)
+
+    for i, polarization in netlist["fixed"]:
+        known[i] = full
+        value[i] = full if polarization else 0
+        if i in faulty:
+            inject(i)
+
+    for component, i, operands in netlist["schedule"]:
+        # (lanes, polarized operands) with the lanes of the groups disjoint
+        groups = [(full, [])]
+        for o in operands:
+            operand_known = known[o]
+            if i in broken_nodes and (i, o) in broken:
+                operand_known &= ~broken[(i, o)]
+            if operand_known == full:
+                for _, polarized in groups:
+                    polarized.append(o)
+                continue
+
+            new_groups = []
+            for lanes, polarized in groups:
+                if lanes & operand_known:
+                    new_groups.append((lanes & operand_known, polarized + [o]))
+                if lanes & ~operand_known:
+                    new_groups.append((lanes & ~operand_known, polarized))
+            groups = new_groups
+
+        node_known = 0
+        node_value = 0
+        for lanes, polarized in groups:
+            if len(polarized) == 0:
+                continue
+            function = component.determine_function(
+                i, graph, {o: value[o] for o in polarized}, algebra
+            )
+            node_known |= lanes
+            node_value |= function & lanes
+
+        known[i] = node_known
+        value[i] = node_value
+        if i in faulty:
+            inject(i)
+
+    return [(known[i], value[i]) for i in netlist["outputs"]]
+
+
+def _simulate_chunk(chunk: tuple) -> tuple[list[tuple[int | None, list[int]]], int]:
+    """Simulates a chunk of faults, see FaultSimulator.run.
+
+    Returns:
+        tuple: For every fault the first detecting input combination (None if the
+        fault was not detected) and the outputs on which it was detected, and the
+        number of performed evaluations.
+    """
+    netlist, faults, patterns, reference = chunk
+    detections = [(None, []) for _ in faults]
+    remaining = list(range(len(faults)))
+    masks = _pack(faults)
+    evaluations = 0
+
+    for pattern, expected in zip(patterns, reference):
+        if len(remaining) == 0:
+            break
+
+        full = (1 << len(remaining)) - 1
+        outputs = _evaluate(netlist, pattern, masks, full)
+        evaluations += 1
+
+        detected = 0
+        differing = []
+        for (known, value), expected_value in zip(outputs, expected):
+            expected_known = 0 if expected_value is None else full
+            expected_lanes = full if expected_value == 1 else 0
+            difference = (known ^ expected_known) | ((value ^ expected_lanes) & known)
+            differing.append(difference)
+            detected |= difference
+
+        if detected == 0:
+            continue
+
+        # drop the detected faults and repack the others into fewer lanes
+        still_remaining = []
+        for lane, fault in enumerate(remaining):
+            bit = 1 << lane
+            if detected & bit:
+                outputs_hit = [o for o, difference in enumerate(differing) if difference & bit]
+                detections[fault] = (pattern, outputs_hit)
+            else:
+                still_remaining.append(fault)
+        remaining = still_remaining
+        masks = _pack([faults[f] for f in remaining])
+
+    return detections, evaluations
@@ -1,4 +1,4 @@
-from component import Component
+from .component import Component
 from enum import Enum
 
 
@@ -8,10 +8,11 @@ class GateType(Enum):
 
 
 class Gate(Component):
-    def __init__(self, type: GateType):
+    def __init__(self, type: GateType, clock: int = -1):
         super().__init__()
         self.type = type
         self.label = type.value
+        self.clock = clock
 
     def get_id(self):
         return f"{self.type.value}"
@@ -25,5 +26,8 @@ class Gate(Component):
     def get_shape(self):
         return "square"
 
-    def determine_polarization(self, node, graph, visited, clk0, clk1, clk2, clk3):
+    def determine_polarization(self, node, graph, clocks):
+        raise NotImplementedError
+
+    def determine_function(self, node, graph, values, algebra):
         raise NotImplementedError
@@ -1,9 +1,11 @@
-from component import Component
-from cell import Cell
-from gate import Gate, GateType
-from majority_gate import MajorityGate
-from negator import Negator
-from utils import euclidean_dist, manhattan_dist
+from .component import Component
+from .cell import Cell, CellFunction
+from .gate import Gate, GateType
+from .majority_gate import MajorityGate
+from .negator import Negator
+from .utils import euclidean_dist, manhattan_dist
+from collections import deque
+from typing import Callable
 import math
 
 
@@ -19,23 +21,111 @@ class GraphConnection:
         self.sink = sink
 
 
+class _GraphEditor:
+    """Applies many changes to a graph with the same methods as Graph, but keeps its
+    lookup tables up to date instead of rebuilding them after every change, and drops
+    the removed connections from the connection list once in commit(). The results,
+    including the order of nodes and connections, are the same as with the methods of
+    Graph, which take time proportional to the size of the graph per change."""
+
+    def __init__(self, graph: "Graph"):
+        self.graph = graph
+        self.adjacency = {n: list(sinks) for n, sinks in graph.adjacency().items()}
+        self.component_nodes = {n.value: n for n in graph.nodes}
+        # the connections of every node and of every (source, sink) pair, in list order
+        self.incident = {n: [] for n in graph.nodes}
+        self.pairs = {}
+        for c in graph.connections:
+            self._index(c)
+        self.removed = set()
+
+    def _index(self, c: GraphConnection):
+        self.incident.setdefault(c.source, []).append(c)
+        if c.sink is not c.source:
+            self.incident.setdefault(c.sink, []).append(c)
+        self.pairs.setdefault((c.source, c.sink), deque()).append(c)
+
+    def _drop(self, c: GraphConnection):
+        self.removed.add(c)
+        self.pairs[(c.source, c.sink)].remove(c)
+        self.adjacency[c.source].remove(c.sink)
+
+    def add_component(self, component: Component) -> GraphNode:
+        node = GraphNode(component)
+        self.graph.nodes.append(node)
+        self.adjacency[node] = []
+        self.component_nodes[component] = node
+        return node
+
+    def add_connection(self, source: GraphNode, sink: GraphNode):
+        c = GraphConnection(source, sink)
+        self.graph.connections.append(c)
+        self.adjacency.setdefault(source, []).append(sink)
+        self._index(c)
+
+    def remove_component(self, component: Component):
+        node = self.component_nodes.pop(component, None)
+        if node is None:
+            return
+        self.graph.nodes.remove(node)
+        for c in self.incident.pop(node, []):
+            if c in self.removed:
+                continue
+            print(
+                f"Removing connection {c.source.value.get_name()} -> {c.sink.value.get_name()}"
+            )
+            self._drop(c)
+        del self.adjacency[node]
+
+    def remove_connection(self, source: GraphNode, sink: GraphNode):
+        connections = self.pairs.get((source, sink))
+        if connections:
+            self._drop(connections[0])
+
+    def component_neighbors(self, component: Component) -> list[GraphNode]:
+        node = self.component_nodes.get(component)
+        if node is None:
+            return []
+        # a copy, like the lists Graph returns, which later changes don't affect
+        return list(self.adjacency.get(node, []))
+
+    def commit(self):
+        """Drops the removed connections from the connection list."""
+        self.graph.connections = [c for c in self.graph.connections if c not in self.removed]
+        self.graph._invalidate()
+
+
 class Graph:
     def __init__(self):
         self.nodes = []
         self.connections = []
 
+        # lookup tables derived from nodes and connections,
+        # rebuilt lazily after the graph is modified
+        self._adjacency = None
+        self._component_nodes = None
+        self._node_indices = None
+
+    def _invalidate(self):
+        self._adjacency = None
+        self._component_nodes = None
+        self._node_indices = None
+
     def add_component(self, component: Component) -> GraphNode:
         node = GraphNode(component)
         self.nodes.append(node)
+        self._invalidate()
         return node
 
     def add_connection(self, source: GraphNode, sink: GraphNode):
         self.connections.append(GraphConnection(source, sink))
+        self._invalidate()
 
     def remove_component(self, component: Component):
         for n in self.nodes:
             if n.value == component:
                 self.nodes.remove(n)
+                self._invalidate()
 
                 to_remove = []
                 for c in self.connections:
@@ -53,31 +143,198 @@ class Graph:
         for c in self.connections:
             if c.source == source and c.sink == sink:
                 self.connections.remove(c)
+                self._invalidate()
                 return
 
         # raise Exception("Connection not found")
 
+    def adjacency(self) -> dict[GraphNode, list[GraphNode]]:
+        """Returns a mapping from each node to the sinks of its outgoing connections,
+        in the order the connections were added. The mapping is cached until the graph changes."""
+        if self._adjacency is None:
+            adjacency = {n: [] for n in self.nodes}
+            for conn in self.connections:
+                adjacency.setdefault(conn.source, []).append(conn.sink)
+            self._adjacency = adjacency
+
+        return self._adjacency
+
+    def node_indices(self) -> dict[GraphNode, int]:
+        """Returns a mapping from each node to its position in the node list."""
+        if self._node_indices is None:
+            self._node_indices = {n: i for i, n in enumerate(self.nodes)}
+
+        return self._node_indices
+
+    def node_neighbors(self, node: GraphNode) -> list[GraphNode]:
+        """Returns the neighbors of the given node."""
+        return self.adjacency().get(node, [])
+
     def component_neighbors(self, component: Component) -> list[Component]:
         """Returns the neighbors of the given cell."""
-        neighbors = []
+        if self._component_nodes is None:
+            self._component_nodes = {n.value: n for n in self.nodes}
+
+        node = self._component_nodes.get(component)
+        if node is None:
+            return []
 
-        for conn in self.connections:
-            if conn.source.value == component:
-                neighbors.append(conn.sink)
+        return self.node_neighbors(node)
 
-        return neighbors
+    def resolve_from(
+        self,
+        root: GraphNode,
+        is_resolved: Callable[[GraphNode], bool],
+        resolve: Callable[[GraphNode], None],
+    ) -> None:
+        """Resolves the given node after first resolving all unresolved nodes it
+        (transitively) depends on, in depth-first post-order.
+
+        The traversal uses an explicit stack instead of recursion, so it works on
+        arbitrarily long chains of cells. Every node is entered at most once.
+
+        Args:
+            root (GraphNode): The node to resolve.
+            is_resolved (Callable[[GraphNode], bool]): Returns whether the node
+            already has a value and must not be entered.
+            resolve (Callable[[GraphNode], None]): Computes the value of a node
+            once all of its reachable unresolved neighbors have been resolved.
+        """
+        if is_resolved(root):
+            return
+
+        indices = self.node_indices()
+        adjacency = self.adjacency()
+        visited = bytearray(len(indices))
+
+        visited[indices[root]] = 1
+        stack = [(root, iter(adjacency.get(root, [])))]
+
+        while len(stack) > 0:
+            node, neighbors = stack[-1]
+
+            for n in neighbors:
+                i = indices[n]
+                if not visited[i] and not is_resolved(n):
+                    # descend into the neighbor, continue with the
+                    # remaining neighbors of this node afterwards
+                    visited[i] = 1
+                    stack.append((n, iter(adjacency.get(n, []))))
+                    break
+            else:
+                stack.pop()
+                resolve(node)
+
+    def subgraph(self, nodes: list[GraphNode]) -> "Graph":
+        """Returns a graph with the given nodes and the connections between them.
+        The nodes (and their components) are shared with this graph, not copied."""
+        graph = Graph()
+        graph.nodes = list(nodes)
+        keep = set(nodes)
+        graph.connections = [
+            c for c in self.connections if c.source in keep and c.sink in keep
+        ]
+        return graph
+
+    def cone_of_influence(self) -> dict:
+        """Finds the nodes that can influence an output cell.
+
+        The cone is found by a breadth-first search from the output cells over the
+        connections. The search does not continue past input and fixed cells, since
+        they drive their neighbors and are never driven by them. The remaining nodes
+        are grouped into islands (connected groups of dropped nodes) with a union-find.
+
+        Returns:
+            dict: The nodes in the cone, in graph order, plus all input cells, so the
+            inputs of the circuit stay the same ("live"), the dropped nodes ("dropped"),
+            the names of the cells of every island ("islands"), the cells in the cone
+            with at most one neighbor that are plain (not input, output or fixed) cells, i.e.
+            the ends of wire stubs ("dangling"), and the input cells outside of the cone
+            ("unused_inputs").
+        """
+        adjacency = self.adjacency()
+
+        def is_cell(n: GraphNode, *functions: CellFunction) -> bool:
+            return isinstance(n.value, Cell) and n.value.function in functions
+
+        cone = set()
+        queue = deque(n for n in self.nodes if is_cell(n, CellFunction.OUTPUT))
+        cone.update(queue)
+        while len(queue) > 0:
+            node = queue.popleft()
+            if is_cell(node, CellFunction.INPUT, CellFunction.FIXED):
+                continue
+            for n in adjacency.get(node, []):
+                if n not in cone:
+                    cone.add(n)
+                    queue.append(n)
+
+        live = [n for n in self.nodes if n in cone or is_cell(n, CellFunction.INPUT)]
+        dropped = [n for n in self.nodes if n not in cone and not is_cell(n, CellFunction.INPUT)]
+
+        # union-find over the connections between dropped nodes
+        parent = {n: n for n in dropped}
+
+        def find(n: GraphNode) -> GraphNode:
+            while parent[n] is not n:
+                parent[n] = parent[parent[n]]
+                n = parent[n]
+            return n
+
+        for c in self.connections:
+            if c.source in parent and c.sink in parent:
+                a, b = find(c.source), find(c.sink)
+                if a is not b:
+                    parent[b] = a
+
+        islands = {}
+        for n in dropped:
+            islands.setdefault(find(n), []).append(n.value.get_name())
+
+        dangling = [
+            n.value.get_name()
+            for n in live
+            if isinstance(n.value, Cell)
+            and n.value.function == CellFunction.NORMAL
+            and len(set(adjacency.get(n, []))) <= 1
+        ]
+
+        return {
+            "live": live,
+            "dropped": dropped,
+            "islands": list(islands.values()),
+            "dangling": dangling,
+            "unused_inputs": [
+                n.value.get_name()
+                for n in self.nodes
+                if is_cell(n, CellFunction.INPUT) and n not in cone
+            ],
+        }
 
     def recognize_structures(self) -> None:
         # TODO: prettify this
+        # diagonally adjacent cells are at most sqrt(2) apart along each axis, so a
+        # cell's candidates for a negator lie within two buckets of unit size
+        buckets = {}
+        order = {}
+        for i, node in enumerate(self.nodes):
+            if type(node.value) is Cell:
+                key = (math.floor(node.value.x), math.floor(node.value.y))
+                buckets.setdefault(key, []).append(node)
+                order[node] = i
+        removed = set()
+        # replacing the structures changes the graph many times
+        editor = _GraphEditor(self)
+
         for node1 in self.nodes:
             if type(node1.value) is not Cell:
                 continue
 
             cell1 = node1.value
             # neigh1 = [
-            #     n for n in self.component_neighbors(cell1) if isinstance(n.value, Cell)
+            #     n for n in editor.component_neighbors(cell1) if isinstance(n.value, Cell)
             # ]
-            neigh1 = self.component_neighbors(cell1)
+            neigh1 = editor.component_neighbors(cell1)
 
             # if the node has 4 neighbors (not counting diagonals),
             # they form a majority gate
@@ -93,39 +350,47 @@ class Graph:
                 print(
                     f"    - von Neumann neighbors: {[n.value.get_name() for n in von_neumann_neighbors]}"
                 )
-                maj = self.add_component(
+                # the gate takes over the clock zone of the center cell
+                maj = editor.add_component(
                     MajorityGate(
-                        f"{cell1.get_id()}+{'+'.join([n.value.get_id() for n in von_neumann_neighbors])}"
+                        f"{cell1.get_id()}+{'+'.join([n.value.get_id() for n in von_neumann_neighbors])}",
+                        cell1.clock,
                     )
                 )
 
                 # replace the center cell with the majority gate
                 for n in von_neumann_neighbors:
-                    self.add_connection(n, maj)
-                    self.add_connection(maj, n)
-                self.remove_component(cell1)
+                    editor.add_connection(n, maj)
+                    editor.add_connection(maj, n)
+                editor.remove_component(cell1)
+                removed.add(node1)
 
                 # remove diagonal connections between outer cells
                 for n1 in von_neumann_neighbors:
                     for n2 in von_neumann_neighbors:
                         if n1 == n2:
                             continue
-                        self.remove_connection(n1, n2)
-                        self.remove_connection(n2, n1)
+                        editor.remove_connection(n1, n2)
+                        editor.remove_connection(n2, n1)
 
                 continue
 
-            for node2 in self.nodes:
-                if type(node2.value) is not Cell:
-                    continue
-
+            bx, by = math.floor(cell1.x), math.floor(cell1.y)
+            candidates = [
+                n
+                for dx in range(-2, 3)
+                for dy in range(-2, 3)
+                for n in buckets.get((bx + dx, by + dy), [])
+                if n not in removed
+            ]
+            for node2 in sorted(candidates, key=order.get):
                 cell2 = node2.value
                 # neigh2 = [
                 #     n
-                #     for n in self.component_neighbors(cell2)
+                #     for n in editor.component_neighbors(cell2)
                 #     if isinstance(n.value, Cell)
                 # ]
-                neigh2 = self.component_neighbors(cell2)
+                neigh2 = editor.component_neighbors(cell2)
 
                 e_dist = euclidean_dist((cell1.x, cell1.y), (cell2.x, cell2.y))
 
@@ -144,16 +409,18 @@ class Graph:
                     print(
                         f"    - common neighbors: {[n.value.get_name() for n in common_neigh]}"
                     )
-                    negator = self.add_component(
-                        Negator(f"{cell1.get_id()}+{cell2.get_id()}")
+                    negator = editor.add_component(
+                        Negator(f"{cell1.get_id()}+{cell2.get_id()}", cell1.clock)
                     )
 
                     # remove old connection
-                    self.remove_connection(node1, node2)
-                    self.remove_connection(node2, node1)
+                    editor.remove_connection(node1, node2)
+                    editor.remove_connection(node2, node1)
 
                     # add new connections
-                    self.add_connection(node1, negator)
-                    self.add_connection(negator, node1)
-                    self.add_connection(node2, negator)
-                    self.add_connection(negator, node2)
+                    editor.add_connection(node1, negator)
+                    editor.add_connection(negator, node1)
+                    editor.add_connection(node2, negator)
+                    editor.add_connection(negator, node2)
+
+        editor.commit()
@@ -1,9 +1,10 @@
-from gate import Gate, GateType
+from .gate import Gate, GateType
+from .utils import most_common_function
 
 
 class MajorityGate(Gate):
-    def __init__(self, gate_id):
-        super().__init__(GateType.MAJORITY)
+    def __init__(self, gate_id, clock: int = -1):
+        super().__init__(GateType.MAJORITY, clock)
         self.id = gate_id
 
     def get_id(self):
@@ -12,7 +13,7 @@ class MajorityGate(Gate):
     def get_name(self):
         return f"MAJORITY ({self.id})"
 
-    def determine_polarization(self, node, graph, visited, clk0, clk1, clk2, clk3):
+    def determine_polarization(self, node, graph, clocks):
         neighbors = graph.component_neighbors(node.value)
 
         # get all polarized_neighbors
@@ -33,3 +34,9 @@ class MajorityGate(Gate):
 
         self.polarization = most_common
         return self.polarization
+
+    def determine_function(self, node, graph, values, algebra):
+        # the most common function of the resolved neighbors,
+        # ties go to the first one (see determine_polarization)
+        functions = [values[n] for n in graph.node_neighbors(node) if n in values]
+        return most_common_function(functions, algebra)
@@ -0,0 +1,374 @@
+from .cell import Cell, CellFunction
+from .graph import Graph
+from .profiler import Profiler
+from .symbolic import evaluate_symbolic
+from itertools import combinations
+
+
+class MIG:
+    """A majority-inverter graph: a logic network whose only gates are 3-input
+    majorities, with inverters on the edges.
+
+    Like in the BDD manager, a function is an edge, an int whose lowest bit tells
+    whether it is complemented and whose remaining bits are the index of a node.
+    Node 0 is the constant 0, so the edge 0 is FALSE and the edge 1 is TRUE. The
+    other nodes are inputs and majority gates. Children are always created before
+    their parents, so the node indices are a topological order.
+
+    Majority gates are hash-consed (structurally hashed): creating a gate that
+    already exists returns the existing one. New gates are normalized first:
+    - M(x, x, y) = x and M(x, x', y) = y, which also propagates constants,
+    since M(0, 0, y) = 0, M(1, 1, y) = 1 and M(0, 1, y) = y,
+    - M(x', y', z') = M(x, y, z)', so at most one child is complemented,
+    - the children are sorted.
+    Double negations disappear on their own, since complementing an edge twice
+    gives back the same edge.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self):
+        # None for the constant and the inputs
+        self.node_children = [None]
+        self.input_names = []
+        self.input_nodes = {}
+        self.unique = {}
+        self.output_names = []
+        self.outputs = []
+
+    def variable(self, name: str) -> int:
+        """Returns the edge of the input with the given name, adding it if needed."""
+        if name not in self.input_nodes:
+            self.input_nodes[name] = len(self.node_children)
+            self.node_children.append(None)
+            self.input_names.append(name)
+        return self.input_nodes[name] << 1
+
+    def constant(self, value: int) -> int:
+        return self.TRUE if value else self.FALSE
+
+    def negate(self, f: int) -> int:
+        return f ^ 1
+
+    def and_(self, f: int, g: int) -> int:
+        return self.majority(f, g, self.FALSE)
+
+    def or_(self, f: int, g: int) -> int:
+        return self.majority(f, g, self.TRUE)
+
+    def majority(self, a: int, b: int, c: int) -> int:
+        """Returns the edge of the majority gate M(a, b, c), see the class docstring."""
+        a, b, c = sorted((a, b, c))
+        if a == b or b == c:
+            return b
+        if a == c:
+            return a
+        if a ^ 1 == b:
+            return c
+        if b ^ 1 == c:
+            return a
+        if a ^ 1 == c:
+            return b
+
+        complemented = 0
+        if (a & 1) + (b & 1) + (c & 1) >= 2:
+            a, b, c = sorted((a ^ 1, b ^ 1, c ^ 1))
+            complemented = 1
+
+        key = (a, b, c)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.node_children)
+            self.node_children.append(key)
+            self.unique[key] = node
+        return (node << 1) | complemented
+
+    def is_majority(self, f: int) -> bool:
+        return self.node_children[f >> 1] is not None
+
+    def children(self, f: int) -> tuple[int, int, int]:
+        """Returns the children of the majority gate of f, complemented if f is
+        (M(a, b, c)' = M(a', b', c'))."""
+        complemented = f & 1
+        return tuple(child ^ complemented for child in self.node_children[f >> 1])
+
+    def add_output(self, name: str, f: int | None):
+        """Adds an output, None if the output is never polarized."""
+        self.output_names.append(name)
+        self.outputs.append(f)
+
+    def reachable(self) -> list[int]:
+        """Returns the majority nodes the outputs depend on, in topological order."""
+        seen = set()
+        stack = [f >> 1 for f in self.outputs if f is not None]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node in seen or self.node_children[node] is None:
+                continue
+            seen.add(node)
+            for child in self.node_children[node]:
+                stack.append(child >> 1)
+        return sorted(seen)
+
+    def size(self) -> int:
+        """Returns the number of majority gates the outputs depend on."""
+        return len(self.reachable())
+
+    def depth(self) -> int:
+        """Returns the largest number of majority gates on a path from an input to an output."""
+        levels = {}
+        for node in self.reachable():
+            levels[node] = 1 + max(levels.get(child >> 1, 0) for child in self.node_children[node])
+        return max((levels.get(f >> 1, 0) for f in self.outputs if f is not None), default=0)
+
+    def support(self, f: int) -> list[str]:
+        """Returns the names of the inputs the function f depends on structurally,
+        in input order."""
+        seen = set()
+        stack = [f >> 1]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if self.node_children[node] is not None:
+                stack.extend(child >> 1 for child in self.node_children[node])
+        return [name for name in self.input_names if self.input_nodes[name] in seen]
+
+    def fanouts(self) -> dict[int, int]:
+        """Returns the number of references to every reachable majority node."""
+        fanouts = {}
+        for node in self.reachable():
+            for child in self.node_children[node]:
+                fanouts[child >> 1] = fanouts.get(child >> 1, 0) + 1
+        for f in self.outputs:
+            if f is not None:
+                fanouts[f >> 1] = fanouts.get(f >> 1, 0) + 1
+        return fanouts
+
+    def copy(self, rewrite: bool = False) -> "MIG":
+        """Returns a copy that contains only the nodes the outputs depend on.
+
+        Args:
+            rewrite (bool): Whether to apply associativity and distributivity
+            where they remove a gate.
+        """
+        new = MIG()
+        mapping = {0: 0}
+        for name in self.input_names:
+            mapping[self.input_nodes[name]] = new.variable(name)
+
+        fanouts = self.fanouts() if rewrite else {}
+        for node in self.reachable():
+            if rewrite:
+                mapping[node] = self._rewrite_node(new, mapping, fanouts, node)
+            else:
+                a, b, c = [mapping[e >> 1] ^ (e & 1) for e in self.node_children[node]]
+                mapping[node] = new.majority(a, b, c)
+
+        for name, f in zip(self.output_names, self.outputs):
+            new.add_output(name, None if f is None else mapping[f >> 1] ^ (f & 1))
+        return new
+
+    def _rewrite_node(self, new: "MIG", mapping: dict, fanouts: dict, node: int) -> int:
+        """Rebuilds a majority node in the new MIG, using the children of its
+        children where that saves a gate. Only children without other references
+        are restructured, since shared children have to be kept anyway."""
+
+        def mapped(f: int) -> int:
+            return mapping[f >> 1] ^ (f & 1)
+
+        children = self.node_children[node]
+        single = [
+            self.is_majority(child) and fanouts.get(child >> 1, 0) == 1 for child in children
+        ]
+
+        # distributivity: M(M(x, y, u), M(x, y, v), z) = M(x, y, M(u, v, z))
+        for i, j in combinations(range(3), 2):
+            if not (single[i] and single[j]):
+                continue
+            inner_i = list(self.children(children[i]))
+            inner_j = list(self.children(children[j]))
+            common = [f for f in inner_i if f in inner_j]
+            if len(common) < 2:
+                continue
+            x, y = common[:2]
+            inner_i.remove(x)
+            inner_i.remove(y)
+            inner_j.remove(x)
+            inner_j.remove(y)
+            z = children[3 - i - j]
+            return new.majority(
+                mapped(x),
+                mapped(y),
+                new.majority(mapped(inner_i[0]), mapped(inner_j[0]), mapped(z)),
+            )
+
+        # associativity: M(x, u, M(y, u, z)) = M(z, u, M(y, u, x)),
+        # used when M(y, u, x) collapses because y is x or x'
+        for i in range(3):
+            if not single[i]:
+                continue
+            inner = list(self.children(children[i]))
+            outer = [children[k] for k in range(3) if k != i]
+            for u, x in (outer, outer[::-1]):
+                if u not in inner:
+                    continue
+                rest = list(inner)
+                rest.remove(u)
+                for y, z in (rest, rest[::-1]):
+                    if x == y or x == y ^ 1:
+                        return new.majority(
+                            mapped(z),
+                            mapped(u),
+                            new.majority(mapped(y), mapped(u), mapped(x)),
+                        )
+
+        a, b, c = [mapped(child) for child in children]
+        return new.majority(a, b, c)
+
+    def rewrite(self, max_passes: int = 10) -> "MIG":
+        """Returns a minimized copy, rewriting until the size stops decreasing.
+
+        Args:
+            max_passes (int): The maximum number of rewriting passes.
+
+        Returns:
+            MIG: The minimized MIG.
+        """
+        mig = self.copy()
+        for _ in range(max_passes):
+            rewritten = mig.copy(rewrite=True).copy()
+            if rewritten.size() >= mig.size():
+                break
+            mig = rewritten
+        return mig
+
+    def simulate(self, input_values: list[int], full: int) -> list[int | None]:
+        """Evaluates the outputs for many input combinations at once: every bit of
+        the given ints is a separate combination.
+
+        Args:
+            input_values (list[int]): The values of the inputs (in input order).
+            full (int): The mask of all used bits.
+
+        Returns:
+            list[int | None]: The values of the outputs, None for unpolarized outputs.
+        """
+        values = {0: 0}
+        for name, value in zip(self.input_names, input_values):
+            values[self.input_nodes[name]] = value & full
+
+        def edge_value(f: int) -> int:
+            return values[f >> 1] ^ full if f & 1 else values[f >> 1]
+
+        for node in self.reachable():
+            a, b, c = [edge_value(child) for child in self.node_children[node]]
+            values[node] = (a & b) | (a & c) | (b & c)
+
+        return [None if f is None else edge_value(f) for f in self.outputs]
+
+    def iter_rows(self, block_size: int = 4096, simulate=None):
+        """Yields the truth table rows in the same format and order as
+        Simulator.iter_simulate, evaluating block_size combinations per pass.
+
+        Args:
+            block_size (int): The number of combinations evaluated at once.
+            simulate: The bit-parallel evaluation to use, MIG.simulate by default
+            (see also SubcircuitEvaluator.simulate).
+        """
+        if simulate is None:
+            simulate = self.simulate
+        num_inputs = len(self.input_names)
+        num_combinations = 2**num_inputs
+
+        for start in range(0, num_combinations, block_size):
+            count = min(block_size, num_combinations - start)
+            full = (1 << count) - 1
+            input_values = []
+            for i in range(num_inputs):
+                shift = num_inputs - 1 - i
+                value = 0
+                for k in range(count):
+                    if ((start + k) >> shift) & 1:
+                        value |= 1 << k
+                input_values.append(value)
+
+            outputs = simulate(input_values, full)
+            for k in range(count):
+                comb = start + k
+                yield {
+                    "combination": comb,
+                    "inputs": [(comb >> (num_inputs - 1 - i)) & 1 for i in range(num_inputs)],
+                    "outputs": [None if v is None else (v >> k) & 1 for v in outputs],
+                }
+
+    def truth_table(self) -> dict:
+        """Returns the truth table in the same format as Simulator.simulate."""
+        return {
+            "inputs": list(self.input_names),
+            "outputs": list(self.output_names),
+            "values": [row["outputs"] for row in self.iter_rows()],
+        }
+
+    def to_algebra(self, algebra) -> list:
+        """Rebuilds the outputs with another algebra (e.g. a BDD manager, see
+        symbolic.py) and returns their functions, None for unpolarized outputs."""
+        values = {0: algebra.constant(0)}
+        for name in self.input_names:
+            values[self.input_nodes[name]] = algebra.variable(name)
+
+        def edge_value(f: int):
+            return algebra.negate(values[f >> 1]) if f & 1 else values[f >> 1]
+
+        for node in self.reachable():
+            a, b, c = [edge_value(child) for child in self.node_children[node]]
+            values[node] = algebra.majority(a, b, c)
+
+        return [None if f is None else edge_value(f) for f in self.outputs]
+
+
+def build_mig(graph: Graph, rewrite: bool = True, profiler: Profiler | None = None) -> MIG:
+    """Builds the MIG of a circuit graph.
+
+    Wires, majority gates, negators and fixed cells are translated by walking the
+    graph like the logic simulation does (see symbolic.evaluate_symbolic), so the
+    MIG computes the same truth table as the simulator.
+
+    Args:
+        graph (Graph): The circuit graph (after structure recognition).
+        rewrite (bool): Whether to minimize the MIG with the rewriting passes.
+        profiler (Profiler | None): Profiler for the "mig" stage.
+
+    Returns:
+        MIG: The MIG, with one output per output cell.
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+
+    with profiler.stage("mig"):
+        mig = MIG()
+        input_nodes = []
+        output_nodes = []
+        for n in graph.nodes:
+            if isinstance(n.value, Cell) and n.value.function == CellFunction.INPUT:
+                input_nodes.append(n)
+            elif isinstance(n.value, Cell) and n.value.function == CellFunction.OUTPUT:
+                output_nodes.append(n)
+
+        # declare the inputs in graph order
+        for n in input_nodes:
+            mig.variable(n.value.get_name())
+
+        values = evaluate_symbolic(graph, mig, output_nodes)
+        for n in output_nodes:
+            mig.add_output(n.value.get_name(), values.get(n))
+
+        profiler.count("graph.nodes", len(graph.nodes))
+        profiler.count("mig.nodes", mig.size())
+        if rewrite:
+            mig = mig.rewrite()
+            profiler.count("mig.nodes.rewritten", mig.size())
+
+    return mig
@@ -1,9 +1,9 @@
-from gate import Gate, GateType
+from .gate import Gate, GateType
 
 
 class Negator(Gate):
-    def __init__(self, gate_id):
-        super().__init__(GateType.NEGATOR)
+    def __init__(self, gate_id, clock: int = -1):
+        super().__init__(GateType.NEGATOR, clock)
         self.id = gate_id
 
     def get_id(self):
@@ -12,7 +12,7 @@ class Negator(Gate):
     def get_name(self):
         return f"NEGATOR ({self.id})"
 
-    def determine_polarization(self, node, graph, visited, clk0, clk1, clk2, clk3):
+    def determine_polarization(self, node, graph, clocks):
         neighbors = graph.component_neighbors(node.value)
 
         # assume the inverse value of the first found polarized neighbor
@@ -20,3 +20,10 @@ class Negator(Gate):
             if n.value.polarization is not None:
                 self.polarization = 1 if n.value.polarization == 0 else 0
                 return self.polarization
+
+    def determine_function(self, node, graph, values, algebra):
+        # the complement of the first resolved neighbor
+        for n in graph.node_neighbors(node):
+            if n in values:
+                return algebra.negate(values[n])
+        return None
@@ -1,21 +1,26 @@
-from cell import Cell, CellFunction
-from gate import Gate, GateType
-from graph import Graph
-from utils import (
+from .cell import Cell, CellFunction
+from .gate import Gate, GateType
+from .graph import Graph
+from .utils import (
     euclidean_dist,
     manhattan_dist,
     parse_cell_function,
     const_cell_label_to_polarization,
 )
-from pyvis.network import Network
+from .profiler import Profiler
+from collections import Counter
+from contextlib import redirect_stdout
 import math
-import numpy as np
+import os
+
+CELL_OPENING_TAG = b"[TYPE:QCADCell]"
+CELL_CLOSING_TAG = b"[#TYPE:QCADCell]"
 
 
 class QCAParser:
     """The .qca file parser object."""
 
-    def __init__(self):
+    def __init__(self, profiler: Profiler | None = None):
         self.version = None
         self.cells = []
         self.filename = None
@@ -26,6 +31,7 @@ class QCAParser:
         self.last_cell_clock = None
         self.last_cell_label = None
         self.graph = None
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
 
     def in_section(self, section: str) -> bool:
         """Checks if the given section is currently open.
@@ -91,17 +97,13 @@ class QCAParser:
     def handle_closing_tag(self, section: str):
         if section == "TYPE:QCADCell":
             # save the cell
-            cell = Cell(
+            cell = make_cell(
                 self.last_cell_x,
                 self.last_cell_y,
                 self.last_cell_function,
                 self.last_cell_clock,
                 self.last_cell_label,
             )
-
-            if cell.function == CellFunction.FIXED:
-                cell.polarization = const_cell_label_to_polarization(cell.label)
-
             self.cells.append(cell)
             print(f"Parsed cell: {cell}")
 
@@ -113,15 +115,42 @@ class QCAParser:
         """Returns the minimum y coordinate of all cells in the design."""
         return min([cell.y for cell in self.cells])
 
+    def _get_min_distance(self, values: list[float]) -> float:
+        """Returns the minimum distance between two different values, which is the
+        smallest gap between neighboring values once they are sorted."""
+        values = sorted(set(values))
+        return min(b - a for a, b in zip(values, values[1:]))
+
+    def _get_majority_distance(self, values: list[float], n: float) -> float:
+        """Returns the most common distance, at most n, between two different values,
+        counted over all pairs of cells.
+
+        The distinct values are sorted, so only the values up to n apart are
+        visited, and each pair of distinct values is counted once per pair of cells
+        that have them.
+        """
+        counts = Counter(values)
+        values = sorted(counts)
+        distances = Counter()
+        for i, a in enumerate(values):
+            for b in values[i + 1 :]:
+                if b - a > n:
+                    break
+                distances[b - a] += 2 * counts[a] * counts[b]
+
+        return self._most_common(distances)
+
+    def _most_common(self, counts: Counter) -> float:
+        """Returns the most common of the counted values, the smallest one in case of a tie."""
+        return min(counts, key=lambda v: (-counts[v], v))
+
     def _get_min_cell_x_distance(self) -> float:
         """Returns the minimum x distance between two cells in the design.
 
         Returns:
             float: The minimum x distance between two cells.
         """
-        return min(
-            [abs(a.x - b.x) for a in self.cells for b in self.cells if a.x != b.x]
-        )
+        return self._get_min_distance([cell.x for cell in self.cells])
 
     def _get_min_cell_y_distance(self) -> float:
         """Returns the minimum y distance between two cells in the design.
@@ -129,9 +158,7 @@ class QCAParser:
         Returns:
             float: The minimum y distance between two cells.
         """
-        return min(
-            [abs(a.y - b.y) for a in self.cells for b in self.cells if a.y != b.y]
-        )
+        return self._get_min_distance([cell.y for cell in self.cells])
 
     def _get_majority_cell_x_distance(self, n: float) -> float:
         """Returns the majority x distance between two cells in the design that is smaller than n.
@@ -142,16 +169,7 @@ class QCAParser:
         Returns:
             float: The majority x distance between two cells that is smaller than n.
         """
-        distances = []
-        for a in self.cells:
-            for b in self.cells:
-                if a.x != b.x:
-                    dist = abs(a.x - b.x)
-                    if dist <= n:
-                        distances.append(dist)
-
-        values, counts = np.unique(distances, return_counts=True)
-        return values[np.argmax(counts)]
+        return self._get_majority_distance([cell.x for cell in self.cells], n)
 
     def _get_majority_cell_y_distance(self, n: float) -> float:
         """Returns the majority y distance between two cells in the design that is smaller than n.
@@ -162,16 +180,7 @@ class QCAParser:
         Returns:
             float: The majority y distance between two cells that is smaller than n.
         """
-        distances = []
-        for a in self.cells:
-            for b in self.cells:
-                if a.y != b.y:
-                    dist = abs(a.y - b.y)
-                    if dist <= n:
-                        distances.append(dist)
-
-        values, counts = np.unique(distances, return_counts=True)
-        return values[np.argmax(counts)]
+        return self._get_majority_distance([cell.y for cell in self.cells], n)
 
     def parse_line(self, line: str):
         # replace all commas with periods
@@ -214,6 +223,27 @@ class QCAParser:
             if line.startswith("psz="):
                 self.last_cell_label = line.split("=")[1]
 
+    def parse_lines(self, lines) -> int:
+        """Parses the given lines with parse_line, skipping empty ones.
+
+        Args:
+            lines: The lines of (a part of) a .qca file.
+
+        Returns:
+            int: The number of parsed lines.
+        """
+        lines_parsed = 0
+        for line in lines:
+            line = line.strip()
+
+            # skip empty lines
+            if len(line) == 0:
+                continue
+
+            self.parse_line(line)
+            lines_parsed += 1
+        return lines_parsed
+
     def construct_graph(self) -> None:
         # whether two nodes are connected (i.e. the respective two cells
         # adjacent) will be determined by checking if their
@@ -229,31 +259,69 @@ class QCAParser:
 
         self.graph = Graph()
 
-        # add all cells to the graph
-        for cell in self.cells:
-            self.graph.add_component(cell)
+        with self.profiler.stage("construct_graph"):
+            # add all cells to the graph
+            for cell in self.cells:
+                self.graph.add_component(cell)
+
+            # sort the cells into buckets of the majority distance, so the cells within
+            # a cell's Moore neighborhood are in the same or an adjacent bucket
+            buckets = {}
+            keys = []
+            for i, node in enumerate(self.graph.nodes):
+                key = (
+                    math.floor(node.value.x / majority_x_dist),
+                    math.floor(node.value.y / majority_y_dist),
+                )
+                buckets.setdefault(key, []).append(i)
+                keys.append(key)
+
+            # connect neighboring cells, in graph order
+            nodes = self.graph.nodes
+            for i, node1 in enumerate(nodes):
+                cell1 = node1.value
+                bx, by = keys[i]
+                candidates = []
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        candidates += buckets.get((bx + dx, by + dy), [])
+
+                for j in sorted(candidates):
+                    if i == j:
+                        continue
+
+                    cell2 = nodes[j].value
+
+                    # connect two cells if they are within each other's Moore neighborhood
+                    if (
+                        abs(cell1.x - cell2.x) <= majority_x_dist
+                        and abs(cell1.y - cell2.y) <= majority_y_dist
+                    ):
+                        self.graph.add_connection(node1, nodes[j])
+
+            self.profiler.count("nodes", len(self.graph.nodes))
+            self.profiler.count("edges", len(self.graph.connections))
 
-        # connect neighboring cells
-        for node1 in self.graph.nodes:
-            cell1 = node1.value
-            for node2 in self.graph.nodes:
-                if node1 == node2:
-                    continue
+        # structure recognition
+        with self.profiler.stage("recognize_structures"):
+            self.graph.recognize_structures()
 
-                cell2 = node2.value
+            for node in self.graph.nodes:
+                if isinstance(node.value, Gate):
+                    self.profiler.count("gates", 1)
+                    self.profiler.count(f"gates.{node.value.type.value.lower()}", 1)
+            self.profiler.count("nodes", len(self.graph.nodes))
+            self.profiler.count("edges", len(self.graph.connections))
 
-                # connect two cells if they are within each other's Moore neighborhood
-                if (
-                    abs(cell1.x - cell2.x) <= majority_x_dist
-                    and abs(cell1.y - cell2.y) <= majority_y_dist
-                ):
-                    self.graph.add_connection(node1, node2)
+    def visualize_graph(self, filename: str = "graph.html"):
+        """Uses pyvis to visualize the cell graph.
 
-        # structure recognition
-        self.graph.recognize_structures()
+        Args:
+            filename (str): The HTML file the visualization is written to.
+        """
+        # imported here, pyvis is only needed for visualization
+        from pyvis.network import Network
 
-    def visualize_graph(self):
-        """Uses pyvis to visualize the cell graph."""
         net = Network(directed=False, height="500px", filter_menu=True)
 
         for node in self.graph.nodes:
@@ -273,54 +341,135 @@ class QCAParser:
                 conn.source.value.get_id(), conn.sink.value.get_id(), color="gray"
             )
 
-        net.show("graph.html", notebook=False)
+        net.show(filename, notebook=False)
+
+    def find_cell_blocks(self, filename: str) -> list[tuple[int, int]]:
+        """Returns the byte ranges of all [TYPE:QCADCell] ... [#TYPE:QCADCell] blocks
+        of the file, in file order.
+
+        Args:
+            filename (str): The .qca file.
+
+        Returns:
+            list[tuple[int, int]]: The start (the opening tag) and end (after the
+            closing tag) offsets of every cell block.
+        """
+        # imported here, only needed for parallel parsing
+        import mmap
+
+        blocks = []
+        with open(filename, "rb") as f:
+            if f.seek(0, 2) == 0:
+                return blocks
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                position = 0
+                while True:
+                    start = data.find(CELL_OPENING_TAG, position)
+                    if start < 0:
+                        break
+                    end = data.find(CELL_CLOSING_TAG, start)
+                    if end < 0:
+                        break
+                    end += len(CELL_CLOSING_TAG)
+                    blocks.append((start, end))
+                    position = end
+        return blocks
+
+    def parse_parallel(self, filename: str, workers: int, chunks_per_worker: int = 4):
+        """Reads the cells of the file with a process pool.
+
+        The file is split at cell boundaries (see find_cell_blocks) into chunks of
+        about equal size. Each worker parses the cells of a chunk into columns
+        (x, y, function, clock, label), and the columns are turned into cells in
+        file order, so the result is the same as reading the file line by line.
 
-    def parse(self, filename: str) -> None:
+        Args:
+            filename (str): The .qca file.
+            workers (int): The number of worker processes.
+            chunks_per_worker (int): The number of chunks per worker, more chunks
+            balance the load better.
+        """
+        blocks = self.find_cell_blocks(filename)
+        self.profiler.count("blocks", len(blocks))
+        if len(blocks) == 0:
+            return
+
+        # group consecutive blocks into chunks of about equal size in bytes
+        num_chunks = max(1, min(len(blocks), workers * chunks_per_worker))
+        chunk_bytes = (blocks[-1][1] - blocks[0][0]) / num_chunks
+        tasks = []
+        chunk_start = blocks[0][0]
+        for i, (start, end) in enumerate(blocks):
+            if end - chunk_start >= chunk_bytes or i == len(blocks) - 1:
+                tasks.append((filename, chunk_start, end))
+                if i + 1 < len(blocks):
+                    chunk_start = blocks[i + 1][0]
+
+        # imported here, starting the CLI shouldn't pay for the process pool machinery
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            columns = list(executor.map(parse_cell_blocks, tasks))
+
+        for chunk in columns:
+            for x, y, function, clock, label in zip(
+                chunk["x"], chunk["y"], chunk["function"], chunk["clock"], chunk["label"]
+            ):
+                self.cells.append(make_cell(x, y, function, clock, label))
+
+        self.profiler.count("chunks", len(tasks))
+        print(f"Parsed {len(self.cells)} cells in {len(tasks)} chunks")
+
+    def parse(self, filename: str, workers: int = 1) -> None:
         """Parses the file with the given filename.
 
         Args:
             filename (string): The filename of the file to be parsed. Should end in .qca.
+            workers (int): The number of processes that read the cells. With more than
+            one, the file is read in parallel (see parse_parallel).
 
         Returns:
             None: The parsed design object. Currently always None, TODO implement a better representation.
         """
         self.filename = filename
 
-        with open(filename, "r") as f:
-            for line_no, line in enumerate(f):
-                line = line.strip()
-
-                # skip empty lines
-                if len(line) == 0:
-                    continue
-
-                self.parse_line(line)
-
-        # normalize cell coordinates
-        min_cell_x = self._get_min_cell_x()
-        min_cell_y = self._get_min_cell_y()
-        min_cell_x_dist = self._get_min_cell_x_distance()
-        min_cell_y_dist = self._get_min_cell_y_distance()
-        majority_x_dist = self._get_majority_cell_x_distance(
-            2 * max(min_cell_x_dist, min_cell_y_dist)
-        )
-        majority_y_dist = self._get_majority_cell_y_distance(
-            2 * max(min_cell_x_dist, min_cell_y_dist)
-        )
-        print("Min x:", min_cell_x)
-        print("Min y:", min_cell_y)
-        print("Min x distance:", min_cell_x_dist)
-        print("Min y distance:", min_cell_y_dist)
-        print("Majority x distance:", majority_x_dist)
-        print("Majority y distance:", majority_y_dist)
+        with self.profiler.stage("parse"):
+            with self.profiler.stage("read"):
+                if workers > 1:
+                    self.parse_parallel(filename, workers)
+                else:
+                    with open(filename, "r") as f:
+                        lines_parsed = self.parse_lines(f)
+
+                    self.profiler.count("lines_parsed", lines_parsed)
+                self.profiler.count("cells", len(self.cells))
+
+            with self.profiler.stage("normalize"):
+                # normalize cell coordinates
+                min_cell_x = self._get_min_cell_x()
+                min_cell_y = self._get_min_cell_y()
+                min_cell_x_dist = self._get_min_cell_x_distance()
+                min_cell_y_dist = self._get_min_cell_y_distance()
+                majority_x_dist = self._get_majority_cell_x_distance(
+                    2 * max(min_cell_x_dist, min_cell_y_dist)
+                )
+                majority_y_dist = self._get_majority_cell_y_distance(
+                    2 * max(min_cell_x_dist, min_cell_y_dist)
+                )
+                print("Min x:", min_cell_x)
+                print("Min y:", min_cell_y)
+                print("Min x distance:", min_cell_x_dist)
+                print("Min y distance:", min_cell_y_dist)
+                print("Majority x distance:", majority_x_dist)
+                print("Majority y distance:", majority_y_dist)
 
-        for c in self.cells:
-            c.x -= min_cell_x
-            c.y -= min_cell_y
-            c.x /= min_cell_x_dist
-            c.y /= min_cell_y_dist
+                for c in self.cells:
+                    c.x -= min_cell_x
+                    c.y -= min_cell_y
+                    c.x /= min_cell_x_dist
+                    c.y /= min_cell_y_dist
 
-        self.construct_graph()
+            self.construct_graph()
 
         print("*****")
         print(f"File {filename} parsed successfully, got {len(self.cells)} cells.")
@@ -331,8 +480,40 @@ class QCAParser:
         return self.graph
 
 
-if __name__ == "__main__":
+def make_cell(
+    x: float, y: float, function: CellFunction, clock: int, label: str | None
+) -> Cell:
+    """Creates a parsed cell. Fixed cells get the polarization given by their label."""
+    cell = Cell(x, y, function, clock, label)
+    if cell.function == CellFunction.FIXED:
+        cell.polarization = const_cell_label_to_polarization(cell.label)
+    return cell
+
+
+def parse_cell_blocks(task: tuple[str, int, int]) -> dict[str, list]:
+    """Parses the cells in a byte range of a .qca file that consists of whole cell
+    blocks with a QCAParser of its own, without printing. Runs in the worker
+    processes of QCAParser.parse_parallel.
+
+    Args:
+        task (tuple[str, int, int]): The filename and the start and end offsets.
+
+    Returns:
+        dict[str, list]: The x, y, function, clock and label of every cell, as columns.
+    """
+    filename, start, end = task
+    with open(filename, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8", errors="replace")
+
     parser = QCAParser()
-    # parser.parse("example_majoritygate.qca")
-    parser.parse("example_negator.qca")
-    parser.visualize_graph()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        parser.parse_lines(text.splitlines())
+
+    return {
+        "x": [cell.x for cell in parser.cells],
+        "y": [cell.y for cell in parser.cells],
+        "function": [cell.function for cell in parser.cells],
+        "clock": [cell.clock for cell in parser.cells],
+        "label": [cell.label for cell in parser.cells],
+    }
@@ -0,0 +1,215 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Profiler:
+    """Collects per-stage timing, memory and counter data for the
+    parse -> graph -> simulate pipeline.
+
+    Stages are opened with the `stage` context manager and may be nested.
+    Counters and series recorded while a stage is open are attributed to
+    the innermost open stage. A disabled profiler accepts all calls but
+    records nothing, so it can be passed around unconditionally.
+    """
+
+    def __init__(self, enabled: bool = True, cprofile: bool = False):
+        """Creates a new profiler.
+
+        Args:
+            enabled (bool): Whether the profiler records anything at all.
+            cprofile (bool): Whether to additionally capture a cProfile
+            profile of everything that runs inside the outermost stages.
+        """
+        self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+        self.series = {}
+        self._stack = []
+        self._owns_tracemalloc = False
+        self._cprofile = None
+        if enabled and cprofile:
+            import cProfile
+
+            self._cprofile = cProfile.Profile()
+
+    def _new_stage(self) -> dict:
+        return {
+            "calls": 0,
+            "wall_time": 0.0,
+            "peak_memory": 0,
+            "counters": {},
+            "series": {},
+        }
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measures the wall time and peak memory of the enclosed block.
+
+        Args:
+            name (str): The name of the stage. Repeated stages with the same
+            name are accumulated.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        if len(self._stack) == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            if self._cprofile is not None:
+                self._cprofile.enable()
+
+        if name not in self.stages:
+            self.stages[name] = self._new_stage()
+
+        start_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        frame = {"name": name, "start_memory": start_memory, "child_peak": 0}
+        self._stack.append(frame)
+        start_time = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start_time
+            peak = max(tracemalloc.get_traced_memory()[1], frame["child_peak"])
+            self._stack.pop()
+
+            stage = self.stages[name]
+            stage["calls"] += 1
+            stage["wall_time"] += wall_time
+            stage["peak_memory"] = max(stage["peak_memory"], peak - start_memory)
+
+            if len(self._stack) > 0:
+                # the peak of the parent stage was reset when this stage
+                # was entered, so it has to be propagated upwards
+                parent = self._stack[-1]
+                parent["child_peak"] = max(parent["child_peak"], peak)
+            else:
+                if self._cprofile is not None:
+                    self._cprofile.disable()
+                if self._owns_tracemalloc:
+                    tracemalloc.stop()
+                    self._owns_tracemalloc = False
+
+    def _current_target(self) -> tuple[dict, dict]:
+        if len(self._stack) == 0:
+            return self.counters, self.series
+        stage = self.stages[self._stack[-1]["name"]]
+        return stage["counters"], stage["series"]
+
+    def count(self, name: str, value: int = 1):
+        """Increments the counter with the given name in the current stage.
+
+        Args:
+            name (str): Counter name.
+            value (int): The amount to increment the counter by.
+        """
+        if not self.enabled:
+            return
+        counters, _ = self._current_target()
+        counters[name] = counters.get(name, 0) + value
+
+    def record(self, name: str, value: float):
+        """Adds a value to the series with the given name in the current stage.
+        Only running totals (count, total, min, max) are kept, so the memory use does
+        not grow with the number of recorded values. The mean is added in the report.
+
+        Args:
+            name (str): Series name.
+            value (float): The recorded value.
+        """
+        if not self.enabled:
+            return
+        _, series = self._current_target()
+        totals = series.get(name)
+        if totals is None:
+            series[name] = {"count": 1, "total": value, "min": value, "max": value}
+            return
+        totals["count"] += 1
+        totals["total"] += value
+        totals["min"] = min(totals["min"], value)
+        totals["max"] = max(totals["max"], value)
+
+    def _summarize_series(self, series: dict) -> dict:
+        summary = {}
+        for name, totals in series.items():
+            summary[name] = {**totals, "mean": totals["total"] / totals["count"]}
+        return summary
+
+    def cprofile_stats(self, sort: str = "cumulative", limit: int = 30) -> list[dict]:
+        """Returns the most expensive functions captured by cProfile.
+
+        Args:
+            sort (str): The pstats sort key ("cumulative", "tottime", ...).
+            limit (int): Maximum number of returned functions.
+
+        Returns:
+            list[dict]: One entry per function, empty if cProfile was not enabled.
+        """
+        if self._cprofile is None:
+            return []
+
+        import pstats
+
+        stats = pstats.Stats(self._cprofile)
+        stats.sort_stats(sort)
+        functions = []
+        for func in stats.fcn_list[:limit]:
+            calls, primitive_calls, total_time, cumulative_time, _ = stats.stats[func]
+            filename, line, function_name = func
+            functions.append(
+                {
+                    "function": f"{filename}:{line}({function_name})",
+                    "calls": calls,
+                    "primitive_calls": primitive_calls,
+                    "total_time": total_time,
+                    "cumulative_time": cumulative_time,
+                }
+            )
+        return functions
+
+    def dump_cprofile(self, filename: str):
+        """Writes the captured cProfile data to a file readable by pstats/snakeviz.
+
+        Args:
+            filename (str): The output filename.
+        """
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(filename)
+
+    def to_dict(self) -> dict:
+        """Returns the profiling report as a dictionary.
+
+        Returns:
+            dict: The report with per-stage wall time (seconds), peak memory
+            (bytes), counters and series summaries.
+        """
+        report = {"stages": {}, "counters": dict(self.counters)}
+        for name, stage in self.stages.items():
+            report["stages"][name] = {
+                "calls": stage["calls"],
+                "wall_time": stage["wall_time"],
+                "peak_memory": stage["peak_memory"],
+                "counters": dict(stage["counters"]),
+                "series": self._summarize_series(stage["series"]),
+            }
+        if len(self.series) > 0:
+            report["series"] = self._summarize_series(self.series)
+        if self._cprofile is not None:
+            report["cprofile"] = self.cprofile_stats()
+        return report
+
+    def to_json(self, indent: int | None = 2) -> str:
+        """Returns the profiling report as a JSON string.
+
+        Args:
+            indent (int | None): JSON indentation.
+
+        Returns:
+            str: The JSON-encoded report.
+        """
+        return json.dumps(self.to_dict(), indent=indent)
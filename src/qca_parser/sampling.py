@@ -0,0 +1,382 @@
+from .mig import MIG
+from .profiler import Profiler
+from .subcircuit import LRUCache, SubcircuitEvaluator
+from statistics import NormalDist
+import math
+import numpy as np
+import time
+
+
+def wilson_interval(successes: int, samples: int, z: float) -> tuple[float, float]:
+    """Returns the Wilson score interval of a binomial proportion.
+
+    Args:
+        successes (int): The number of successes.
+        samples (int): The number of samples.
+        z (float): The standard normal quantile of the confidence level.
+
+    Returns:
+        tuple[float, float]: The lower and upper bound of the interval.
+    """
+    if samples == 0:
+        return 0.0, 1.0
+    p = successes / samples
+    denominator = 1 + z**2 / samples
+    center = (p + z**2 / (2 * samples)) / denominator
+    half_width = (
+        z * math.sqrt(p * (1 - p) / samples + z**2 / (4 * samples**2)) / denominator
+    )
+    # the bounds are exactly 0 and 1 for p = 0 and p = 1, but rounding
+    # would otherwise leave them slightly off and exclude p itself
+    low = 0.0 if successes == 0 else max(0.0, center - half_width)
+    high = 1.0 if successes == samples else min(1.0, center + half_width)
+    return low, high
+
+
+class OutputStatistics:
+    """Streaming statistics of one output over the sampled input vectors.
+
+    Besides the signal probability, the statistics record the function of the
+    output as far as it has been observed: if the output depends on at most
+    max_support inputs (see MIG.support), the value seen for every pattern of those
+    inputs, and otherwise only the constants, inputs and inverted inputs the output
+    has matched on every sample so far.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        input_names: list[str],
+        has_reference: bool,
+        support: list[str] | None = None,
+        max_support: int = 10,
+    ):
+        self.name = name
+        self.samples = 0
+        self.ones = 0
+        self.disagreements = 0 if has_reference else None
+
+        # the observed truth table over the support: which patterns have been seen
+        # and for which of them the output was 1
+        if support is not None and len(support) <= max_support:
+            self.support = support
+            self.support_indices = np.array(
+                [input_names.index(input_name) for input_name in support], dtype=int
+            )
+            self.seen = np.zeros(2 ** len(support), dtype=bool)
+            self.seen_ones = np.zeros(2 ** len(support), dtype=bool)
+        else:
+            self.support = None
+
+        # simple functions the output has matched on every sample so far
+        self.candidates = {"0": 0, "1": 1}
+        for i, input_name in enumerate(input_names):
+            self.candidates[input_name] = (i, 0)
+            self.candidates[f"!{input_name}"] = (i, 1)
+
+    def update(
+        self,
+        value: int,
+        full: int,
+        count: int,
+        input_values: list[int],
+        reference: int | None,
+        vectors: np.ndarray | None = None,
+    ):
+        """Adds a batch of samples.
+
+        Args:
+            value (int): The output value of every sample, one bit per sample.
+            full (int): The mask of the used bits.
+            count (int): The number of samples in the batch.
+            input_values (list[int]): The input values of the samples.
+            reference (int | None): The reference value of every sample.
+            vectors (np.ndarray | None): The input vectors, one row per sample, for
+            the observed truth table.
+        """
+        self.samples += count
+        self.ones += value.bit_count()
+        if reference is not None:
+            self.disagreements += (value ^ reference).bit_count()
+
+        if self.support is not None and vectors is not None:
+            weights = 1 << np.arange(len(self.support))
+            patterns = np.asarray(vectors, dtype=np.int64)[:, self.support_indices] @ weights
+            bits = np.unpackbits(
+                np.frombuffer(value.to_bytes((count + 7) // 8, "little"), dtype=np.uint8),
+                bitorder="little",
+            )[:count].astype(bool)
+            self.seen[patterns] = True
+            self.seen_ones[patterns[bits]] = True
+
+        survivors = {}
+        for candidate, definition in self.candidates.items():
+            if definition == 0:
+                expected = 0
+            elif definition == 1:
+                expected = full
+            else:
+                i, inverted = definition
+                expected = input_values[i] ^ full if inverted else input_values[i]
+            if value == expected:
+                survivors[candidate] = definition
+        self.candidates = survivors
+
+    def observed_function(self) -> dict | None:
+        """Returns the observed truth table over the support: bit m is the value of
+        the output when support input j has the value of bit j of m, for the
+        patterns seen so far, or None if the support is too large."""
+        if self.support is None:
+            return None
+        truth_table = 0
+        for m in np.flatnonzero(self.seen_ones).tolist():
+            truth_table |= 1 << m
+        patterns = int(self.seen.sum())
+        return {
+            "inputs": self.support,
+            "truth_table": hex(truth_table),
+            "patterns": patterns,
+            "complete": patterns == len(self.seen),
+        }
+
+    def half_widths(self, z: float) -> list[float]:
+        """Returns the half widths of the confidence intervals of the estimates."""
+        widths = []
+        low, high = wilson_interval(self.ones, self.samples, z)
+        widths.append((high - low) / 2)
+        if self.disagreements is not None:
+            low, high = wilson_interval(self.disagreements, self.samples, z)
+            widths.append((high - low) / 2)
+        return widths
+
+    def to_dict(self, z: float) -> dict:
+        result = {
+            "samples": self.samples,
+            "probability": self.ones / self.samples if self.samples > 0 else None,
+            "interval": list(wilson_interval(self.ones, self.samples, z)),
+            "observed_function": self.observed_function(),
+            "matching_literals": list(self.candidates),
+        }
+        if self.disagreements is not None:
+            result["disagreement"] = {
+                "rate": self.disagreements / self.samples if self.samples > 0 else None,
+                "count": self.disagreements,
+                "interval": list(wilson_interval(self.disagreements, self.samples, z)),
+            }
+        return result
+
+
+class MonteCarloSampler:
+    """Estimates the behavior of a circuit from sampled input vectors, for designs
+    with too many inputs to simulate every combination.
+
+    The input vectors are drawn in batches, either uniformly at random or from a
+    scrambled Sobol sequence (low-discrepancy), and every batch is evaluated at once
+    on the MIG, one bit per sample, by subcircuit (see SubcircuitEvaluator). For
+    every output the sampler keeps the signal probability (the fraction of samples
+    for which the output is 1) with its Wilson confidence interval, the observed
+    function of the output (see OutputStatistics) and, if a reference circuit is
+    given, the fraction of samples on which the output differs from the reference.
+    Sampling stops once all intervals are narrower than the tolerance.
+    """
+
+    def __init__(
+        self,
+        mig: MIG,
+        batch_size: int = 4096,
+        method: str = "random",
+        seed: int | None = None,
+        confidence: float = 0.95,
+        tolerance: float = 0.01,
+        min_samples: int = 1024,
+        max_samples: int = 1 << 24,
+        time_limit: float | None = None,
+        reference: MIG | None = None,
+        max_support: int = 10,
+        profiler: Profiler | None = None,
+    ):
+        """Creates a new sampler.
+
+        Args:
+            mig (MIG): The MIG of the circuit, see build_mig.
+            batch_size (int): The number of input vectors evaluated at once. A power
+            of two keeps the balance properties of the Sobol sequence.
+            method (str): "random" for uniform random vectors, "sobol" for a scrambled
+            Sobol sequence.
+            seed (int | None): The random seed.
+            confidence (float): The confidence level of the intervals.
+            tolerance (float): Sampling stops once the half width of every interval
+            is at most this.
+            min_samples (int): The minimum number of samples before stopping.
+            max_samples (int): The maximum number of samples.
+            time_limit (float | None): The maximum sampling time in seconds.
+            reference (MIG | None): The circuit the outputs are compared with. Its
+            inputs and outputs are matched by name.
+            max_support (int): The truth table of an output is recorded if the
+            output depends on at most this many inputs.
+            profiler (Profiler | None): Profiler for the "sampling" stage.
+        """
+        if method not in ("random", "sobol"):
+            raise ValueError(f"Unknown sampling method '{method}'")
+        if batch_size <= 0:
+            raise ValueError(f"The batch size must be positive, got {batch_size}")
+        if max_samples < 0:
+            raise ValueError(
+                f"The maximum number of samples must not be negative, got {max_samples}"
+            )
+
+        self.mig = mig
+        self.batch_size = batch_size
+        self.method = method
+        self.seed = seed
+        self.confidence = confidence
+        self.tolerance = tolerance
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.time_limit = time_limit
+        self.reference = reference
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self.z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+        self.samples = 0
+        self.batches = 0
+
+        # the batches are evaluated by subcircuit, the circuit and the reference
+        # share the compiled functions of their common tiles
+        cache = LRUCache()
+        self.evaluator = SubcircuitEvaluator(mig, cache=cache, profiler=self.profiler)
+        self.reference_evaluator = (
+            None
+            if reference is None
+            else SubcircuitEvaluator(reference, cache=cache, profiler=self.profiler)
+        )
+
+        if reference is not None:
+            for name in reference.input_names:
+                if name not in mig.input_names:
+                    raise ValueError(f"Reference input '{name}' is not an input of the circuit")
+
+        self.statistics = {}
+        for name, f in zip(mig.output_names, mig.outputs):
+            if f is None:
+                continue
+            has_reference = (
+                reference is not None
+                and name in reference.output_names
+                and reference.outputs[reference.output_names.index(name)] is not None
+            )
+            self.statistics[name] = OutputStatistics(
+                name, mig.input_names, has_reference, mig.support(f), max_support
+            )
+
+    def _draw(self, count: int):
+        """Returns count input vectors as an array with one row per vector."""
+        num_inputs = len(self.mig.input_names)
+        if self.method == "sobol":
+            return self._sobol.random(count) >= 0.5
+        return self._rng.integers(0, 2, size=(count, num_inputs), dtype=np.uint8)
+
+    def _pack(self, vectors) -> list[int]:
+        """Packs the columns of the vectors into ints, sample k in bit k."""
+        packed = np.packbits(np.asarray(vectors, dtype=np.uint8), axis=0, bitorder="little")
+        return [int.from_bytes(packed[:, i].tobytes(), "little") for i in range(packed.shape[1])]
+
+    def converged(self) -> bool:
+        """Returns whether all confidence intervals are narrower than the tolerance."""
+        if self.samples < self.min_samples:
+            return False
+        return all(
+            width <= self.tolerance
+            for s in self.statistics.values()
+            for width in s.half_widths(self.z)
+        )
+
+    def report(self, stopped: str | None = None) -> dict:
+        """Returns the current statistics."""
+        return {
+            "method": self.method,
+            "samples": self.samples,
+            "batches": self.batches,
+            "confidence": self.confidence,
+            "tolerance": self.tolerance,
+            "converged": self.converged(),
+            "stopped": stopped,
+            "outputs": {name: s.to_dict(self.z) for name, s in self.statistics.items()},
+            "unpolarized": [
+                name for name, f in zip(self.mig.output_names, self.mig.outputs) if f is None
+            ],
+        }
+
+    def iter_batches(self):
+        """Samples batch after batch, yielding the current statistics after every
+        batch. The last report says why sampling stopped ("converged", "max_samples"
+        or "time_limit").
+
+        Yields:
+            dict: The statistics so far, see report.
+        """
+        num_inputs = len(self.mig.input_names)
+        if self.method == "sobol":
+            from scipy.stats import qmc  # only needed for low-discrepancy sampling
+
+            self._sobol = qmc.Sobol(d=max(num_inputs, 1), scramble=True, seed=self.seed)
+        else:
+            self._rng = np.random.default_rng(self.seed)
+
+        self.samples = 0
+        self.batches = 0
+        start_time = time.perf_counter()
+
+        while True:
+            count = min(self.batch_size, self.max_samples - self.samples)
+            full = (1 << count) - 1
+
+            with self.profiler.stage("sampling"):
+                vectors = self._draw(count)
+                input_values = self._pack(vectors)[:num_inputs]
+                outputs = self.evaluator.simulate(input_values, full)
+
+                reference_outputs = {}
+                if self.reference is not None:
+                    values = dict(zip(self.mig.input_names, input_values))
+                    reference_values = self.reference_evaluator.simulate(
+                        [values[name] for name in self.reference.input_names], full
+                    )
+                    reference_outputs = dict(
+                        zip(self.reference.output_names, reference_values)
+                    )
+
+                for name, value in zip(self.mig.output_names, outputs):
+                    if name in self.statistics:
+                        self.statistics[name].update(
+                            value,
+                            full,
+                            count,
+                            input_values,
+                            reference_outputs.get(name),
+                            vectors[:, :num_inputs],
+                        )
+
+                self.samples += count
+                self.batches += 1
+                self.profiler.count("samples", count)
+
+            if self.converged():
+                yield self.report("converged")
+                return
+            if self.samples >= self.max_samples:
+                yield self.report("max_samples")
+                return
+            if (
+                self.time_limit is not None
+                and time.perf_counter() - start_time >= self.time_limit
+            ):
+                yield self.report("time_limit")
+                return
+            yield self.report()
+
+    def run(self) -> dict:
+        """Samples until a stopping condition is met and returns the final statistics."""
+        report = None
+        for report in self.iter_batches():
+            pass
+        return report
@@ -0,0 +1,126 @@
+from .cell import Cell, CellFunction
+from .component import Component
+from .graph import Graph, GraphNode
+
+NUM_CLOCK_ZONES = 4
+
+
+def clock_zone(component: Component) -> int:
+    """Returns the clock zone (0-3) of the given component.
+    Components without a valid clock are treated as part of zone 0.
+
+    Args:
+        component (Component): A cell or a gate.
+
+    Returns:
+        int: The clock zone of the component.
+    """
+    clock = component.clock
+    if clock is None or clock < 0 or clock >= NUM_CLOCK_ZONES:
+        return 0
+    return clock
+
+
+class ClockScheduler:
+    """Schedules the evaluation of graph nodes by clock zone.
+
+    A zone is active while its clock signal is above the threshold. When a zone
+    becomes active (switch phase), its cells are polarized by the preceding zone,
+    which is still holding its values; while it stays active (hold phase), already
+    polarized cells keep their polarization. When its clock drops below the threshold
+    (release and relax phases), the cells of the zone are depolarized and not
+    evaluated at all until the zone becomes active again.
+    """
+
+    def __init__(self, graph: Graph, threshold: float = 0.0):
+        """Groups the nodes of the graph by clock zone.
+
+        Args:
+            graph (Graph): The graph to be scheduled.
+            threshold (float): The clock value above which a zone is considered active.
+        """
+        self.graph = graph
+        self.threshold = threshold
+        self.zones = [[] for _ in range(NUM_CLOCK_ZONES)]
+        self.sinks = [[] for _ in range(NUM_CLOCK_ZONES)]
+        self.active = [False] * NUM_CLOCK_ZONES
+
+        for n in graph.nodes:
+            self.zones[clock_zone(n.value)].append(n)
+
+        for zone in range(NUM_CLOCK_ZONES):
+            self.sinks[zone] = self._find_sinks(zone)
+
+    def _find_sinks(self, zone: int) -> list[GraphNode]:
+        """Returns the nodes from which the evaluation of the given zone starts:
+        output cells and nodes that feed the next zone of the pipeline."""
+        next_zone = (zone + 1) % NUM_CLOCK_ZONES
+        sinks = []
+
+        for n in self.zones[zone]:
+            if isinstance(n.value, Cell) and n.value.function == CellFunction.OUTPUT:
+                sinks.append(n)
+            elif next_zone != zone and any(
+                clock_zone(m.value) == next_zone for m in self.graph.node_neighbors(n)
+            ):
+                sinks.append(n)
+
+        if len(sinks) == 0:
+            # nothing leaves this zone, evaluate all of its nodes
+            sinks = list(self.zones[zone])
+
+        return sinks
+
+    def reset(self):
+        """Marks all zones as inactive."""
+        self.active = [False] * NUM_CLOCK_ZONES
+
+    def release(self, zone: int):
+        """Depolarizes all cells of the given zone, except for inputs and fixed cells."""
+        for n in self.zones[zone]:
+            if isinstance(n.value, Cell) and n.value.function in (
+                CellFunction.INPUT,
+                CellFunction.FIXED,
+            ):
+                continue
+            n.value.polarization = None
+
+    def schedule(self, clocks: tuple[float, float, float, float]) -> list[int]:
+        """Advances the zone phases to the given clock values.
+
+        Zones whose clock dropped below the threshold are released. Returns the
+        active zones in pipeline order, starting with the first active zone (by
+        number) whose predecessor zone is inactive, so every zone is evaluated after
+        the zone that drives it. If all zones are active, the order starts at zone 0.
+
+        Args:
+            clocks (tuple[float, float, float, float]): The values of the four clocks.
+
+        Returns:
+            list[int]: The active zones in evaluation order.
+        """
+        active = [clocks[zone] > self.threshold for zone in range(NUM_CLOCK_ZONES)]
+
+        for zone in range(NUM_CLOCK_ZONES):
+            if self.active[zone] and not active[zone]:
+                self.release(zone)
+
+        self.active = active
+
+        if all(active):
+            start = 0
+        else:
+            # the first active zone whose predecessor is inactive
+            start = 0
+            for zone in range(NUM_CLOCK_ZONES):
+                if active[zone] and not active[zone - 1]:
+                    start = zone
+                    break
+
+        order = []
+        for i in range(NUM_CLOCK_ZONES):
+            zone = (start + i) % NUM_CLOCK_ZONES
+            if active[zone] and len(self.zones[zone]) > 0:
+                order.append(zone)
+
+        return order
@@ -1,15 +1,63 @@
-from cell import Cell, CellFunction
-from gate import Gate, GateType
-from graph import Graph, GraphNode
-from math import pi, sin
-from negator import Negator
-from matplotlib import pyplot as plt
-import numpy as np
+from .cell import Cell, CellFunction
+from .dag import SignalFlowDAG
+from enum import Enum
+from .gate import Gate, GateType
+from .graph import Graph, GraphNode
+from math import asin, ceil, inf, pi, sin
+from .negator import Negator
+from .profiler import Profiler
+from .scheduler import ClockScheduler, clock_zone
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .analog import AnalogSolver
+
+
+class SimulationMode(Enum):
+    LOGIC = "LOGIC"
+    ANALOG = "ANALOG"
 
 
 class Simulator:
-    def __init__(self, graph: list[Cell]):
+    # phase offsets of clk0-clk3, see get_clk0_value ... get_clk3_value
+    CLOCK_PHASES = (0, 3 * (pi / 2), pi, pi / 2)
+
+    def __init__(
+        self, graph: Graph, profiler: Profiler | None = None, prune: bool = False
+    ):
+        """Creates a simulator for the given graph.
+
+        Args:
+            graph (Graph): The circuit graph (after structure recognition).
+            profiler (Profiler | None): Profiler for the "prune" and "simulate" stages.
+            prune (bool): Whether to simulate only the cone of influence of the output
+            cells (see Graph.cone_of_influence). Cells that cannot reach an output, such
+            as leftover wire stubs and disconnected islands, are dropped, and the dropped
+            cells and dangling wire ends are reported in self.cone.
+        """
+        self.full_graph = graph
         self.graph = graph
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self.nodes_evaluated = 0
+        self.cone = None
+
+        if prune:
+            with self.profiler.stage("prune"):
+                self.cone = graph.cone_of_influence()
+                self.graph = graph.subgraph(self.cone["live"])
+                self.profiler.count("nodes.live", len(self.cone["live"]))
+                self.profiler.count("nodes.dropped", len(self.cone["dropped"]))
+
+            print(
+                f"Simulating {len(self.cone['live'])} of {len(graph.nodes)} nodes, "
+                f"dropped {len(self.cone['dropped'])} nodes in {len(self.cone['islands'])} islands"
+            )
+            for island in self.cone["islands"]:
+                print(f"    - dropped: {island}")
+            if len(self.cone["dangling"]) > 0:
+                print(f"    - dangling cells: {self.cone['dangling']}")
+            if len(self.cone["unused_inputs"]) > 0:
+                print(f"    - unused inputs: {self.cone['unused_inputs']}")
 
     def get_clk0_value(self, t: float):
         """Returns the value of clk0 at time t."""
@@ -31,62 +79,50 @@ class Simulator:
         self,
         node: GraphNode,
         graph: Graph,
-        visited: list[GraphNode],
-        clk0: float,
-        clk1: float,
-        clk2: float,
-        clk3: float,
+        clocks: tuple[float, float, float, float],
     ):
         component = node.value
-        component.determine_polarization(node, graph, visited, clk0, clk1, clk2, clk3)
+        component.determine_polarization(node, graph, clocks)
 
     def determine_node_polarization(
         self,
         node: GraphNode,
         graph: Graph,
-        visited: list[GraphNode],
-        clk0: float,
-        clk1: float,
-        clk2: float,
-        clk3: float,
+        clocks: tuple[float, float, float, float],
+        zone: int | None = None,
     ):
-        """Returns the value of the cell based on the clock values and other cells."""
-        if node.value.polarization is not None:
-            return node.value.polarization
+        """Returns the value of the cell based on the clock values and other cells.
 
-        # if the node is an input cell, return its polarization
-        if isinstance(node.value, Cell) and node.value.function == CellFunction.INPUT:
-            print(f"Component {node.value.get_name()} is an input cell")
-            return node.value.polarization
+        Unpolarized neighbors are resolved first, walking from the given node towards
+        the input cells with an explicit stack (see Graph.resolve_from), so arbitrarily
+        long wires don't hit the recursion limit. Polarizations determined here stay set
+        until the next reset, so later calls within the same step reuse them.
 
-        visited.append(node)
+        If a clock zone is given, only nodes of that zone are evaluated; nodes of other
+        zones contribute their current polarization (if any) but are never entered.
+        """
 
-        # determine polarizations of unpolarized neighbors
-        neighbors = graph.component_neighbors(node.value)
-        polarized_neighbors = []
+        def is_resolved(n: GraphNode) -> bool:
+            # input cells are never entered, even if they are not polarized
+            return (
+                n.value.polarization is not None
+                or (isinstance(n.value, Cell) and n.value.function == CellFunction.INPUT)
+                or (zone is not None and clock_zone(n.value) != zone)
+            )
 
-        for n in neighbors:
-            if n.value.polarization is not None:
-                polarized_neighbors.append(n)
+        def resolve(n: GraphNode):
+            self.nodes_evaluated += 1
 
-        for n in neighbors:
-            if n not in polarized_neighbors and n not in visited:
-                self.determine_node_polarization(
-                    n, graph, visited, clk0, clk1, clk2, clk3
-                )
+            # determine the polarization of the current node
+            print(f"Processing cell '{n.value.get_name()}'")
 
-        # determine the polarization of the current node
-        print(f"Processing cell '{node.value.get_name()}'")
+            polarization = n.value.determine_polarization(n, graph, clocks)
 
-        component = node.value
+            print(f"Determining polarization of {n.value.get_name()} as {polarization}")
+            n.value.polarization = polarization
 
-        polarization = component.determine_polarization(
-            node, graph, visited, clk0, clk1, clk2, clk3
-        )
-
-        print(f"Determining polarization of {node.value.get_name()} as {polarization}")
-        node.value.polarization = polarization
-        return polarization
+        graph.resolve_from(node, is_resolved, resolve)
+        return node.value.polarization
 
     def reset_cell_polarizations(self):
         for n in self.graph.nodes:
@@ -95,102 +131,619 @@ class Simulator:
             ):
                 n.value.polarization = None
 
-    def simulate(self, num_cycles: int, step: float):
-        # extract input nodes
-        inputs = []
-        for n in self.graph.nodes:
-            if isinstance(n.value, Cell) and n.value.function == CellFunction.INPUT:
-                inputs.append(n)
-
-        # extract output nodes
-        outputs = []
-        for n in self.graph.nodes:
-            if isinstance(n.value, Cell) and n.value.function == CellFunction.OUTPUT:
-                outputs.append(n)
+    def input_nodes(self) -> list[GraphNode]:
+        """Returns the input cells of the circuit, in graph order."""
+        return [
+            n
+            for n in self.graph.nodes
+            if isinstance(n.value, Cell) and n.value.function == CellFunction.INPUT
+        ]
+
+    def output_nodes(self) -> list[GraphNode]:
+        """Returns the output cells of the circuit, in graph order."""
+        return [
+            n
+            for n in self.graph.nodes
+            if isinstance(n.value, Cell) and n.value.function == CellFunction.OUTPUT
+        ]
+
+    def find_nodes(self, names: list[str]) -> list[GraphNode]:
+        """Returns the nodes with the given names or ids.
+
+        Args:
+            names (list[str]): Component names (labels) or ids.
+
+        Returns:
+            list[GraphNode]: The matching nodes, in the order of the given names.
+        """
+        found = []
+        for name in names:
+            for n in self.graph.nodes:
+                if n.value.get_name() == name or n.value.get_id() == name:
+                    found.append(n)
+                    break
+            else:
+                for n in self.full_graph.nodes:
+                    if n.value.get_name() == name or n.value.get_id() == name:
+                        raise ValueError(
+                            f"Component '{name}' is outside of the cone of influence of the outputs"
+                        )
+                raise ValueError(f"No component named '{name}'")
+        return found
+
+    def iter_simulate(
+        self,
+        num_cycles: int,
+        step: float,
+        pipelined: bool = False,
+        adaptive: bool = False,
+        settle_window: int = 4,
+        threshold: float = 0.0,
+        mode: SimulationMode = SimulationMode.LOGIC,
+        logic_threshold: float = 0.5,
+        probes: list[str] | None = None,
+        levelized: bool = False,
+    ):
+        """Simulates the circuit for every combination of input values, yielding
+        the result of each combination as soon as it is known.
+
+        Only the steps of the current combination are kept in memory, so the memory
+        use does not grow with the number of combinations.
+
+        Args:
+            num_cycles (int): The number of clock cycles to simulate.
+            step (float): The time step of the simulation.
+            pipelined (bool): If true, nodes are evaluated by clock zone (see ClockScheduler)
+            and keep their polarization between steps, so values propagate through the
+            four-phase clocking pipeline. Otherwise all nodes are evaluated at every step.
+            adaptive (bool): If true, steps at which neither the inputs nor the clock activity
+            change are skipped, and each input combination ends as soon as it has settled.
+            settle_window (int): The number of consecutive evaluated steps at which the state of
+            the circuit must equal its state one clock period earlier for the combination to be
+            considered settled (pipelined adaptive mode only).
+            threshold (float): The clock value above which a clock zone is active.
+            mode (SimulationMode): In LOGIC mode, polarizations are 0, 1 or None. In ANALOG
+            mode, they are continuous values in [-1, 1] computed by AnalogSolver; the clocks
+            always modulate the cells, so the pipelined flag is implied, and adaptive stepping
+            is not used because the state changes continuously.
+            logic_threshold (float): In ANALOG mode, the absolute polarization above which an
+            output is read as logic 0 or 1.
+            probes (list[str] | None): Names or ids of components whose polarization is traced
+            at every evaluated step. If None, no traces are recorded.
+            levelized (bool): If true (and neither pipelined nor ANALOG), the nodes are
+            evaluated in one pass in the topological order of their signal flow (see
+            SignalFlowDAG) instead of walking back from the outputs. The rows then also
+            contain whether the feedback loops settled ("converged").
+
+        Yields:
+            dict: One row per input combination with its index ("combination"), the input
+            vector ("inputs") and the output values ("outputs"). In pipelined mode the row also
+            contains the latency (in clock cycles) after which the outputs settled, and in
+            adaptive mode whether the combination settled before its time ran out. In ANALOG
+            mode, it also contains the strongest polarization each output reached with its final
+            logic value, as a measure of signal quality, and whether the feedback loops of the
+            circuit settled at every step ("converged"). If probes are given, "trace" contains
+            the times, clock values and probed polarizations of the evaluated steps.
+        """
+        analog = mode == SimulationMode.ANALOG
+        clocked = pipelined or analog
+        adaptive = adaptive and not analog
+
+        with self.profiler.stage("simulate"):
+            inputs = self.input_nodes()
+            outputs = self.output_nodes()
+            probed = self.find_nodes(probes) if probes is not None else []
+
+            num_combinations = 2 ** len(inputs)
+            smallest_input_duration = num_cycles / num_combinations
+            print(
+                f"Simulating {num_combinations} input combinations with step {step} for {num_cycles} clock cycles."
+            )
+
+            if analog:
+                from .analog import AnalogSolver
+
+                solver = AnalogSolver(self.graph)
+                self.reset_cell_polarizations()
+            elif pipelined:
+                scheduler = ClockScheduler(self.graph, threshold)
+                self.reset_cell_polarizations()
+            elif levelized:
+                dag = SignalFlowDAG(self.graph, self.profiler)
 
-        num_combinations = 2 ** len(inputs)
-        smallest_input_duration = num_cycles / num_combinations
-        print(
-            f"Simulating {num_combinations} input combinations with step {step} for {num_cycles} clock cycles."
-        )
+        for comb in range(0, num_combinations):
+            with self.profiler.stage("simulate"):
+                row = self.simulate_combination(
+                    comb,
+                    inputs,
+                    outputs,
+                    probed,
+                    comb * smallest_input_duration,
+                    (comb + 1) * smallest_input_duration,
+                    num_cycles,
+                    step,
+                    pipelined,
+                    adaptive,
+                    settle_window,
+                    threshold,
+                    analog,
+                    logic_threshold,
+                    solver if analog else None,
+                    scheduler if pipelined and not analog else None,
+                    dag if levelized and not clocked else None,
+                    probes is not None,
+                )
+                self.profiler.count("combinations")
 
-        # initialize the list of input values
-        input_values = []
-        for i in range(0, len(inputs)):
-            input_values.append([])
+            yield row
 
-        # initialize the list of output values
-        output_values = []
-        for i in range(0, len(outputs)):
-            output_values.append([])
+    def simulate_combination(
+        self,
+        comb: int,
+        inputs: list[GraphNode],
+        outputs: list[GraphNode],
+        probed: list[GraphNode],
+        comb_start: float,
+        comb_end: float,
+        num_cycles: int,
+        step: float,
+        pipelined: bool,
+        adaptive: bool,
+        settle_window: int,
+        threshold: float,
+        analog: bool,
+        logic_threshold: float,
+        solver: "AnalogSolver | None",
+        scheduler: ClockScheduler | None,
+        dag: SignalFlowDAG | None,
+        trace: bool,
+    ) -> dict:
+        """Simulates a single input combination, see iter_simulate."""
+        clocked = pipelined or analog
+
+        comb_times = []
+        comb_outputs = []
+        comb_analog = []
+        comb_settled = not adaptive
+        comb_converged = True
+        clk_values = [[] for _ in range(4)]
+        probe_values = [[] for _ in probed]
+
+        # the state of the circuit can only change when the inputs change or
+        # (in pipelined mode) when a clock crosses the activity threshold
+        snapshots = {}
+        repeats = 0
+
+        times = self.time_steps(comb_start, comb_end, step)
+        input_vector = [(comb >> (len(inputs) - 1 - i)) & 1 for i in range(len(inputs))]
+
+        k = 0
+        while k < len(times):
+            t = times[k]
+            if not clocked:
+                self.reset_cell_polarizations()
+            self.nodes_evaluated = 0
+
+            # set input values
+            for n, polarization in zip(inputs, input_vector):
+                n.value.polarization = polarization
+
+            print(f"============== Input vector: {input_vector}")
+
+            clocks = self.get_clock_values(t * num_cycles)
+
+            if analog:
+                iterations = solver.solve(clocks)
+                self.nodes_evaluated = solver.evaluations
+                self.profiler.record("analog_iterations", iterations)
+                if not solver.converged:
+                    print(f"WARNING: feedback loops did not settle within {iterations} sweeps")
+                    self.profiler.count("analog_unconverged")
+                    comb_converged = False
+            elif pipelined:
+                # evaluate the active clock zones, starting at the nodes
+                # that feed the next zone and walking back towards
+                # the nodes driven by the previous zone
+                for zone in scheduler.schedule(clocks):
+                    for n in scheduler.sinks[zone]:
+                        self.determine_node_polarization(n, self.graph, clocks, zone)
+            elif dag is not None:
+                # evaluate every node once, after the nodes that drive it
+                self.nodes_evaluated = dag.evaluate(clocks)
+                if not dag.converged:
+                    print("WARNING: feedback loops did not settle")
+                    self.profiler.count("levelized_unconverged")
+                    comb_converged = False
+            else:
+                # determine polarizations of cells by starting at
+                # the output cells and walking towards
+                # the input cells
+                for n in outputs:
+                    self.determine_node_polarization(n, self.graph, clocks)
 
-        # initialize lists of values for clock signals
-        clk_values = []
-        for i in range(4):
-            clk_values.append([])
+            # save output values
+            for n in outputs:
+                print(
+                    f"Saving value of component {n.value.get_name()}: {n.value.polarization}"
+                )
 
-        # initialize the dictionary of cell values
-        cell_values = {}
-        for n in self.graph.nodes:
-            cell_values[n.value.get_id()] = []
+            comb_times.append(t)
+            if analog:
+                comb_analog.append([n.value.polarization for n in outputs])
+                comb_outputs.append(
+                    [
+                        self.polarization_to_logic(n.value.polarization, logic_threshold)
+                        for n in outputs
+                    ]
+                )
+            else:
+                comb_outputs.append([n.value.polarization for n in outputs])
+
+            if trace:
+                for i in range(4):
+                    clk_values[i].append(clocks[i])
+                for i, n in enumerate(probed):
+                    probe_values[i].append(n.value.polarization)
+
+            self.profiler.count("steps")
+            self.profiler.record("nodes_evaluated", self.nodes_evaluated)
+
+            if not adaptive:
+                k += 1
+                continue
+
+            phase = self.clock_activity(clocks, threshold) if pipelined else ()
+            snapshot = tuple(n.value.polarization for n in self.graph.nodes)
+
+            # the circuit is settled once the state at each clock phase
+            # equals the state one clock period before
+            if snapshots.get(phase) == snapshot:
+                repeats += 1
+            else:
+                repeats = 0
+            snapshots[phase] = snapshot
+
+            if not pipelined or repeats >= settle_window:
+                # without clocking the state only depends on the inputs
+                comb_settled = True
+                self.profiler.count("skipped_steps", len(times) - k - 1)
+                break
+
+            # skip the steps before the next change of the clock phases
+            next_k = self.next_phase_change(times, k, num_cycles, threshold, phase)
+            self.profiler.count("skipped_steps", next_k - k - 1)
+            k = next_k
+
+        row = {"combination": comb, "inputs": input_vector}
+
+        if clocked:
+            # the outputs are only polarized while their zone is active,
+            # use the last value they held
+            final_values = self.last_polarized_values(comb_outputs)
+            row["outputs"] = final_values
+
+            latency = self.settling_time(comb_times, comb_outputs, final_values)
+            if latency is not None:
+                latency = float((latency - comb_start) * num_cycles / (2 * pi))
+            row["latency"] = latency
+
+            if analog:
+                row["polarization"] = self.peak_polarizations(comb_analog, final_values)
+                row["converged"] = comb_converged
+        else:
+            row["outputs"] = [n.value.polarization for n in outputs]
+            if dag is not None:
+                row["converged"] = comb_converged
+
+        if adaptive:
+            row["settled"] = comb_settled
+
+        if trace:
+            row["trace"] = {
+                "times": [float(t) for t in comb_times],
+                "clocks": clk_values,
+                "nodes": {
+                    n.value.get_name(): values for n, values in zip(probed, probe_values)
+                },
+            }
+
+        return row
+
+    def simulate(
+        self,
+        num_cycles: int,
+        step: float,
+        pipelined: bool = False,
+        adaptive: bool = False,
+        settle_window: int = 4,
+        threshold: float = 0.0,
+        mode: SimulationMode = SimulationMode.LOGIC,
+        logic_threshold: float = 0.5,
+        plot: bool = True,
+        levelized: bool = False,
+    ):
+        """Simulates the circuit for every combination of input values and plots
+        the input, output and clock waveforms. See iter_simulate for the arguments.
+
+        Args:
+            plot (bool): Whether to plot the waveforms.
+
+        Returns:
+            dict: The truth table with the input names, output names and the output values
+            for every input combination. In pipelined mode it also contains the latency
+            (in clock cycles) after which the outputs settled for each combination, and in
+            adaptive mode whether each combination settled before its time ran out. In ANALOG
+            mode, it also contains the strongest polarization each output reached with its final
+            logic value, as a measure of signal quality, and whether the analog solver
+            converged at every step of each combination (also in levelized mode, for the
+            feedback loops).
+        """
+        inputs = self.input_nodes()
+        outputs = self.output_nodes()
 
         truth_table_values = []
-
-        for comb in range(0, num_combinations):
-            # simulate for smallest_input_duration steps
-
-            for t in np.arange(
-                comb * smallest_input_duration,
-                (comb + 1) * smallest_input_duration,
-                step,
-            ):
-                self.reset_cell_polarizations()
-                input_vector = []
-
-                # set input values
+        latencies = []
+        settled = []
+        output_polarizations = []
+        converged = []
+
+        time_values = []
+        clk_values = [[] for _ in range(4)]
+        input_values = [[] for _ in inputs]
+        output_values = [[] for _ in outputs]
+
+        rows = self.iter_simulate(
+            num_cycles,
+            step,
+            pipelined,
+            adaptive,
+            settle_window,
+            threshold,
+            mode,
+            logic_threshold,
+            probes=[n.value.get_id() for n in inputs + outputs] if plot else None,
+            levelized=levelized,
+        )
+        for row in rows:
+            truth_table_values.append(row["outputs"])
+            if "latency" in row:
+                latencies.append(row["latency"])
+            if "settled" in row:
+                settled.append(row["settled"])
+            if "polarization" in row:
+                output_polarizations.append(row["polarization"])
+            if "converged" in row:
+                converged.append(row["converged"])
+
+            if plot:
+                trace = row["trace"]
+                time_values.extend(trace["times"])
+                for i in range(4):
+                    clk_values[i].extend(trace["clocks"][i])
                 for i, n in enumerate(inputs):
-                    polarization = (comb >> (len(inputs) - 1 - i)) & 1
-                    n.value.polarization = polarization
-                    # print(
-                    #     f"Cell {n.value.get_id()} (label {n.value.label}) set to {n.value.polarization}"
-                    # )
+                    input_values[i].extend(trace["nodes"][n.value.get_name()])
+                for i, n in enumerate(outputs):
+                    output_values[i].extend(trace["nodes"][n.value.get_name()])
+
+        if plot:
+            with self.profiler.stage("plot"):
+                self.plot(
+                    inputs, outputs, time_values, input_values, output_values, clk_values
+                )
 
-                    input_vector.append(polarization)
-                    input_values[i].append(polarization)
+        truth_table = {}
+        truth_table["inputs"] = [n.value.get_name() for n in inputs]
+        truth_table["outputs"] = [n.value.get_name() for n in outputs]
+        truth_table["values"] = truth_table_values
+        if len(latencies) > 0:
+            truth_table["latency"] = latencies
+        if len(settled) > 0:
+            truth_table["settled"] = settled
+        if len(output_polarizations) > 0:
+            truth_table["polarization"] = output_polarizations
+        if len(converged) > 0:
+            truth_table["converged"] = converged
+        return truth_table
 
-                print(f"============== Input vector: {input_vector}")
+    def clock_activity(
+        self, clocks: tuple[float, float, float, float], threshold: float
+    ) -> tuple[bool, bool, bool, bool]:
+        """Returns which of the clocks are above the threshold."""
+        return tuple(clk > threshold for clk in clocks)
 
-                clk0 = self.get_clk0_value(t * num_cycles)
-                clk1 = self.get_clk1_value(t * num_cycles)
-                clk2 = self.get_clk2_value(t * num_cycles)
-                clk3 = self.get_clk3_value(t * num_cycles)
+    def next_clock_crossing(self, angle: float, threshold: float) -> float:
+        """Returns the first clock angle, not before the given one, at which
+        any of the four clocks crosses the threshold.
 
-                # determine polarizations of cells by starting at
-                # the output cells and recursively checking towards
-                # the input cells
-                for n in outputs:
-                    self.determine_node_polarization(
-                        n, self.graph, [], clk0, clk1, clk2, clk3
-                    )
+        Args:
+            angle (float): The current clock angle (time multiplied by the number of cycles).
+            threshold (float): The clock threshold.
 
-                # save output values
-                for n in outputs:
-                    print(
-                        f"Saving value of component {n.value.get_name()}: {n.value.polarization}"
-                    )
-                    output_values[outputs.index(n)].append(n.value.polarization)
+        Returns:
+            float: The angle of the next threshold crossing.
+        """
+        a = asin(max(-1.0, min(1.0, threshold)))
+        crossing = inf
 
-                # save values
-                for n in self.graph.nodes:
-                    cell_values[n.value.get_id()].append(n.value.polarization)
+        for phase in self.CLOCK_PHASES:
+            x = angle + phase
+            # sin(x) equals the threshold at a + 2k*pi and pi - a + 2k*pi
+            for base in (a, pi - a):
+                m = ceil((x - base) / (2 * pi))
+                crossing = min(crossing, base + 2 * pi * m - phase)
 
-                # determine output values
-                clk_values[0].append(clk0)
-                clk_values[1].append(clk1)
-                clk_values[2].append(clk2)
-                clk_values[3].append(clk3)
+        return crossing
+
+    def next_phase_change(
+        self,
+        times: list[float],
+        k: int,
+        num_cycles: int,
+        threshold: float,
+        phase: tuple[bool, bool, bool, bool],
+    ) -> int:
+        """Returns the index of the first time step after step k at which
+        the clock activity differs from the given phase.
+
+        Args:
+            times (list[float]): The time steps of the current input combination.
+            k (int): The index of the current step.
+            num_cycles (int): The number of simulated clock cycles.
+            threshold (float): The clock threshold.
+            phase (tuple[bool, bool, bool, bool]): The clock activity at step k.
+
+        Returns:
+            int: The index of the next step to evaluate, len(times) if there is none.
+        """
+        if len(times) < 2:
+            return len(times)
+
+        step = times[1] - times[0]
+        crossing = self.next_clock_crossing(times[k] * num_cycles, threshold)
+        estimate = ceil((crossing / num_cycles - times[0]) / step) - 1
+        j = min(max(k + 1, estimate), len(times))
+
+        # correct for rounding errors around the crossing
+        if j > k + 1 and self.clock_activity(
+            self.get_clock_values(times[j - 1] * num_cycles), threshold
+        ) != phase:
+            j = k + 1
+        while j < len(times) and self.clock_activity(
+            self.get_clock_values(times[j] * num_cycles), threshold
+        ) == phase:
+            j += 1
+
+        return j
+
+    def time_steps(self, start: float, stop: float, step: float) -> list[float]:
+        """Returns the times start, start + step, ... that are smaller than stop."""
+        return [start + i * step for i in range(max(0, ceil((stop - start) / step)))]
+
+    def get_clock_values(self, t: float) -> tuple[float, float, float, float]:
+        """Returns the values of all four clocks at time t."""
+        return (
+            self.get_clk0_value(t),
+            self.get_clk1_value(t),
+            self.get_clk2_value(t),
+            self.get_clk3_value(t),
+        )
 
-            truth_table_values.append([n.value.polarization for n in outputs])
+    def polarization_to_logic(self, polarization: float | None, threshold: float) -> int | None:
+        """Converts an analog polarization to a logic value.
+
+        Args:
+            polarization (float | None): The polarization in [-1, 1].
+            threshold (float): The minimum absolute polarization of a valid logic value.
+
+        Returns:
+            int | None: 1 for positive and 0 for negative polarizations, None if the
+            polarization is too weak.
+        """
+        if polarization is None or abs(polarization) < threshold:
+            return None
+        return 1 if polarization > 0 else 0
+
+    def peak_polarizations(
+        self, polarization_vectors: list[list[float]], final_values: list[int | None]
+    ) -> list[float | None]:
+        """Returns the strongest polarization each output reached with its final logic value.
+
+        Args:
+            polarization_vectors (list[list[float]]): The analog output values at each step.
+            final_values (list[int | None]): The final logic value of each output.
+
+        Returns:
+            list[float | None]: The peak polarization of each output, None if it has no final value.
+        """
+        peaks = []
+        for i, final in enumerate(final_values):
+            peak = None
+            if final is not None:
+                sign = 1 if final == 1 else -1
+                for vector in polarization_vectors:
+                    if vector[i] is not None and (peak is None or sign * vector[i] > sign * peak):
+                        peak = vector[i]
+            peaks.append(peak)
+        return peaks
+
+    def last_polarized_values(self, output_vectors: list[list[int | None]]) -> list[int | None]:
+        """Returns the last non-None value of every output.
+
+        Args:
+            output_vectors (list[list[int | None]]): The output values at each step.
+
+        Returns:
+            list[int | None]: The last polarization of each output, None if it was never polarized.
+        """
+        if len(output_vectors) == 0:
+            return []
+
+        values = [None] * len(output_vectors[0])
+        for vector in output_vectors:
+            for i, v in enumerate(vector):
+                if v is not None:
+                    values[i] = v
+        return values
+
+    def settling_time(
+        self,
+        times: list[float],
+        output_vectors: list[list[int | None]],
+        final_values: list[int | None],
+    ) -> float | None:
+        """Returns the time at which all outputs took on their final values for good.
+
+        Args:
+            times (list[float]): The time of each step.
+            output_vectors (list[list[int | None]]): The output values at each step.
+            final_values (list[int | None]): The final value of each output.
+
+        Returns:
+            float | None: The settling time, None if some output never reached its final value.
+        """
+        settled_at = []
+        for i, final in enumerate(final_values):
+            if final is None:
+                return None
+
+            # the first step with the final value after the last step with a different value
+            first_final = None
+            for step_index, vector in enumerate(output_vectors):
+                if vector[i] is None:
+                    continue
+                if vector[i] != final:
+                    first_final = None
+                elif first_final is None:
+                    first_final = step_index
+            settled_at.append(first_final)
+
+        if len(settled_at) == 0:
+            return None
+        return times[max(settled_at)]
+
+    def sample(self, **kwargs) -> dict:
+        """Estimates the output statistics from sampled input vectors instead of
+        simulating every input combination, for designs with many inputs. The
+        samples are evaluated on the minimized MIG of the graph.
+
+        Args:
+            **kwargs: Options of MonteCarloSampler (batch_size, method, seed,
+            confidence, tolerance, max_samples, time_limit, reference, ...).
+
+        Returns:
+            dict: The statistics, see MonteCarloSampler.report.
+        """
+        from .mig import build_mig
+        from .sampling import MonteCarloSampler
+
+        mig = build_mig(self.graph, profiler=self.profiler)
+        return MonteCarloSampler(mig, profiler=self.profiler, **kwargs).run()
+
+    def plot(self, inputs, outputs, times, input_values, output_values, clk_values):
+        """Plots the input, output and clock waveforms of a simulation.
+        Skipped steps hold the value of the last evaluated step."""
+        # imported here, matplotlib is slow to import and only needed for plotting
+        from matplotlib import pyplot as plt
 
         num_subplots = len(inputs) + len(outputs) + 4
 
@@ -198,24 +751,18 @@ class Simulator:
         for i in range(0, len(inputs)):
             plt.subplot(num_subplots, 1, i + 1)
             plt.title(inputs[i].value.label)
-            plt.plot(input_values[i], color="blue")
+            plt.step(times, input_values[i], where="post", color="blue")
 
         # plot outputs
         for i in range(0, len(outputs)):
             plt.subplot(num_subplots, 1, len(inputs) + i + 1)
             plt.title(outputs[i].value.label)
-            plt.plot(output_values[i], color="yellow")
+            plt.step(times, output_values[i], where="post", color="yellow")
 
         # plot clock values
         for i in range(0, 4):
             plt.subplot(num_subplots, 1, len(inputs) + len(outputs) + i + 1)
             plt.title(f"clk{i}")
-            plt.plot(clk_values[i], color="red")
+            plt.step(times, clk_values[i], where="post", color="red")
 
         plt.show()
-
-        truth_table = {}
-        truth_table["inputs"] = [n.value.get_name() for n in inputs]
-        truth_table["outputs"] = [n.value.get_name() for n in outputs]
-        truth_table["values"] = truth_table_values
-        return truth_table
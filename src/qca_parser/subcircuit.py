@@ -0,0 +1,324 @@
+from .mig import MIG
+from .profiler import Profiler
+from collections import OrderedDict
+
+
+class LRUCache:
+    """A dictionary with a maximum size that evicts the least recently used entry."""
+
+    def __init__(self, max_size: int = 4096):
+        """Creates an empty cache.
+
+        Args:
+            max_size (int): The maximum number of entries.
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the value of the key (marking it as recently used), or None."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """Stores a value, evicting the least recently used entry if the cache is full."""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class Subcircuit:
+    def __init__(self, root: int, leaves: list[int], key: tuple):
+        """A fanout-free region of a MIG.
+
+        Args:
+            root (int): The root node. Only the root is used outside of the region.
+            leaves (list[int]): The nodes the region depends on (inputs, the constant
+            or roots of other regions), in canonical order.
+            key (tuple): The canonical structure of the region, equal for all
+            regions that compute the same function of their leaves the same way.
+        """
+        self.root = root
+        self.leaves = leaves
+        self.key = key
+
+
+class SubcircuitEvaluator:
+    """Splits a MIG into subcircuits and computes the function of each distinct
+    subcircuit only once.
+
+    The MIG is cut into fanout-free regions: every gate that is used by more than
+    one gate or by an output starts a new region, and regions are also cut where
+    they would depend on more than max_leaves nodes. Every region is hashed by its
+    canonical structure, in which the leaves are numbered in the order a canonical
+    traversal reaches them, so repeated tiles of a layout (e.g. the full adders of a
+    ripple-carry adder) get the same key no matter where they are. The function of
+    a key is built once (see compile_key) and kept in an LRU cache, and every
+    other region with the same key reuses it.
+    """
+
+    def __init__(
+        self,
+        mig: MIG,
+        max_leaves: int = 6,
+        cache: LRUCache | None = None,
+        profiler: Profiler | None = None,
+    ):
+        """Splits the MIG into subcircuits.
+
+        Args:
+            mig (MIG): The MIG (usually minimized, see build_mig).
+            max_leaves (int): The maximum number of leaves of a subcircuit. The
+            truth table of a subcircuit has up to 2**max_leaves bits.
+            cache (LRUCache | None): The cache of subcircuit functions, which can be
+            shared between evaluators, e.g. to reuse the tiles of another design.
+            profiler (Profiler | None): Profiler for the "subcircuits" stage.
+        """
+        self.mig = mig
+        self.max_leaves = max_leaves
+        self.cache = cache if cache is not None else LRUCache()
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self._shape_ids = {}
+
+        with self.profiler.stage("subcircuits"):
+            self.roots = self._find_roots()
+            self.subcircuits = [self._canonicalize(root) for root in sorted(self.roots)]
+            self.profiler.count("subcircuits", len(self.subcircuits))
+            self.profiler.count(
+                "subcircuits.distinct", len({s.key for s in self.subcircuits})
+            )
+
+    def _find_roots(self) -> set[int]:
+        """Returns the root nodes of the regions."""
+        mig = self.mig
+        fanouts = mig.fanouts()
+        roots = {f >> 1 for f in mig.outputs if f is not None and mig.is_majority(f)}
+        roots.update(n for n, count in fanouts.items() if count > 1 and mig.is_majority(n << 1))
+
+        # leaves of the region that would end in each node
+        leaves = {}
+        for node in mig.reachable():
+            children = [child >> 1 for child in mig.node_children[node]]
+            region_leaves = set()
+            for child in children:
+                if child in leaves and child not in roots:
+                    region_leaves.update(leaves[child])
+                else:
+                    region_leaves.add(child)
+
+            if len(region_leaves) > self.max_leaves:
+                # cut the region at the children of this node
+                for child in children:
+                    if child in leaves:
+                        roots.add(child)
+                region_leaves = set(children)
+
+            leaves[node] = region_leaves
+
+        return roots
+
+    def _is_leaf(self, node: int, root: int) -> bool:
+        return node != root and (node in self.roots or not self.mig.is_majority(node << 1))
+
+    def _canonicalize(self, root: int) -> Subcircuit:
+        """Computes the canonical structure of the region of the given root."""
+        mig = self.mig
+
+        # structure of every gate of the region with anonymous leaves (as an id),
+        # used to order the children independently of the node numbering
+        shapes = {}
+
+        def child_shape(child: int) -> tuple[int, int]:
+            node = child >> 1
+            return (child & 1, 0 if self._is_leaf(node, root) else shapes[node])
+
+        stack = [root]
+        while len(stack) > 0:
+            node = stack[-1]
+            pending = [
+                child >> 1
+                for child in mig.node_children[node]
+                if not self._is_leaf(child >> 1, root) and (child >> 1) not in shapes
+            ]
+            if len(pending) > 0:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            shape = tuple(sorted(child_shape(child) for child in mig.node_children[node]))
+            shapes[node] = self._shape_ids.setdefault(shape, len(self._shape_ids) + 1)
+
+        # serialize the region in pre-order: the complement bit of every edge, followed
+        # by "M" for a gate or -(i + 1) for the i-th leaf, numbered as they are reached
+        key = []
+        leaves = []
+        leaf_numbers = {}
+        stack = [root << 1]
+        while len(stack) > 0:
+            edge = stack.pop()
+            node = edge >> 1
+            key.append(edge & 1)
+            if self._is_leaf(node, root):
+                if node not in leaf_numbers:
+                    leaf_numbers[node] = len(leaves)
+                    leaves.append(node)
+                key.append(-(leaf_numbers[node] + 1))
+            else:
+                key.append("M")
+                children = sorted(mig.node_children[node], key=child_shape)
+                stack.extend(reversed(children))
+
+        return Subcircuit(root, leaves, tuple(key))
+
+    def function(self, subcircuit: Subcircuit):
+        """Returns the compiled function of the subcircuit (see compile_key), which
+        computes the root from the leaf values. Compiled once per distinct subcircuit."""
+        function = self.cache.get(subcircuit.key)
+        if function is None:
+            function = compile_key(subcircuit.key, len(subcircuit.leaves))
+            self.cache.put(subcircuit.key, function)
+        return function
+
+    def truth_table(self, subcircuit: Subcircuit) -> int:
+        """Returns the truth table of the subcircuit: bit m is the value of the root
+        when leaf j has the value of bit j of m."""
+        return evaluate_key(
+            subcircuit.key, len(subcircuit.leaves), self.function(subcircuit)
+        )
+
+    def simulate(self, input_values: list[int], full: int) -> list[int | None]:
+        """Evaluates the outputs for many input combinations at once, like
+        MIG.simulate, but one subcircuit at a time using its cached function.
+
+        Args:
+            input_values (list[int]): The values of the inputs (in input order).
+            full (int): The mask of all used bits.
+
+        Returns:
+            list[int | None]: The values of the outputs, None for unpolarized outputs.
+        """
+        mig = self.mig
+        values = {0: 0}
+        for name, value in zip(mig.input_names, input_values):
+            values[mig.input_nodes[name]] = value & full
+
+        with self.profiler.stage("subcircuits"):
+            hits, misses = self.cache.hits, self.cache.misses
+            # the roots are in topological order, every leaf is evaluated before its region
+            for subcircuit in self.subcircuits:
+                values[subcircuit.root] = self.function(subcircuit)(
+                    *[values[leaf] for leaf in subcircuit.leaves], full
+                )
+            self.profiler.count("subcircuits.cache_hits", self.cache.hits - hits)
+            self.profiler.count("subcircuits.cache_misses", self.cache.misses - misses)
+
+        return [
+            None if f is None else (values[f >> 1] ^ full if f & 1 else values[f >> 1])
+            for f in mig.outputs
+        ]
+
+    def iter_rows(self, block_size: int = 4096):
+        """Yields the truth table rows like MIG.iter_rows, evaluated by subcircuit."""
+        return self.mig.iter_rows(block_size, simulate=self.simulate)
+
+    def summary(self, limit: int = 10) -> dict:
+        """Returns the number of subcircuits, the number of distinct ones, the cache
+        statistics and the most often repeated subcircuits."""
+        instances = {}
+        for subcircuit in self.subcircuits:
+            instances.setdefault(subcircuit.key, []).append(subcircuit)
+
+        repeated = sorted(instances.values(), key=len, reverse=True)[:limit]
+        return {
+            "subcircuits": len(self.subcircuits),
+            "distinct": len(instances),
+            "cache": self.cache.stats(),
+            "repeated": [
+                {
+                    "instances": len(group),
+                    "leaves": len(group[0].leaves),
+                    "gates": group[0].key.count("M"),
+                    "truth_table": hex(self.truth_table(group[0])),
+                }
+                for group in repeated
+                if len(group) > 1
+            ],
+        }
+
+
+def compile_key(key: tuple, num_leaves: int):
+    """Turns a canonical subcircuit structure into a function that evaluates the
+    root from the leaf values (and the mask of all used bits), see
+    SubcircuitEvaluator.function.
+
+    The key is translated once into a table with one row per gate, which holds the
+    positions of the gate's three operands in the list of values (leaves first, then
+    the gates in evaluation order) and whether each operand is complemented. The
+    function only walks this table, so evaluating an instance costs one call and no
+    lookups in the key.
+    """
+    # evaluate the pre-order serialization backwards, every gate finds its three
+    # children on the stack as (position, complemented)
+    gates = []
+    stack = []
+    for token in reversed(key):
+        if token == "M":
+            a, b, c = stack.pop(), stack.pop(), stack.pop()
+            gates.append((*a, *b, *c))
+            stack.append((num_leaves + len(gates) - 1, 0))
+        elif token < 0:
+            stack.append((-token - 1, 0))
+        elif token == 1:
+            position, complemented = stack.pop()
+            stack.append((position, complemented ^ 1))
+    root, root_complemented = stack[0]
+
+    def evaluate(*arguments: int) -> int:
+        full = arguments[-1]
+        masks = (0, full)
+        values = list(arguments[:-1])
+        for a, ca, b, cb, c, cc in gates:
+            x, y, z = values[a] ^ masks[ca], values[b] ^ masks[cb], values[c] ^ masks[cc]
+            values.append((x & y) | (x & z) | (y & z))
+        return values[root] ^ masks[root_complemented]
+
+    return evaluate
+
+
+def evaluate_key(key: tuple, num_leaves: int, function=None) -> int:
+    """Computes the truth table of a canonical subcircuit structure, see
+    SubcircuitEvaluator.truth_table. function is the compiled key, compiled here if
+    not given."""
+    size = 2**num_leaves
+    full = (1 << size) - 1
+
+    # leaf j is 1 in the rows whose index has bit j set
+    leaf_values = []
+    for j in range(num_leaves):
+        value = 0
+        for m in range(size):
+            if (m >> j) & 1:
+                value |= 1 << m
+        leaf_values.append(value)
+
+    if function is None:
+        function = compile_key(key, num_leaves)
+    return function(*leaf_values, full)
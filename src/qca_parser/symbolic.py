@@ -0,0 +1,50 @@
+from .cell import Cell, CellFunction
+from .graph import Graph, GraphNode
+
+
+def evaluate_symbolic(graph: Graph, algebra, outputs: list[GraphNode]) -> dict:
+    """Computes the logic function of the given nodes symbolically, i.e. for all
+    input combinations at once.
+
+    The graph is walked exactly like in the logic simulation (see
+    Simulator.determine_node_polarization), but every node gets a function of the
+    inputs instead of a polarization, via the determine_function method of its
+    component. A node whose function stays None is unpolarized, and is entered
+    again by later outputs, just like an unpolarized node in the simulation.
+
+    The algebra builds the functions and must provide variable(name),
+    constant(value), negate(f), and_(f, g), or_(f, g) and majority(f, g, h),
+    e.g. a BDD manager.
+
+    Args:
+        graph (Graph): The circuit graph (after structure recognition).
+        algebra: The object that builds the functions.
+        outputs (list[GraphNode]): The nodes whose functions are computed.
+
+    Returns:
+        dict: The functions of all resolved nodes, by node. Nodes that could not
+        be resolved are missing.
+    """
+    values = {}
+    for n in graph.nodes:
+        if not isinstance(n.value, Cell):
+            continue
+        if n.value.function == CellFunction.INPUT:
+            values[n] = algebra.variable(n.value.get_name())
+        elif (
+            n.value.function == CellFunction.FIXED and n.value.polarization is not None
+        ):
+            values[n] = algebra.constant(n.value.polarization)
+
+    def is_resolved(n: GraphNode) -> bool:
+        return n in values
+
+    def resolve(n: GraphNode):
+        function = n.value.determine_function(n, graph, values, algebra)
+        if function is not None:
+            values[n] = function
+
+    for n in outputs:
+        graph.resolve_from(n, is_resolved, resolve)
+
+    return values
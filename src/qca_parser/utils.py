@@ -1,4 +1,4 @@
-from cell import CellFunction
+from .cell import CellFunction
 
 
 def parse_cell_function(function: str) -> CellFunction:
@@ -62,3 +62,48 @@ def euclidean_dist(coords1: tuple[float, float], coords2: tuple[float, float]) -
         float: The euclidean distance between the two coordinates.
     """
     return ((coords1[0] - coords2[0]) ** 2 + (coords1[1] - coords2[1]) ** 2) ** 0.5
+
+
+def most_common_function(functions: list, algebra):
+    """Symbolic counterpart of max(values, key=values.count) for logic values:
+    returns the function that is 1 wherever more of the given functions are 1
+    than 0, and equal to the first function wherever there is a tie.
+
+    Args:
+        functions (list): The operand functions, e.g. BDD edges.
+        algebra: The object that builds the functions (see symbolic.py).
+
+    Returns:
+        The resulting function, or None if no functions are given.
+    """
+    if len(functions) == 0:
+        return None
+    if len(functions) == 1:
+        return functions[0]
+    if len(functions) == 2:
+        # the two values either agree or it is a tie
+        return functions[0]
+    if len(functions) == 3:
+        return algebra.majority(*functions)
+
+    # differences[d] is the condition under which there are d more ones than zeros
+    differences = {0: algebra.constant(1)}
+    for f in functions:
+        not_f = algebra.negate(f)
+        new_differences = {}
+        for d, condition in differences.items():
+            for new_d, term in (
+                (d + 1, algebra.and_(condition, f)),
+                (d - 1, algebra.and_(condition, not_f)),
+            ):
+                if new_d in new_differences:
+                    new_differences[new_d] = algebra.or_(new_differences[new_d], term)
+                else:
+                    new_differences[new_d] = term
+        differences = new_differences
+
+    result = algebra.and_(differences.get(0, algebra.constant(0)), functions[0])
+    for d, condition in differences.items():
+        if d > 0:
+            result = algebra.or_(result, condition)
+    return result
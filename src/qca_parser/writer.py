@@ -0,0 +1,46 @@
+from typing import Iterable, TextIO
+import csv
+import json
+
+
+def write_csv(
+    rows: Iterable[dict], file: TextIO, input_names: list[str], output_names: list[str]
+) -> int:
+    """Writes truth table rows to a CSV file as they arrive, one line per input combination.
+
+    Args:
+        rows (Iterable[dict]): The rows, e.g. from Simulator.iter_simulate.
+        file (TextIO): The output file.
+        input_names (list[str]): The names of the inputs, used as column headers.
+        output_names (list[str]): The names of the outputs, used as column headers.
+
+    Returns:
+        int: The number of written rows.
+    """
+    writer = csv.writer(file)
+    writer.writerow(input_names + output_names)
+
+    count = 0
+    for row in rows:
+        writer.writerow(
+            row["inputs"] + ["" if v is None else v for v in row["outputs"]]
+        )
+        count += 1
+    return count
+
+
+def write_jsonl(rows: Iterable[dict], file: TextIO) -> int:
+    """Writes truth table rows to a JSON Lines file as they arrive, one object per line.
+
+    Args:
+        rows (Iterable[dict]): The rows, e.g. from Simulator.iter_simulate.
+        file (TextIO): The output file.
+
+    Returns:
+        int: The number of written rows.
+    """
+    count = 0
+    for row in rows:
+        file.write(json.dumps(row) + "\n")
+        count += 1
+    return count
@@ -0,0 +1,16 @@
+from pathlib import Path
+from qca_parser.parser import QCAParser
+import pytest
+
+ROOT = Path(__file__).parent.parent
+EXAMPLES = ["and.qca", "example_majoritygate.qca", "example_negator.qca"]
+
+
+@pytest.fixture
+def load_example():
+    """Returns a function that parses one of the example designs into a graph."""
+
+    def load(name: str):
+        return QCAParser().parse(str(ROOT / name))
+
+    return load
@@ -0,0 +1,92 @@
+"""Builds small .qca designs for the tests. A cell is given as
+(x, y, function, clock, label) in grid units, function is one of INPUT, OUTPUT,
+FIXED and NORMAL."""
+
+from pathlib import Path
+
+GRID = 20
+
+
+def write_design(path: Path, cells: list[tuple]) -> str:
+    """Writes the cells to a .qca file with the structure QCADesigner uses."""
+    lines = ["[VERSION]", "qcadesigner_version=2.000000", "[#VERSION]", "[TYPE:DESIGN]"]
+    for x, y, function, clock, label in cells:
+        lines += [
+            "[TYPE:QCADCell]",
+            "[TYPE:QCADDesignObject]",
+            f"x={x * GRID + 100:.6f}",
+            f"y={y * GRID + 100:.6f}",
+            "[#TYPE:QCADDesignObject]",
+            f"cell_options.clock={clock}",
+            f"cell_function=QCAD_CELL_{function}",
+        ]
+        if label is not None:
+            lines += ["[TYPE:QCADLabel]", f"psz={label}", "[#TYPE:QCADLabel]"]
+        lines.append("[#TYPE:QCADCell]")
+    lines.append("[#TYPE:DESIGN]")
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def majority_chain(num_gates: int, zoned: bool = False) -> list[tuple]:
+    """A chain of majority gates, each taking the previous gate and two new inputs.
+    The first gate takes three inputs. If zoned, every gate is in the next clock zone.
+    See majority_chain_value for the expected output."""
+    cells = [(0, 1, "INPUT", 0, "x0")]
+    for g in range(num_gates):
+        clock = g % 4 if zoned else 0
+        center = 1 + 3 * g
+        cells += [
+            (center, 0, "INPUT", clock, f"t{g}"),
+            (center, 2, "INPUT", clock, f"b{g}"),
+            (center, 1, "NORMAL", clock, None),
+            (center + 1, 1, "NORMAL", clock, None),
+        ]
+        if g < num_gates - 1:
+            next_clock = (g + 1) % 4 if zoned else 0
+            cells.append((center + 2, 1, "NORMAL", next_clock, None))
+    x, y, _, clock, _ = cells[-1]
+    cells[-1] = (x, y, "OUTPUT", clock, "y")
+    return cells
+
+
+def majority_chain_value(num_gates: int, inputs: dict[str, int]) -> int:
+    """Returns the output of majority_chain for the given input values by name."""
+    value = inputs["x0"]
+    for g in range(num_gates):
+        value = 1 if value + inputs[f"t{g}"] + inputs[f"b{g}"] >= 2 else 0
+    return value
+
+
+def cluttered_chain() -> list[tuple]:
+    """A majority chain with a stub behind its first input, a dangling wire
+    after its output and an island that is not connected to anything."""
+    cells = majority_chain(2)
+    cells += [(-1, 1, "NORMAL", 0, None), (-2, 1, "NORMAL", 0, None)]
+    cells += [(6, 1, "NORMAL", 0, None), (7, 1, "NORMAL", 0, None)]
+    cells += [(x, 10, "NORMAL", 0, None) for x in range(3)]
+    return cells
+
+
+def serpentine(length: int, row: int = 20, zone_length: int | None = None) -> list[tuple]:
+    """A wire of the given number of cells that snakes back and forth in rows, from
+    the input "in" to the output "out". With zone_length, every zone_length cells
+    are in the next clock zone."""
+    path = []
+    y = 0
+    while len(path) < length:
+        xs = list(range(row)) if (y // 3) % 2 == 0 else list(range(row - 1, -1, -1))
+        path += [(x, y) for x in xs]
+        # two cells that turn into the next row, so the rows are not adjacent
+        # (and the distance between adjacent cells is still the most common one)
+        path += [(xs[-1], y + 1), (xs[-1], y + 2)]
+        y += 3
+    path = path[:length]
+
+    cells = []
+    for k, (x, y) in enumerate(path):
+        clock = (k // zone_length) % 4 if zone_length is not None else 0
+        cells.append((x, y, "NORMAL", clock, None))
+    cells[0] = (*path[0], "INPUT", cells[0][3], "in")
+    cells[-1] = (*path[-1], "OUTPUT", cells[-1][3], "out")
+    return cells
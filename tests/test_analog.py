@@ -0,0 +1,93 @@
+from .conftest import EXAMPLES
+from .designs import majority_chain, serpentine, write_design
+from .test_graph import wire
+from qca_parser.analog import AnalogSolver, _NodeBlock, _VectorBlock
+from qca_parser.cell import Cell, CellFunction
+from qca_parser.parser import QCAParser
+from qca_parser.simulator import SimulationMode, Simulator
+import pytest
+
+
+def compare_modes(graph, num_cycles: int, step: float):
+    logic = Simulator(graph).simulate(1, 0.5, plot=False)
+    analog = Simulator(graph).simulate(
+        num_cycles, step, mode=SimulationMode.ANALOG, plot=False
+    )
+    assert all(analog["converged"])
+    return logic["values"], analog["values"]
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_analog_matches_logic_on_examples(load_example, name):
+    logic, analog = compare_modes(load_example(name), 10, 0.01)
+    assert analog == logic
+
+
+@pytest.mark.parametrize("num_gates, zoned", [(2, False), (3, True)])
+def test_analog_matches_logic_on_majority_chains(tmp_path, num_gates, zoned):
+    filename = write_design(tmp_path / "chain.qca", majority_chain(num_gates, zoned))
+    graph = QCAParser().parse(filename)
+    # about two clock cycles per input combination
+    num_combinations = 2 ** (1 + 2 * num_gates)
+    num_cycles = int((num_combinations * 13) ** 0.5) + 1
+    logic, analog = compare_modes(graph, num_cycles, 0.3 / num_cycles)
+    assert analog == logic
+
+
+@pytest.mark.parametrize("length, zone_length", [(800, None), (1500, None), (200, 25)])
+def test_analog_long_wire_is_not_inverted(tmp_path, length, zone_length):
+    filename = write_design(tmp_path / "wire.qca", serpentine(length, zone_length=zone_length))
+    graph = QCAParser().parse(filename)
+    logic, analog = compare_modes(graph, 8, 0.02)
+    assert logic == analog == [[0], [1]]
+
+
+def test_wire_settles_in_a_single_sweep():
+    graph = wire(2000)
+    graph.nodes[0].value.polarization = 1
+    solver = AnalogSolver(graph)
+    assert solver.solve((1.0, 1.0, 1.0, 1.0)) == 1
+    assert solver.converged
+    assert graph.nodes[-1].value.polarization > 0.9
+
+
+def test_unsettled_feedback_loop_is_reported():
+    # the cells after the input pass through all four clock zones and back
+    graph = wire(6, [0, 0, 1, 2, 3, 3])
+    first, last = graph.nodes[1], graph.nodes[4]
+    graph.add_connection(first, last)
+    graph.add_connection(last, first)
+    graph.nodes[0].value.polarization = 1
+
+    solver = AnalogSolver(graph, max_iterations=1)
+    assert len(solver.dag.feedback_components()) == 1
+    solver.solve((1.0, 1.0, 1.0, 1.0))
+    assert not solver.converged
+
+    solver = AnalogSolver(graph)
+    assert solver.solve((1.0, 1.0, 1.0, 1.0)) > 1
+    assert solver.converged
+    assert graph.nodes[-1].value.polarization > 0.9
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_vectorized_levels_match_node_by_node_updates(load_example, name):
+    graph = load_example(name)
+    vectorized = AnalogSolver(graph, vector_width=1)
+    sequential = AnalogSolver(graph, vector_width=len(graph.nodes) + 1)
+    assert all(isinstance(b, _VectorBlock) for b in vectorized.blocks)
+    assert all(isinstance(b, _NodeBlock) for b in sequential.blocks)
+
+    inputs = [
+        n
+        for n in graph.nodes
+        if isinstance(n.value, Cell) and n.value.function == CellFunction.INPUT
+    ]
+    for clocks in [(1.0, 1.0, 1.0, 1.0), (1.0, 0.5, -0.5, -1.0), (-1.0, 1.0, 1.0, 0.0)]:
+        for polarization in (0, 1):
+            for n in inputs:
+                n.value.polarization = polarization
+            vectorized.solve(clocks)
+            sequential.solve(clocks)
+            assert vectorized.converged and sequential.converged
+            assert vectorized.polarizations == pytest.approx(sequential.polarizations, abs=1e-5)
@@ -0,0 +1,59 @@
+from .conftest import EXAMPLES
+from .designs import majority_chain, write_design
+from qca_parser.bdd import CircuitBDD, check_equivalence
+from qca_parser.parser import QCAParser
+from qca_parser.simulator import Simulator
+import pytest
+
+
+def chain_graph(tmp_path, zoned: bool = False, rename: dict | None = None):
+    cells = majority_chain(2, zoned)
+    if rename is not None:
+        cells = [(x, y, f, clock, rename.get(label, label)) for x, y, f, clock, label in cells]
+    name = "chain" + ("_zoned" if zoned else "") + ("_renamed" if rename else "")
+    return QCAParser().parse(write_design(tmp_path / f"{name}.qca", cells))
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_bdd_matches_exhaustive_simulation(load_example, name):
+    graph = load_example(name)
+    expected = Simulator(graph).simulate(1, 0.5, plot=False)
+    circuit = CircuitBDD(graph)
+    truth_table = circuit.truth_table()
+    assert truth_table["inputs"] == expected["inputs"]
+    assert truth_table["values"] == expected["values"]
+
+    ones = sum(row[0] for row in expected["values"])
+    assert list(circuit.minterm_counts().values()) == [ones]
+
+
+def test_bdd_matches_exhaustive_simulation_of_a_chain(tmp_path):
+    graph = chain_graph(tmp_path)
+    expected = Simulator(graph).simulate(1, 0.5, plot=False)["values"]
+    assert CircuitBDD(graph).truth_table()["values"] == expected
+
+
+def test_equivalent_layouts(tmp_path):
+    result = check_equivalence(chain_graph(tmp_path), chain_graph(tmp_path, zoned=True))
+    assert result["equivalent"]
+    assert result["outputs"] == {"y": True}
+    assert result["counterexample"] is None
+
+
+def test_non_equivalent_layouts(tmp_path):
+    # swapping the first input with an input of the second gate changes the function
+    original = chain_graph(tmp_path)
+    swapped = chain_graph(tmp_path, rename={"x0": "t1", "t1": "x0"})
+    result = check_equivalence(original, swapped)
+    assert not result["equivalent"]
+    assert result["outputs"] == {"y": False}
+
+    counterexample = result["counterexample"]
+    assert counterexample["outputs_a"] != counterexample["outputs_b"]
+    inputs = counterexample["inputs"]
+    for graph, outputs in [
+        (original, counterexample["outputs_a"]),
+        (swapped, counterexample["outputs_b"]),
+    ]:
+        circuit = CircuitBDD(graph)
+        assert circuit.evaluate([inputs[name] for name in circuit.input_names]) == [outputs["y"]]
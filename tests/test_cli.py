@@ -0,0 +1,39 @@
+from .conftest import ROOT
+import json
+import pytest
+import subprocess
+import sys
+
+HEAVY_MODULES = ["numpy", "scipy", "matplotlib", "pyvis"]
+
+
+def imported_heavy_modules(statement: str) -> list[str]:
+    """Runs the statement in a fresh interpreter and returns the heavy modules it imported."""
+    code = (
+        f"import contextlib, io, json, sys\n"
+        f"with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    {statement}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_importing_the_cli_is_light():
+    assert imported_heavy_modules("import qca_parser.cli") == []
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["parse", "example_majoritygate.qca"],
+        ["simulate", "example_majoritygate.qca", "--format", "jsonl"],
+        ["analyze", "example_majoritygate.qca"],
+    ],
+)
+def test_commands_without_plots_are_light(argv):
+    argv = [str(ROOT / arg) if arg.endswith(".qca") else arg for arg in argv]
+    statement = f"from qca_parser.cli import main; main({argv!r})"
+    assert imported_heavy_modules(statement) == []
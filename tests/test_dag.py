@@ -0,0 +1,86 @@
+from .conftest import EXAMPLES
+from qca_parser.cell import Cell, CellFunction
+from qca_parser.dag import SignalFlowDAG
+from qca_parser.graph import Graph
+from qca_parser.majority_gate import MajorityGate
+from qca_parser.negator import Negator
+from qca_parser.simulator import Simulator
+import pytest
+
+
+def connect(graph: Graph, a, b):
+    graph.add_connection(a, b)
+    graph.add_connection(b, a)
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_levelized_matches_default_simulation(load_example, name):
+    graph = load_example(name)
+    default = Simulator(graph).simulate(1, 0.5, plot=False)
+    levelized = Simulator(graph).simulate(1, 0.5, plot=False, levelized=True)
+    assert levelized["values"] == default["values"]
+
+
+def test_feedback_loop_through_a_gate_is_evaluated_until_stable():
+    # a majority gate whose output runs through the clock zones back into the gate;
+    # the gate comes last in the loop, so the first pass leaves the cells unpolarized
+    graph = Graph()
+    c1 = graph.add_component(Cell(1, 0, CellFunction.NORMAL, 1))
+    c2 = graph.add_component(Cell(2, 0, CellFunction.NORMAL, 2))
+    c3 = graph.add_component(Cell(3, 0, CellFunction.OUTPUT, 3, "y"))
+    a = graph.add_component(Cell(0, 1, CellFunction.INPUT, 0, "a"))
+    b = graph.add_component(Cell(0, -1, CellFunction.INPUT, 0, "b"))
+    gate = graph.add_component(MajorityGate("g", 0))
+    for x, y in [(a, gate), (b, gate), (gate, c1), (c1, c2), (c2, c3), (c3, gate)]:
+        connect(graph, x, y)
+    a.value.polarization = 1
+    b.value.polarization = 1
+
+    dag = SignalFlowDAG(graph)
+    assert len(dag.feedback_components()) == 1
+    dag.evaluate((1.0, 1.0, 1.0, 1.0))
+    assert dag.converged
+    assert [n.value.polarization for n in (gate, c1, c2, c3)] == [1, 1, 1, 1]
+
+
+def test_neighbors_with_equal_keys_do_not_form_a_cycle():
+    # two branches of a fork that touch each other, both one hop from the input
+    graph = Graph()
+    a = graph.add_component(Cell(0, 0, CellFunction.INPUT, 0, "a"))
+    p = graph.add_component(Cell(1, 0, CellFunction.NORMAL, 0))
+    q = graph.add_component(Cell(1, 1, CellFunction.OUTPUT, 0, "y"))
+    for x, y in [(a, p), (a, q), (p, q)]:
+        connect(graph, x, y)
+
+    dag = SignalFlowDAG(graph)
+    assert dag.keys[1] == dag.keys[2]
+    assert dag.feedback_components() == []
+    # the node that comes first drives the other one
+    assert dag.successors[1] == [2]
+    assert dag.predecessors[2] == [0, 1]
+    assert dag.summary()["levels"] == 3
+
+
+def test_oscillating_feedback_loop_is_reported():
+    # a majority gate with a 1 and a 0 input copies its feedback, which runs back
+    # through a negator, so the loop never settles
+    graph = Graph()
+    a = graph.add_component(Cell(0, 1, CellFunction.INPUT, 0, "a"))
+    b = graph.add_component(Cell(0, -1, CellFunction.INPUT, 0, "b"))
+    gate = graph.add_component(MajorityGate("g", 0))
+    c1 = graph.add_component(Cell(1, 0, CellFunction.NORMAL, 1))
+    c2 = graph.add_component(Cell(2, 0, CellFunction.OUTPUT, 2, "y"))
+    negator = graph.add_component(Negator("n", 3))
+    for x, y in [(a, gate), (b, gate), (gate, c1), (c1, c2), (c2, negator), (negator, gate)]:
+        connect(graph, x, y)
+    a.value.polarization = 1
+    b.value.polarization = 0
+
+    dag = SignalFlowDAG(graph)
+    assert len(dag.feedback_components()) == 1
+    dag.evaluate((1.0, 1.0, 1.0, 1.0))
+    assert not dag.converged
+
+    # with equal inputs the gate ignores the loop
+    result = Simulator(graph).simulate(1, 0.5, plot=False, levelized=True)
+    assert result["converged"] == [True, False, False, True]
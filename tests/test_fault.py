@@ -0,0 +1,71 @@
+from .conftest import EXAMPLES
+from .designs import cluttered_chain, majority_chain, write_design
+from qca_parser.fault import FaultSimulator, FaultType, _evaluate, _pack
+from qca_parser.mig import build_mig
+from qca_parser.parser import QCAParser
+import pytest
+
+
+def test_expected_coverage_of_the_majority_gate(load_example):
+    graph = load_example("example_majoritygate.qca")
+    report = FaultSimulator(graph).run(workers=1)
+
+    # 5 nodes (3 inputs, the gate and the output) and 4 connections to the gate
+    assert report["faults"] == 19
+    assert report["detected"] == 19
+    assert report["coverage"] == 1.0
+    assert {t: s["faults"] for t, s in report["by_type"].items()} == {
+        "CELL_DELETION": 5,
+        "STUCK_AT_0": 5,
+        "STUCK_AT_1": 5,
+        "BROKEN_CONNECTION": 4,
+    }
+
+    results = {r["fault"]: r for r in report["results"]}
+    inputs = report["truth_table"]["inputs"]
+    first = inputs[0]
+    # an input stuck at 0 is first detected when it is 1 and the other two differ
+    assert results[f"STUCK_AT_0 {first}"]["combination"] == 0b101
+    assert results[f"STUCK_AT_1 {first}"]["combination"] == 0b001
+    # without the output cell, the output is never polarized
+    assert results["CELL_DELETION o"]["combination"] == 0
+
+
+def test_parallel_workers_detect_the_same_faults(tmp_path):
+    graph = QCAParser().parse(write_design(tmp_path / "chain.qca", cluttered_chain()))
+    simulator = FaultSimulator(graph)
+    faults = simulator.fault_list()
+
+    serial = simulator.run(faults, workers=1, chunk_size=8)
+    parallel = simulator.run(faults, workers=2, chunk_size=8)
+    assert parallel == serial
+
+    # the cells of the stub and the island can't reach the output
+    assert 0 < serial["unobservable"] <= serial["undetected"]
+    assert serial["coverage"] < 1.0
+
+
+def test_fault_types_can_be_selected(load_example):
+    simulator = FaultSimulator(load_example("example_negator.qca"))
+    faults = simulator.fault_list([FaultType.STUCK_AT_1])
+    assert len(faults) == len(simulator.graph.nodes)
+    report = simulator.run(faults, workers=1)
+    assert list(report["by_type"]) == ["STUCK_AT_1"]
+
+
+@pytest.mark.parametrize("name", EXAMPLES + ["chain"])
+def test_fault_free_graph_matches_the_mig_reference(tmp_path, load_example, name):
+    if name == "chain":
+        graph = QCAParser().parse(write_design(tmp_path / "chain.qca", majority_chain(3)))
+    else:
+        graph = load_example(name)
+    simulator = FaultSimulator(graph)
+    patterns = list(range(2 ** len(simulator.input_names)))
+    reference = simulator.fault_free_outputs(patterns)
+    assert reference == build_mig(graph).truth_table()["values"]
+
+    # no fault is detected in the lane of a fault that changes nothing
+    netlist = simulator.netlist()
+    for pattern, expected in zip(patterns, reference):
+        outputs = _evaluate(netlist, pattern, _pack([]), 1)
+        assert [value if known else None for known, value in outputs] == expected
@@ -0,0 +1,81 @@
+from qca_parser.cell import Cell, CellFunction
+from qca_parser.graph import Graph, _GraphEditor
+from qca_parser.simulator import Simulator
+import random
+import sys
+
+
+def wire(length: int, zones: list[int] | None = None) -> Graph:
+    """Builds a straight wire from an input cell "in" to an output cell "out".
+    zones gives the clock zone of every cell (zone 0 by default)."""
+    if zones is None:
+        zones = [0] * length
+    graph = Graph()
+    previous = graph.add_component(Cell(0, 0, CellFunction.INPUT, zones[0], "in"))
+    for x in range(1, length):
+        function = CellFunction.OUTPUT if x == length - 1 else CellFunction.NORMAL
+        label = "out" if function == CellFunction.OUTPUT else None
+        cell = graph.add_component(Cell(x, 0, function, zones[x], label))
+        graph.add_connection(previous, cell)
+        graph.add_connection(cell, previous)
+        previous = cell
+    return graph
+
+
+def test_long_wire_does_not_hit_the_recursion_limit():
+    length = 3 * sys.getrecursionlimit()
+    truth_table = Simulator(wire(length)).simulate(1, 0.25, plot=False)
+    assert truth_table["values"] == [[0], [1]]
+
+
+def test_resolve_from_visits_every_node_once():
+    graph = wire(5000)
+    resolved = []
+    graph.resolve_from(graph.nodes[-1], lambda n: False, resolved.append)
+    assert len(resolved) == len(set(resolved)) == 5000
+    # post-order: the dependencies are resolved before the root
+    assert resolved[-1] is graph.nodes[-1]
+
+
+def test_graph_editor_matches_graph_methods():
+    # the same random changes through the Graph methods and through a _GraphEditor
+    def build():
+        graph = Graph()
+        for x in range(12):
+            graph.add_component(Cell(x, x % 3, CellFunction.NORMAL, 0))
+        return graph
+
+    graphs = [build(), build()]
+    editor = _GraphEditor(graphs[1])
+    targets = [graphs[0], editor]
+    rng = random.Random(0)
+    for _ in range(400):
+        operation = rng.choice(
+            ["connect", "connect", "disconnect", "remove", "add", "neighbors"]
+        )
+        a, b = rng.randrange(len(graphs[0].nodes)), rng.randrange(len(graphs[0].nodes))
+        results = []
+        for graph, target in zip(graphs, targets):
+            nodes = graph.nodes
+            if operation == "connect":
+                target.add_connection(nodes[a], nodes[b])
+            elif operation == "disconnect":
+                target.remove_connection(nodes[a], nodes[b])
+            elif operation == "remove" and len(nodes) > 2:
+                target.remove_component(nodes[a].value)
+            elif operation == "add":
+                target.add_component(Cell(100 + a, b, CellFunction.NORMAL, 0))
+            elif operation == "neighbors":
+                neighbors = target.component_neighbors(nodes[a].value)
+                results.append([graph.nodes.index(n) for n in neighbors])
+        assert len(graphs[0].nodes) == len(graphs[1].nodes)
+        if len(results) > 0:
+            assert results[0] == results[1]
+
+    editor.commit()
+    describe = [
+        [(g.nodes.index(c.source), g.nodes.index(c.sink)) for c in g.connections] for g in graphs
+    ]
+    assert describe[0] == describe[1]
+    ids = [[n.value.get_id() for n in g.nodes] for g in graphs]
+    assert ids[0] == ids[1]
@@ -0,0 +1,76 @@
+from .conftest import EXAMPLES
+from .designs import majority_chain, write_design
+from qca_parser.mig import MIG, build_mig
+from qca_parser.parser import QCAParser
+from qca_parser.simulator import Simulator
+import pytest
+import random
+
+
+def random_mig(num_inputs: int, num_gates: int, seed: int) -> MIG:
+    """A random network of majority gates with complemented edges and fanout.
+    Gates often share two children, which gives the rewriting passes work."""
+    rng = random.Random(seed)
+    mig = MIG()
+    signals = [mig.variable(f"x{i}") for i in range(num_inputs)] + [mig.FALSE]
+    for _ in range(num_gates):
+        if rng.random() < 0.5 and len(signals) > num_inputs + 3:
+            # reuse two children of an existing gate
+            gate = rng.choice(signals[num_inputs + 1 :])
+            if mig.is_majority(gate):
+                x, y, _ = mig.children(gate)
+                signals.append(mig.majority(x, y, rng.choice(signals) ^ rng.randrange(2)))
+                continue
+        a, b, c = rng.sample(signals, 3)
+        signals.append(mig.majority(a ^ rng.randrange(2), b ^ rng.randrange(2), c))
+    for i, f in enumerate(signals[-4:]):
+        mig.add_output(f"y{i}", f ^ rng.randrange(2))
+    return mig
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_rewriting_keeps_the_truth_table_of_random_migs(seed):
+    mig = random_mig(6, 40, seed)
+    rewritten = mig.rewrite()
+    assert rewritten.truth_table() == mig.truth_table()
+    assert rewritten.size() <= mig.copy().size()
+
+
+def test_rewriting_shrinks_some_random_migs():
+    migs = [random_mig(6, 40, seed) for seed in range(20)]
+    assert any(mig.rewrite().size() < mig.copy().size() for mig in migs)
+
+
+def test_distributivity_removes_a_gate():
+    mig = MIG()
+    x, y, u, v, z = (mig.variable(name) for name in "xyuvz")
+    mig.add_output("f", mig.majority(mig.majority(x, y, u), mig.majority(x, y, v), z))
+    rewritten = mig.rewrite()
+    assert mig.size() == 3
+    assert rewritten.size() == 2
+    assert rewritten.truth_table() == mig.truth_table()
+
+
+def test_associativity_removes_a_gate():
+    mig = MIG()
+    x, u, z = (mig.variable(name) for name in "xuz")
+    # M(x, u, M(x', u, z)) = M(z, u, M(x', u, x)) = M(z, u, u) = u
+    mig.add_output("f", mig.majority(x, u, mig.majority(mig.negate(x), u, z)))
+    rewritten = mig.rewrite()
+    assert rewritten.size() == 0
+    assert rewritten.truth_table() == mig.truth_table()
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_rewriting_keeps_the_truth_table_of_examples(load_example, name):
+    graph = load_example(name)
+    expected = Simulator(graph).simulate(1, 0.5, plot=False)["values"]
+    assert build_mig(graph, rewrite=False).truth_table()["values"] == expected
+    assert build_mig(graph).truth_table()["values"] == expected
+
+
+@pytest.mark.parametrize("zoned", [False, True])
+def test_rewriting_keeps_the_truth_table_of_a_chain(tmp_path, zoned):
+    graph = QCAParser().parse(write_design(tmp_path / "chain.qca", majority_chain(3, zoned)))
+    original = build_mig(graph, rewrite=False)
+    assert build_mig(graph).truth_table() == original.truth_table()
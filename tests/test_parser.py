@@ -0,0 +1,92 @@
+from .conftest import EXAMPLES, ROOT
+from .designs import majority_chain, serpentine, write_design
+from qca_parser.cell import CellFunction
+from qca_parser.parser import QCAParser
+import pytest
+import random
+import subprocess
+import sys
+
+
+def scattered(num_cells: int, size: int, seed: int) -> list[tuple]:
+    """Randomly placed cells, which form wires, negators and majority gates."""
+    rng = random.Random(seed)
+    cells = {}
+    for _ in range(num_cells):
+        x, y = rng.randrange(size), rng.randrange(size)
+        function = rng.choice(["NORMAL"] * 6 + ["INPUT", "OUTPUT"])
+        cells[(x, y)] = (x, y, function, rng.randrange(4), None)
+    return list(cells.values())
+
+
+def describe(graph):
+    nodes = [n.value.get_name() for n in graph.nodes]
+    connections = [(c.source.value.get_id(), c.sink.value.get_id()) for c in graph.connections]
+    return nodes, connections
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_parallel_parse_matches_serial_parse(name):
+    serial = QCAParser().parse(str(ROOT / name))
+    parallel = QCAParser().parse(str(ROOT / name), workers=2)
+    assert describe(parallel) == describe(serial)
+
+
+def test_parallel_parse_of_a_larger_design(tmp_path):
+    filename = write_design(tmp_path / "chain.qca", majority_chain(6, zoned=True))
+    assert describe(QCAParser().parse(filename, workers=3)) == describe(
+        QCAParser().parse(filename)
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_parallel_parse_of_scattered_cells(tmp_path, seed):
+    filename = write_design(tmp_path / "cells.qca", scattered(200, 20, seed))
+    assert describe(QCAParser().parse(filename, workers=2)) == describe(
+        QCAParser().parse(filename)
+    )
+
+
+def test_cells_in_the_moore_neighborhood_are_connected(tmp_path):
+    # a wire with turns has diagonal neighbors, but no gates that replace connections
+    graph = QCAParser().parse(write_design(tmp_path / "wire.qca", serpentine(600, row=30)))
+    assert len(graph.nodes) == 600
+
+    connected = {(c.source, c.sink) for c in graph.connections}
+    assert len(connected) == len(graph.connections)
+    for a in graph.nodes:
+        for b in graph.nodes:
+            adjacent = abs(a.value.x - b.value.x) <= 1 and abs(a.value.y - b.value.y) <= 1
+            assert ((a, b) in connected) == (adjacent and a is not b)
+
+
+def test_process_pool_is_imported_lazily():
+    code = (
+        "import sys, qca_parser.parser; "
+        "print('mmap' in sys.modules, 'concurrent.futures.process' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.split() == ["False", "False"]
+
+
+def test_parallel_parse_reads_every_cell_attribute(tmp_path):
+    # labeled input, output and fixed cells of both polarizations, in all clock zones
+    cells = majority_chain(2, zoned=True)
+    cells += [(1, -1, "FIXED", 0, "-1.00"), (4, 3, "FIXED", 1, "1.00")]
+    cells[1] = (*cells[1][:3], 3, "a")
+    filename = write_design(tmp_path / "gates.qca", cells)
+
+    def attributes(parser):
+        return [
+            (c.x, c.y, c.function, c.clock, c.label, c.polarization) for c in parser.cells
+        ]
+
+    serial, parallel = QCAParser(), QCAParser()
+    serial.parse(filename)
+    parallel.parse(filename, workers=2)
+    assert attributes(parallel) == attributes(serial)
+    assert {c.function for c in serial.cells} == set(CellFunction)
+    assert [c.polarization for c in serial.cells if c.function == CellFunction.FIXED] == [0, 1]
+    assert describe(parallel.graph) == describe(serial.graph)
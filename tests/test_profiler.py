@@ -0,0 +1,15 @@
+from qca_parser.profiler import Profiler
+
+
+def test_series_keep_running_totals():
+    profiler = Profiler()
+    with profiler.stage("simulate"):
+        for value in range(10000):
+            profiler.record("nodes_evaluated", value % 7)
+
+    series = profiler.stages["simulate"]["series"]["nodes_evaluated"]
+    # a fixed number of totals, not one entry per recorded value
+    assert series == {"count": 10000, "total": sum(v % 7 for v in range(10000)), "min": 0, "max": 6}
+
+    report = profiler.to_dict()["stages"]["simulate"]["series"]["nodes_evaluated"]
+    assert report["mean"] == series["total"] / 10000
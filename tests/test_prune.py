@@ -0,0 +1,33 @@
+from .conftest import EXAMPLES
+from .designs import cluttered_chain, write_design
+from qca_parser.parser import QCAParser
+from qca_parser.simulator import Simulator
+import pytest
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_pruning_does_not_change_outputs(tmp_path, pipelined):
+    graph = QCAParser().parse(write_design(tmp_path / "chain.qca", cluttered_chain()))
+    full = Simulator(graph)
+    pruned = Simulator(graph, prune=True)
+
+    assert len(pruned.cone["islands"]) == 2
+    assert sorted(map(len, pruned.cone["islands"])) == [2, 3]
+    assert len(pruned.cone["dangling"]) == 1
+    assert pruned.input_nodes() == full.input_nodes()
+
+    expected = full.simulate(4, 0.01, pipelined=pipelined, plot=False)
+    assert pruned.simulate(4, 0.01, pipelined=pipelined, plot=False) == expected
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_pruning_keeps_example_outputs(load_example, name):
+    graph = load_example(name)
+    expected = Simulator(graph).simulate(1, 0.5, plot=False)
+    assert Simulator(graph, prune=True).simulate(1, 0.5, plot=False) == expected
+
+
+def test_simulator_does_not_prune_by_default(load_example):
+    simulator = Simulator(load_example("example_majoritygate.qca"))
+    assert simulator.cone is None
+    assert simulator.graph is simulator.full_graph
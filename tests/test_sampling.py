@@ -0,0 +1,128 @@
+from .conftest import EXAMPLES, ROOT
+from .designs import majority_chain, majority_chain_value, write_design
+from qca_parser.cli import main
+from qca_parser.mig import build_mig
+from qca_parser.parser import QCAParser
+from qca_parser.sampling import MonteCarloSampler, wilson_interval
+import pytest
+
+Z95 = 1.959963984540054
+
+
+def final_report(mig, **kwargs) -> dict:
+    return list(MonteCarloSampler(mig, **kwargs).iter_batches())[-1]
+
+
+@pytest.mark.parametrize(
+    "successes, samples, expected",
+    [
+        (5, 10, (0.2365930905, 0.7634069095)),
+        # no successes: the lower bound is 0 and the upper one z^2 / (n + z^2)
+        (0, 10, (0.0, Z95**2 / (10 + Z95**2))),
+        (10, 10, (10 / (10 + Z95**2), 1.0)),
+        (81, 263, (0.2552885199, 0.3662095770)),
+    ],
+)
+def test_wilson_interval_bounds(successes, samples, expected):
+    low, high = wilson_interval(successes, samples, Z95)
+    assert low == pytest.approx(expected[0], abs=1e-9)
+    assert high == pytest.approx(expected[1], abs=1e-9)
+
+
+@pytest.mark.parametrize("samples", [1, 7, 100, 4096])
+def test_wilson_interval_is_symmetric_and_contains_the_estimate(samples):
+    for successes in range(0, samples + 1, max(1, samples // 16)):
+        low, high = wilson_interval(successes, samples, Z95)
+        assert 0.0 <= low <= successes / samples <= high <= 1.0
+        mirrored = wilson_interval(samples - successes, samples, Z95)
+        assert low == pytest.approx(1 - mirrored[1])
+        assert high == pytest.approx(1 - mirrored[0])
+
+
+def test_wilson_interval_without_samples():
+    assert wilson_interval(0, 0, Z95) == (0.0, 1.0)
+
+
+@pytest.mark.parametrize("method", ["random", "sobol"])
+def test_sampling_is_deterministic_for_a_seed(load_example, method):
+    mig = build_mig(load_example("example_majoritygate.qca"))
+    first = final_report(mig, method=method, seed=42, batch_size=256)
+    second = final_report(mig, method=method, seed=42, batch_size=256)
+    assert first == second
+    assert first["stopped"] == "converged"
+
+
+def test_different_seeds_draw_different_samples(load_example):
+    mig = build_mig(load_example("example_majoritygate.qca"))
+    reports = [final_report(mig, seed=seed, max_samples=1024) for seed in range(3)]
+    probabilities = {report["outputs"]["o"]["probability"] for report in reports}
+    assert len(probabilities) > 1
+
+
+def test_interval_contains_the_exact_signal_probability(tmp_path):
+    graph = QCAParser().parse(write_design(tmp_path / "chain.qca", majority_chain(3)))
+    mig = build_mig(graph)
+    values = mig.truth_table()["values"]
+    exact = sum(row[0] for row in values) / len(values)
+
+    report = final_report(mig, seed=1, tolerance=0.005)
+    low, high = report["outputs"]["y"]["interval"]
+    assert report["converged"]
+    assert low <= exact <= high
+    assert (high - low) / 2 <= 0.005
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_a_circuit_never_disagrees_with_itself(load_example, name):
+    mig = build_mig(load_example(name))
+    report = final_report(mig, seed=0, reference=build_mig(load_example(name)))
+    for statistics in report["outputs"].values():
+        assert statistics["disagreement"]["count"] == 0
+        assert statistics["disagreement"]["interval"][0] == 0.0
+
+
+def test_unknown_method_is_rejected(load_example):
+    with pytest.raises(ValueError):
+        MonteCarloSampler(build_mig(load_example("and.qca")), method="halton")
+
+
+@pytest.mark.parametrize("kwargs", [{"batch_size": 0}, {"batch_size": -1}, {"max_samples": -1}])
+def test_invalid_sample_counts_are_rejected(load_example, kwargs):
+    with pytest.raises(ValueError):
+        MonteCarloSampler(build_mig(load_example("and.qca")), **kwargs)
+
+
+def test_cli_rejects_an_empty_batch(capsys):
+    argv = ["sample", str(ROOT / "and.qca"), "--batch-size", "0"]
+    assert main(argv) == 2
+    assert "batch size" in capsys.readouterr().err
+
+
+def test_without_samples_nothing_is_drawn(load_example):
+    report = final_report(build_mig(load_example("and.qca")), max_samples=0)
+    assert report["stopped"] == "max_samples"
+    assert report["samples"] == 0
+
+
+@pytest.mark.parametrize("method", ["random", "sobol"])
+def test_observed_function_is_the_truth_table_of_the_output(tmp_path, method):
+    graph = QCAParser().parse(write_design(tmp_path / "chain.qca", majority_chain(2)))
+    mig = build_mig(graph)
+    report = final_report(mig, method=method, seed=3, batch_size=256, tolerance=0.05)
+    observed = report["outputs"]["y"]["observed_function"]
+    assert observed["complete"] and observed["patterns"] == 32
+
+    expected = 0
+    for m in range(32):
+        inputs = {name: (m >> j) & 1 for j, name in enumerate(observed["inputs"])}
+        expected |= majority_chain_value(2, inputs) << m
+    assert sorted(observed["inputs"]) == sorted(mig.input_names)
+    assert int(observed["truth_table"], 16) == expected
+    # a majority of five inputs is neither a constant nor a literal
+    assert report["outputs"]["y"]["matching_literals"] == []
+
+
+def test_observed_function_of_a_wide_output_is_not_recorded(tmp_path):
+    graph = QCAParser().parse(write_design(tmp_path / "chain.qca", majority_chain(3)))
+    report = final_report(build_mig(graph), seed=0, max_support=4, max_samples=1024)
+    assert report["outputs"]["y"]["observed_function"] is None
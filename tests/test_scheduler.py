@@ -0,0 +1,42 @@
+from .test_graph import wire
+from qca_parser.scheduler import ClockScheduler, NUM_CLOCK_ZONES
+from qca_parser.simulator import Simulator
+import pytest
+
+CELLS_PER_ZONE = 3
+
+
+def zoned_wire(last_zone: int):
+    """A wire whose cells pass through the clock zones 0 ... last_zone."""
+    zones = [z for z in range(last_zone + 1) for _ in range(CELLS_PER_ZONE)]
+    return wire(len(zones), [0] + zones[1:])
+
+
+def test_scheduler_groups_zones_in_pipeline_order():
+    scheduler = ClockScheduler(zoned_wire(3))
+    assert [len(zone) for zone in scheduler.zones] == [CELLS_PER_ZONE] * NUM_CLOCK_ZONES
+    # every zone is evaluated from the node that feeds the next zone
+    assert all(len(sinks) == 1 for sinks in scheduler.sinks)
+    # once every clock is high, the zones are evaluated in pipeline order
+    assert scheduler.schedule((1, 1, 1, 1)) == [0, 1, 2, 3]
+    # zone 2 was activated first, so it drives zone 3, then 0
+    scheduler.schedule((-1, -1, 1, -1))
+    assert scheduler.schedule((1, -1, 1, 1)) == [2, 3, 0]
+
+
+def test_pipelined_latency_grows_by_a_quarter_cycle_per_zone():
+    latencies = []
+    for last_zone in range(NUM_CLOCK_ZONES):
+        graph = zoned_wire(last_zone)
+        active_zones = [z for z in range(NUM_CLOCK_ZONES) if len(ClockScheduler(graph).zones[z]) > 0]
+        assert active_zones == list(range(last_zone + 1))
+
+        truth_table = Simulator(graph).simulate(8, 0.001, pipelined=True, plot=False)
+        assert truth_table["values"] == [[0], [1]]
+        latencies.append(truth_table["latency"])
+
+    # every additional clock zone delays the outputs by a quarter of a clock cycle
+    for last_zone in range(1, NUM_CLOCK_ZONES):
+        for comb in range(2):
+            delay = latencies[last_zone][comb] - latencies[0][comb]
+            assert delay == pytest.approx(last_zone / NUM_CLOCK_ZONES, abs=0.01)
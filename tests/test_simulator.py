@@ -0,0 +1,29 @@
+from .conftest import EXAMPLES
+from qca_parser.simulator import Simulator
+import pytest
+
+EXPECTED = {
+    "and.qca": [[0], [0], [0], [1]],
+    "example_majoritygate.qca": [[0], [0], [0], [1], [0], [1], [1], [1]],
+    "example_negator.qca": [[1], [0]],
+}
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_logic_truth_tables(load_example, name):
+    truth_table = Simulator(load_example(name)).simulate(10, 0.01, plot=False)
+    assert truth_table["values"] == EXPECTED[name]
+    assert "settled" not in truth_table
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_adaptive_matches_fixed_step(load_example, name, pipelined):
+    fixed = Simulator(load_example(name)).simulate(10, 0.01, pipelined=pipelined, plot=False)
+    adaptive = Simulator(load_example(name)).simulate(
+        10, 0.01, pipelined=pipelined, adaptive=True, plot=False
+    )
+    assert adaptive["values"] == fixed["values"] == EXPECTED[name]
+    assert all(adaptive["settled"])
+    if pipelined:
+        assert adaptive["latency"] == pytest.approx(fixed["latency"])
@@ -0,0 +1,88 @@
+from .conftest import EXAMPLES, ROOT
+from .designs import majority_chain, majority_chain_value, write_design
+from .test_mig import random_mig
+from qca_parser.cli import main
+from qca_parser.mig import MIG, build_mig
+from qca_parser.parser import QCAParser
+from qca_parser.subcircuit import LRUCache, SubcircuitEvaluator, evaluate_key
+import json
+import pytest
+import random
+
+
+def ripple_carry_adder(bits: int) -> MIG:
+    mig = MIG()
+    carry = mig.constant(0)
+    for i in range(bits):
+        a, b = mig.variable(f"a{i}"), mig.variable(f"b{i}")
+        carry_out = mig.majority(a, b, carry)
+        partial = mig.majority(a, b, mig.negate(carry))
+        mig.add_output(f"s{i}", mig.majority(mig.negate(carry_out), carry, partial))
+        carry = carry_out
+    mig.add_output("cout", carry)
+    return mig
+
+
+def test_repeated_tiles_are_compiled_once():
+    mig = ripple_carry_adder(32)
+    evaluator = SubcircuitEvaluator(mig)
+    assert len(evaluator.subcircuits) == 64
+    assert len({s.key for s in evaluator.subcircuits}) == 2
+
+    rng = random.Random(0)
+    full = (1 << 256) - 1
+    values = [rng.getrandbits(256) for _ in mig.input_names]
+    assert evaluator.simulate(values, full) == mig.simulate(values, full)
+    assert evaluator.cache.misses == 2
+    assert evaluator.cache.hits == 62
+
+
+def test_majority_chain_tiles_share_one_function(tmp_path):
+    graph = QCAParser().parse(write_design(tmp_path / "chain.qca", majority_chain(6)))
+    mig = build_mig(graph)
+    evaluator = SubcircuitEvaluator(mig, cache=LRUCache())
+
+    rows = list(evaluator.iter_rows(block_size=1024))
+    assert rows == list(mig.iter_rows())
+    for row in rows:
+        inputs = dict(zip(mig.input_names, row["inputs"]))
+        assert row["outputs"] == [majority_chain_value(6, inputs)]
+
+    # 3 tiles of 2 gates, evaluated in 8 blocks
+    assert evaluator.cache.stats()["size"] == 1
+    assert evaluator.cache.misses == 1
+    assert evaluator.cache.hits == 3 * 8 - 1
+
+
+def test_truth_table_of_a_majority_gate():
+    mig = MIG()
+    a, b, c = (mig.variable(name) for name in "abc")
+    mig.add_output("y", mig.majority(a, b, mig.negate(c)))
+    (subcircuit,) = SubcircuitEvaluator(mig).subcircuits
+    expected = 0
+    for m in range(8):
+        bits = [(m >> j) & 1 for j in range(3)]
+        values = dict(zip([mig.input_nodes[name] for name in "abc"], bits))
+        values[mig.input_nodes["c"]] ^= 1
+        if sum(values[leaf] for leaf in subcircuit.leaves) >= 2:
+            expected |= 1 << m
+    assert evaluate_key(subcircuit.key, 3) == expected
+
+
+@pytest.mark.parametrize("name", EXAMPLES)
+def test_symbolic_simulation_uses_subcircuits(tmp_path, load_example, capsys, name):
+    profile = tmp_path / "profile.json"
+    argv = ["--profile", str(profile), "simulate", str(ROOT / name), "--symbolic", "--format", "jsonl"]
+    assert main(argv) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    expected = build_mig(load_example(name)).truth_table()["values"]
+    assert [row["outputs"] for row in rows] == expected
+    assert "subcircuits.cache_hits" in profile.read_text()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_subcircuits_of_random_migs(seed):
+    mig = random_mig(6, 40, seed)
+    evaluator = SubcircuitEvaluator(mig, max_leaves=4)
+    assert list(evaluator.iter_rows(block_size=16)) == list(mig.iter_rows())